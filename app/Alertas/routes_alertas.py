@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import datetime
 
-from app.settings import get_db
+from app.settings import get_async_db, get_async_db_readonly, AsyncSessionLocal, timeout_relatorio
 
 
 
@@ -16,16 +17,25 @@ from .schema_alertas import (
     PrioridadeAlerta
 )
 from .service_alertas import service_alertas
+from app.serializacao import RespostaORJSON
+from app.versao_estoque import etag_versao_estoque
 
 router = APIRouter(
     prefix="/alertas",
     tags=["Alertas de Estoque"]
 )
 
+async def _verificar_alertas_em_background():
+    """Executa a verificação com sessão própria, já que a sessão da requisição é fechada antes da task"""
+    # Varre todo o estoque: usa o timeout dos relatórios, não o das rotas de PDV
+    await timeout_relatorio()
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(service_alertas.verificar_todos_alertas)
+
 @router.get("/verificar", response_model=List[AlertaEstoque])
-def verificar_alertas(
+async def verificar_alertas(
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Verifica e gera todos os alertas do sistema.
@@ -33,43 +43,43 @@ def verificar_alertas(
     Esta operação pode ser executada em background para não bloquear a interface.
     """
     # Executar verificação em background para performance
-    background_tasks.add_task(service_alertas.verificar_todos_alertas, db)
+    background_tasks.add_task(_verificar_alertas_em_background)
     
     # Retornar alertas existentes imediatamente
     filtros = FiltroAlertas(apenas_nao_resolvidos=True)
-    return service_alertas.obter_alertas(db, filtros)
+    return RespostaORJSON(await db.run_sync(service_alertas.obter_alertas_linhas, filtros))
 
 @router.get("/resumo", response_model=ResumoAlertas)
-def obter_resumo_alertas(
-    db: Session = Depends(get_db),
+async def obter_resumo_alertas(
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém resumo estatístico dos alertas do sistema.
     
     Ideal para dashboards e visões gerais.
     """
-    return service_alertas.gerar_resumo_alertas(db)
+    return await db.run_sync(service_alertas.gerar_resumo_alertas)
 
 @router.get("/criticos", response_model=List[AlertaCritico])
-def obter_alertas_criticos(
+async def obter_alertas_criticos(
     limite: int = Query(10, description="Número máximo de alertas críticos", ge=1, le=50),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém os alertas mais críticos do sistema.
     
     Retorna alertas que requerem ação imediata.
     """
-    return service_alertas.obter_alertas_criticos(db, limite)
+    return await db.run_sync(service_alertas.obter_alertas_criticos, limite)
 
 @router.get("/", response_model=List[AlertaEstoque])
-def listar_alertas(
+async def listar_alertas(
     tipo: Optional[TipoAlerta] = Query(None, description="Filtrar por tipo de alerta"),
     prioridade: Optional[PrioridadeAlerta] = Query(None, description="Filtrar por prioridade"),
     armazem_id: Optional[int] = Query(None, description="Filtrar por armazém"),
     apenas_nao_resolvidos: bool = Query(True, description="Apenas alertas não resolvidos"),
     dias_vencimento_max: Optional[int] = Query(None, description="Máximo de dias para vencimento"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Lista alertas com filtros opcionais.
@@ -84,15 +94,15 @@ def listar_alertas(
         dias_vencimento_max=dias_vencimento_max
     )
     
-    return service_alertas.obter_alertas(db, filtros)
+    return RespostaORJSON(await db.run_sync(service_alertas.obter_alertas_linhas, filtros))
 
 @router.get("/relatorio", response_model=RelatorioAlertas)
-def gerar_relatorio_completo(
+async def gerar_relatorio_completo(
     tipo: Optional[TipoAlerta] = Query(None, description="Filtrar por tipo de alerta"),
     prioridade: Optional[PrioridadeAlerta] = Query(None, description="Filtrar por prioridade"),
     armazem_id: Optional[int] = Query(None, description="Filtrar por armazém"),
     apenas_nao_resolvidos: bool = Query(True, description="Apenas alertas não resolvidos"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Gera relatório completo de alertas.
@@ -106,29 +116,30 @@ def gerar_relatorio_completo(
         apenas_nao_resolvidos=apenas_nao_resolvidos
     )
     
-    resumo = service_alertas.gerar_resumo_alertas(db)
-    alertas_criticos = service_alertas.obter_alertas_criticos(db, 20)
-    alertas_completos = service_alertas.obter_alertas(db, filtros)
+    resumo = await db.run_sync(service_alertas.gerar_resumo_alertas)
+    alertas_criticos = await db.run_sync(service_alertas.obter_alertas_criticos, 20)
+    alertas_completos = await db.run_sync(service_alertas.obter_alertas_linhas, filtros)
     
-    return RelatorioAlertas(
-        resumo=resumo,
-        alertas_criticos=alertas_criticos,
-        alertas_completos=alertas_completos,
-        filtros_aplicados=filtros
-    )
+    return RespostaORJSON({
+        "resumo": resumo,
+        "alertas_criticos": alertas_criticos,
+        "alertas_completos": alertas_completos,
+        "filtros_aplicados": filtros,
+        "data_geracao": datetime.now()
+    })
 
 @router.put("/{alerta_id}/resolver")
-def resolver_alerta(
+async def resolver_alerta(
     alerta_id: int,
     observacoes: Optional[str] = Query(None, description="Observações sobre a resolução"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Marca um alerta como resolvido.
     
     Adiciona data de resolução e observações opcionais.
     """
-    sucesso = service_alertas.resolver_alerta(db, alerta_id, observacoes)
+    sucesso = await db.run_sync(service_alertas.resolver_alerta, alerta_id, observacoes)
     
     if not sucesso:
         raise HTTPException(status_code=404, detail="Alerta não encontrado")
@@ -136,9 +147,8 @@ def resolver_alerta(
     return {"message": "Alerta marcado como resolvido", "alerta_id": alerta_id}
 
 @router.post("/atualizar-todos")
-def atualizar_todos_alertas(
+async def atualizar_todos_alertas(
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
 ):
     """
     Força atualização completa de todos os alertas do sistema.
@@ -146,24 +156,25 @@ def atualizar_todos_alertas(
     Operação executada em background para não bloquear a interface.
     Útil para executar verificações manuais ou em schedules.
     """
-    background_tasks.add_task(service_alertas.verificar_todos_alertas, db)
+    background_tasks.add_task(_verificar_alertas_em_background)
     
     return {
         "message": "Verificação de alertas iniciada em background",
         "status": "processando"
     }
 
-@router.get("/dashboard", response_model=dict)
-def obter_dados_dashboard(
-    db: Session = Depends(get_db),
+@router.get("/dashboard", response_model=dict, dependencies=[Depends(etag_versao_estoque)])
+async def obter_dados_dashboard(
+    # Primário: a ETag vem da versão do primário e não pode acompanhar dados atrasados da réplica
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Obtém dados consolidados para dashboard de alertas.
     
     Combina resumo + alertas críticos em uma única resposta otimizada.
     """
-    resumo = service_alertas.gerar_resumo_alertas(db)
-    alertas_criticos = service_alertas.obter_alertas_criticos(db, 5)
+    resumo = await db.run_sync(service_alertas.gerar_resumo_alertas)
+    alertas_criticos = await db.run_sync(service_alertas.obter_alertas_criticos, 5)
     
     return {
         "resumo": resumo,
@@ -172,10 +183,10 @@ def obter_dados_dashboard(
     }
 
 @router.get("/por-tipo/{tipo}", response_model=List[AlertaEstoque])
-def obter_alertas_por_tipo(
+async def obter_alertas_por_tipo(
     tipo: TipoAlerta,
     armazem_id: Optional[int] = Query(None, description="Filtrar por armazém"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém alertas de um tipo específico.
@@ -188,14 +199,14 @@ def obter_alertas_por_tipo(
         apenas_nao_resolvidos=True
     )
     
-    return service_alertas.obter_alertas(db, filtros)
+    return RespostaORJSON(await db.run_sync(service_alertas.obter_alertas_linhas, filtros))
 
 @router.get("/por-armazem/{armazem_id}", response_model=List[AlertaEstoque])
-def obter_alertas_por_armazem(
+async def obter_alertas_por_armazem(
     armazem_id: int,
     tipo: Optional[TipoAlerta] = Query(None, description="Filtrar por tipo de alerta"),
     prioridade: Optional[PrioridadeAlerta] = Query(None, description="Filtrar por prioridade"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém alertas de um armazém específico.
@@ -209,4 +220,4 @@ def obter_alertas_por_armazem(
         apenas_nao_resolvidos=True
     )
     
-    return service_alertas.obter_alertas(db, filtros)
+    return RespostaORJSON(await db.run_sync(service_alertas.obter_alertas_linhas, filtros))
@@ -18,6 +18,7 @@ from app.ItemArmazenado.model_item_armazenado import ItemArmazenado
 from app.ItemEstoque.model_item_estoque import ItemEstoque
 from app.Armazem.model_armazem import Armazem
 from app.Medicamento.model_medicamento import Medicamento
+from app.versao_estoque import incrementar_versao_estoque
 from app.CuidadoPessoal.model_cuidado_pessoal import CuidadoPessoal
 from app.SuplementoAlimentar.model_suplemento_alimentar import SuplementoAlimentar
 
@@ -234,12 +235,21 @@ class ServiceAlertas:
                 )
                 db.add(novo_alerta)
         
+        houve_alerta_novo = bool(db.new)
         db.commit()
+        # A verificação periódica só muda a versão quando cria alertas
+        if houve_alerta_novo:
+            incrementar_versao_estoque(db)
     
-    def obter_alertas(self, db: Session, filtros: FiltroAlertas) -> List[AlertaSchema]:
-        """Obtém alertas com filtros aplicados"""
+    def obter_alertas_linhas(self, db: Session, filtros: FiltroAlertas) -> List[dict]:
+        """Obtém alertas com filtros aplicados, como dicts no formato de AlertaSchema prontos para serialização"""
         query = db.query(
-            AlertaEstoque,
+            AlertaEstoque.id,
+            AlertaEstoque.tipo,
+            AlertaEstoque.prioridade,
+            AlertaEstoque.titulo,
+            AlertaEstoque.descricao,
+            AlertaEstoque.item_estoque_id,
             case(
                 (ItemEstoque.produto_medicamento_id.isnot(None), 
                  db.query(Medicamento.nome).filter(Medicamento.id == ItemEstoque.produto_medicamento_id).scalar_subquery()),
@@ -250,7 +260,19 @@ class ServiceAlertas:
                 else_="Produto Desconhecido"
             ).label('produto_nome'),
             ItemEstoque.codigo_barras,
-            Armazem.local_armazem
+            AlertaEstoque.armazem_id,
+            Armazem.local_armazem.label('armazem_nome'),
+            AlertaEstoque.quantidade_atual,
+            AlertaEstoque.quantidade_minima,
+            # Vem no mesmo SELECT em vez de carregar o relacionamento item_estoque por alerta
+            ItemEstoque.data_validade,
+            AlertaEstoque.dias_para_vencimento,
+            AlertaEstoque.valor_unitario,
+            AlertaEstoque.valor_total_impactado,
+            AlertaEstoque.data_criacao,
+            AlertaEstoque.data_resolucao,
+            AlertaEstoque.resolvido,
+            AlertaEstoque.observacoes
         ).join(
             ItemEstoque, AlertaEstoque.item_estoque_id == ItemEstoque.id
         ).join(
@@ -290,35 +312,23 @@ class ServiceAlertas:
         
         resultados = query.all()
         
-        # Converter para schema
+        # Converter para o formato de AlertaSchema
         alertas = []
-        for alerta_db, produto_nome, codigo_barras, armazem_nome in resultados:
-            alerta = AlertaSchema(
-                id=alerta_db.id,
-                tipo=TipoAlerta(alerta_db.tipo),
-                prioridade=PrioridadeAlerta(alerta_db.prioridade),
-                titulo=alerta_db.titulo,
-                descricao=alerta_db.descricao,
-                item_estoque_id=alerta_db.item_estoque_id,
-                produto_nome=produto_nome,
-                codigo_barras=codigo_barras,
-                armazem_id=alerta_db.armazem_id,
-                armazem_nome=armazem_nome,
-                quantidade_atual=alerta_db.quantidade_atual,
-                quantidade_minima=alerta_db.quantidade_minima,
-                data_validade=alerta_db.item_estoque.data_validade if alerta_db.item_estoque else None,
-                dias_para_vencimento=alerta_db.dias_para_vencimento,
-                valor_unitario=alerta_db.valor_unitario,
-                valor_total_impactado=alerta_db.valor_total_impactado,
-                data_criacao=alerta_db.data_criacao,
-                data_resolucao=alerta_db.data_resolucao,
-                resolvido=alerta_db.resolvido,
-                observacoes=alerta_db.observacoes
-            )
+        for resultado in resultados:
+            alerta = resultado._asdict()
+            alerta["tipo"] = TipoAlerta(resultado.tipo)
+            alerta["prioridade"] = PrioridadeAlerta(resultado.prioridade)
+            # O schema declara datetime; mantém o mesmo JSON que a validação produziria
+            if resultado.data_validade is not None and not isinstance(resultado.data_validade, datetime):
+                alerta["data_validade"] = datetime.combine(resultado.data_validade, datetime.min.time())
             alertas.append(alerta)
         
         return alertas
     
+    def obter_alertas(self, db: Session, filtros: FiltroAlertas) -> List[AlertaSchema]:
+        """Obtém alertas com filtros aplicados"""
+        return [AlertaSchema.model_construct(**alerta) for alerta in self.obter_alertas_linhas(db, filtros)]
+    
     def gerar_resumo_alertas(self, db: Session) -> ResumoAlertas:
         """Gera resumo estatístico dos alertas"""
         # Contar alertas por prioridade
@@ -418,6 +428,7 @@ class ServiceAlertas:
             alerta.observacoes = observacoes
         
         db.commit()
+        incrementar_versao_estoque(db)
         return True
     
     def _obter_configuracoes(self, db: Session) -> dict:
@@ -3,6 +3,9 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from app.Armazem.model_armazem import Armazem
 from app.Armazem.schema_armazem import ArmazemCreate
+from app.ConsultaEstoque.service_snapshot_estoque import sincronizar_snapshot
+from app.ConsultaEstoque.service_codigo_barras import invalidar_todos
+from app.versao_estoque import incrementar_versao_estoque
 
 def create_armazem(db: Session, armazem: ArmazemCreate):
     existente = db.query(Armazem).filter(Armazem.local_armazem == armazem.local_armazem).first()
@@ -26,7 +29,11 @@ def update_armazem(db: Session, id: int, armazem: ArmazemCreate):
         raise HTTPException(status_code=404, detail="Local de armazenamento não encontrado")
     for key, value in armazem.dict().items():
         setattr(db_armazem, key, value)
+    # Local e quantidade mínima são copiados em estoque_snapshot
+    sincronizar_snapshot(db, armazem_ids=[id])
     db.commit()
+    invalidar_todos()
+    incrementar_versao_estoque(db)
     db.refresh(db_armazem)
     return db_armazem
 
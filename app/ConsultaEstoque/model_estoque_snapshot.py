@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Numeric, Date, TIMESTAMP, ForeignKey, func
+from app.settings import Base
+
+class EstoqueSnapshot(Base):
+    """Uma linha por item e armazém, com os dados de item_estoque, fornecedor e armazem já juntos.
+
+    Mantida pelos serviços de escrita (service_snapshot_estoque) na mesma
+    transação da alteração; as consultas de estoque leem só esta tabela.
+    """
+    __tablename__ = "estoque_snapshot"
+
+    item_estoque_id = Column(Integer, ForeignKey('item_estoque.id', ondelete='CASCADE'), primary_key=True)
+    armazem_id = Column(Integer, ForeignKey('armazem.id', ondelete='CASCADE'), primary_key=True)
+    produto_id = Column(Integer, nullable=False)
+    produto_nome = Column(String(100), nullable=False)
+    tipo_produto = Column(String(20), nullable=False)
+    codigo_barras = Column(String(80), nullable=False)
+    preco = Column(Numeric(10, 2, asdecimal=False), nullable=False)
+    data_validade = Column(Date, nullable=False)
+    lote = Column(String(50), nullable=False)
+    fornecedor_id = Column(Integer, nullable=False)
+    fornecedor_nome = Column(String(100), nullable=False)
+    armazem_local = Column(String(100), nullable=False)
+    quantidade_atual = Column(Integer, nullable=False)
+    quantidade_minima = Column(Integer, nullable=False)
+    atualizado_em = Column(TIMESTAMP, nullable=False, server_default=func.now())
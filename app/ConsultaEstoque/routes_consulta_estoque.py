@@ -1,28 +1,64 @@
 from typing import List
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from app.settings import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.settings import get_async_db, get_async_db_readonly, executar_cancelavel, timeout_relatorio
 from app.ConsultaEstoque.schema_consulta_estoque import (
     ConsultaEstoqueRead,
     FiltroConsultaEstoque,
     ResumoEstoque,
     EstoqueDetalhado,
-    TipoProduto
+    StatusEstoque,
+    TipoProduto,
+    OrdenacaoConsultaEstoque,
+    PaginaConsultaEstoque,
+    AgrupamentoResumoEstoque,
+    ResumoEstoqueGrupo,
+    ReconstrucaoSnapshot,
+    ItemCodigoBarras,
+    ConsultaLoteEstoque,
+    ResultadoLoteEstoque
 )
-from app.ConsultaEstoque import service_consulta_estoque
+from fastapi.responses import StreamingResponse
+from app.ConsultaEstoque import service_consulta_estoque, service_snapshot_estoque, service_codigo_barras
+from app.ConsultaEstoque.service_exportacao_estoque import exportar_estoque_ndjson
+from app.serializacao import RespostaORJSON
+from app.busca import ModoBusca
+from app.versao_estoque import etag_versao_estoque, obter_versao_estoque
 
 router = APIRouter(prefix="/consulta-estoque", tags=["Consulta de Estoque"])
 
-@router.get("/resumo", response_model=ResumoEstoque)
-def get_resumo_estoque(
-    db: Session = Depends(get_db),
+@router.get("/resumo", response_model=ResumoEstoque, dependencies=[Depends(etag_versao_estoque), Depends(timeout_relatorio)])
+async def get_resumo_estoque(
+    request: Request,
+    armazem_id: int = Query(None, description="Filtrar por armazém"),
+    tipo_produto: TipoProduto = Query(None, description="Filtrar por tipo de produto"),
+    # Primário: a ETag vem da versão do primário e não pode acompanhar dados atrasados da réplica
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Obter resumo geral do estoque"""
-    return service_consulta_estoque.gerar_resumo_estoque(db)
+    filtros = FiltroConsultaEstoque(armazem_id=armazem_id, tipo_produto=tipo_produto)
+    return await executar_cancelavel(
+        request, db, service_consulta_estoque.gerar_resumo_estoque_em_cache, filtros, await obter_versao_estoque()
+    )
+
+@router.get("/resumo/agrupado", response_model=List[ResumoEstoqueGrupo], dependencies=[Depends(timeout_relatorio)])
+async def get_resumo_estoque_agrupado(
+    request: Request,
+    agrupar_por: AgrupamentoResumoEstoque = Query(AgrupamentoResumoEstoque.ARMAZEM, description="Agrupar por armazém ou tipo"),
+    armazem_id: int = Query(None, description="Filtrar por armazém"),
+    tipo_produto: TipoProduto = Query(None, description="Filtrar por tipo de produto"),
+    db: AsyncSession = Depends(get_async_db_readonly),
+):
+    """Obter resumo do estoque agrupado por armazém ou por tipo de produto"""
+    filtros = FiltroConsultaEstoque(armazem_id=armazem_id, tipo_produto=tipo_produto)
+    return await executar_cancelavel(
+        request, db, service_consulta_estoque.gerar_resumo_estoque_agrupado, agrupar_por, filtros
+    )
 
 @router.get("/", response_model=List[ConsultaEstoqueRead])
-def consultar_estoque(
+async def consultar_estoque(
     produto_nome: str = Query(None, description="Filtrar por nome do produto"),
+    modo_busca: ModoBusca = Query(ModoBusca.CONTEM, description="contem: trecho do nome; relevancia: tolera erros de digitação e ordena pela similaridade"),
     codigo_barras: str = Query(None, description="Filtrar por código de barras"),
     tipo_produto: TipoProduto = Query(None, description="Filtrar por tipo de produto"),
     fornecedor_id: int = Query(None, description="Filtrar por fornecedor"),
@@ -33,9 +69,10 @@ def consultar_estoque(
     estoque_critico: bool = Query(None, description="Mostrar apenas itens com estoque crítico"),
     quantidade_min: int = Query(None, description="Filtrar por quantidade mínima", ge=0),
     quantidade_max: int = Query(None, description="Filtrar por quantidade máxima", ge=0),
+    status: List[StatusEstoque] = Query(None, description="Filtrar por status (aplicado antes da paginação)"),
     skip: int = Query(0, description="Pular N registros", ge=0),
     limit: int = Query(100, description="Limitar resultados", ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Consultar estoque com filtros"""
     
@@ -51,13 +88,98 @@ def consultar_estoque(
         estoque_critico=estoque_critico,
         quantidade_min=quantidade_min,
         quantidade_max=quantidade_max,
-        status=None
+        status=status,
+        modo_busca=modo_busca
+    )
+    
+    return RespostaORJSON(await db.run_sync(service_consulta_estoque.consultar_estoque_linhas, filtros, skip, limit))
+
+@router.get("/cursor", response_model=PaginaConsultaEstoque)
+async def consultar_estoque_por_cursor(
+    produto_nome: str = Query(None, description="Filtrar por nome do produto"),
+    modo_busca: ModoBusca = Query(ModoBusca.CONTEM, description="contem: trecho do nome; relevancia: tolera erros de digitação (a ordem segue ordenar_por)"),
+    codigo_barras: str = Query(None, description="Filtrar por código de barras"),
+    tipo_produto: TipoProduto = Query(None, description="Filtrar por tipo de produto"),
+    fornecedor_id: int = Query(None, description="Filtrar por fornecedor"),
+    armazem_id: int = Query(None, description="Filtrar por armazém"),
+    vencidos: bool = Query(None, description="Mostrar apenas produtos vencidos"),
+    dias_vencimento: int = Query(None, description="Produtos que vencem em X dias", ge=0),
+    estoque_baixo: bool = Query(None, description="Mostrar apenas itens com estoque baixo"),
+    estoque_critico: bool = Query(None, description="Mostrar apenas itens com estoque crítico"),
+    quantidade_min: int = Query(None, description="Filtrar por quantidade mínima", ge=0),
+    quantidade_max: int = Query(None, description="Filtrar por quantidade máxima", ge=0),
+    status: List[StatusEstoque] = Query(None, description="Filtrar por status (aplicado antes da paginação)"),
+    ordenar_por: OrdenacaoConsultaEstoque = Query(OrdenacaoConsultaEstoque.ITEM_ESTOQUE, description="Chave de ordenação"),
+    cursor: str = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(100, description="Limitar resultados", ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db_readonly),
+):
+    """Consultar estoque paginando por cursor (keyset): custo constante por página, ideal para varrer todo o estoque"""
+    
+    filtros = FiltroConsultaEstoque(
+        produto_nome=produto_nome,
+        codigo_barras=codigo_barras,
+        tipo_produto=tipo_produto,
+        fornecedor_id=fornecedor_id,
+        armazem_id=armazem_id,
+        vencidos=vencidos,
+        dias_vencimento=dias_vencimento,
+        estoque_baixo=estoque_baixo,
+        estoque_critico=estoque_critico,
+        quantidade_min=quantidade_min,
+        quantidade_max=quantidade_max,
+        status=status,
+        modo_busca=modo_busca
     )
     
-    return service_consulta_estoque.consultar_estoque(db, filtros, skip, limit)
-@router.get("/detalhado", response_model=EstoqueDetalhado)
-def consultar_estoque_detalhado(
+    return RespostaORJSON(await db.run_sync(
+        service_consulta_estoque.consultar_estoque_por_cursor, filtros, cursor, limit, ordenar_por
+    ))
+
+@router.get(
+    "/exportar",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "Uma linha JSON (ConsultaEstoqueRead) por item e armazém"}},
+)
+async def exportar_estoque(
     produto_nome: str = Query(None, description="Filtrar por nome do produto"),
+    modo_busca: ModoBusca = Query(ModoBusca.CONTEM, description="contem: trecho do nome; relevancia: tolera erros de digitação"),
+    codigo_barras: str = Query(None, description="Filtrar por código de barras"),
+    tipo_produto: TipoProduto = Query(None, description="Filtrar por tipo de produto"),
+    fornecedor_id: int = Query(None, description="Filtrar por fornecedor"),
+    armazem_id: int = Query(None, description="Filtrar por armazém"),
+    vencidos: bool = Query(None, description="Mostrar apenas produtos vencidos"),
+    dias_vencimento: int = Query(None, description="Produtos que vencem em X dias", ge=0),
+    estoque_baixo: bool = Query(None, description="Mostrar apenas itens com estoque baixo"),
+    estoque_critico: bool = Query(None, description="Mostrar apenas itens com estoque crítico"),
+    quantidade_min: int = Query(None, description="Filtrar por quantidade mínima", ge=0),
+    quantidade_max: int = Query(None, description="Filtrar por quantidade máxima", ge=0),
+    status: List[StatusEstoque] = Query(None, description="Filtrar por status"),
+):
+    """Exportar a posição completa de estoque em NDJSON, enviada à medida que as linhas chegam do banco (BI)"""
+    
+    filtros = FiltroConsultaEstoque(
+        produto_nome=produto_nome,
+        modo_busca=modo_busca,
+        codigo_barras=codigo_barras,
+        tipo_produto=tipo_produto,
+        fornecedor_id=fornecedor_id,
+        armazem_id=armazem_id,
+        vencidos=vencidos,
+        dias_vencimento=dias_vencimento,
+        estoque_baixo=estoque_baixo,
+        estoque_critico=estoque_critico,
+        quantidade_min=quantidade_min,
+        quantidade_max=quantidade_max,
+        status=status
+    )
+    return StreamingResponse(exportar_estoque_ndjson(filtros), media_type="application/x-ndjson")
+
+@router.get("/detalhado", response_model=EstoqueDetalhado, dependencies=[Depends(timeout_relatorio)])
+async def consultar_estoque_detalhado(
+    request: Request,
+    produto_nome: str = Query(None, description="Filtrar por nome do produto"),
+    modo_busca: ModoBusca = Query(ModoBusca.CONTEM, description="contem: trecho do nome; relevancia: tolera erros de digitação e ordena pela similaridade"),
     codigo_barras: str = Query(None, description="Filtrar por código de barras"),
     tipo_produto: TipoProduto = Query(None, description="Filtrar por tipo de produto"),
     fornecedor_id: int = Query(None, description="Filtrar por fornecedor"),
@@ -70,7 +192,8 @@ def consultar_estoque_detalhado(
     quantidade_max: int = Query(None, description="Filtrar por quantidade máxima", ge=0),
     skip: int = Query(0, description="Pular N registros", ge=0),
     limit: int = Query(100, description="Limitar resultados", ge=1, le=1000),
-    db: Session = Depends(get_db),
+    incluir_resumo: bool = Query(True, description="Incluir o resumo geral (use false ao paginar)"),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Consultar estoque detalhado com resumo"""
     
@@ -86,58 +209,69 @@ def consultar_estoque_detalhado(
         estoque_critico=estoque_critico,
         quantidade_min=quantidade_min,
         quantidade_max=quantidade_max,
-        status=None
+        status=None,
+        modo_busca=modo_busca
     )
     
-    return service_consulta_estoque.consultar_estoque_detalhado(db, filtros, skip, limit)
+    return RespostaORJSON(await executar_cancelavel(
+        request, db, service_consulta_estoque.consultar_estoque_detalhado,
+        filtros, skip, limit, await obter_versao_estoque() if incluir_resumo else None, incluir_resumo
+    ))
 
 @router.get("/vencidos", response_model=List[ConsultaEstoqueRead])
-def consultar_produtos_vencidos(
+async def consultar_produtos_vencidos(
     dias_limite: int = Query(0, description="Dias limite para vencimento (0=já vencidos)", ge=0),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Consultar produtos vencidos ou próximos do vencimento"""
-    return service_consulta_estoque.consultar_produtos_vencidos(db, dias_limite)
+    return RespostaORJSON(await db.run_sync(service_consulta_estoque.consultar_produtos_vencidos, dias_limite))
 
 @router.get("/critico", response_model=List[ConsultaEstoqueRead])
-def consultar_estoque_critico(
-    db: Session = Depends(get_db),
+async def consultar_estoque_critico(
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Consultar itens com estoque crítico ou baixo"""
-    return service_consulta_estoque.consultar_estoque_critico(db)
+    return RespostaORJSON(await db.run_sync(service_consulta_estoque.consultar_estoque_critico))
+
+@router.get("/codigo-barras/{codigo_barras}", response_model=ItemCodigoBarras)
+async def consultar_por_codigo_barras(
+    codigo_barras: str,
+    # Primário, não réplica: depois de uma invalidação o cache não pode ser repovoado com dado atrasado
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Leitura do código de barras no caixa: item e quantidade por armazém (com cache em memória)"""
+    item = await db.run_sync(service_codigo_barras.buscar_por_codigo_barras, codigo_barras)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Código de barras não encontrado em nenhum armazém")
+    return RespostaORJSON(item)
+
+@router.post("/lote", response_model=ResultadoLoteEstoque)
+async def consultar_estoque_em_lote(
+    consulta: ConsultaLoteEstoque,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Consultar até 1000 códigos de barras e/ou item_estoque_ids numa única chamada (coletores e integrações)"""
+    return RespostaORJSON(await db.run_sync(
+        service_codigo_barras.buscar_lote, consulta.codigos_barras, consulta.item_estoque_ids
+    ))
 
 @router.get("/por-produto/{produto_id}", response_model=List[ConsultaEstoqueRead])
-def consultar_estoque_por_produto(
+async def consultar_estoque_por_produto(
     produto_id: int,
-    db: Session = Depends(get_db),
+    tipo_produto: TipoProduto = Query(None, description="Tipo do produto (os ids se repetem entre os tipos)"),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Consultar estoque de um produto específico em todos os armazéns"""
-    # Buscar todos os itens deste produto
-    filtros = FiltroConsultaEstoque(
-        produto_nome=None,
-        codigo_barras=None,
-        tipo_produto=None,
-        fornecedor_id=None,
-        armazem_id=None,
-        vencidos=None,
-        dias_vencimento=None,
-        estoque_baixo=None,
-        estoque_critico=None,
-        quantidade_min=None,
-        quantidade_max=None,
-        status=None
-    )
-    todos_itens = service_consulta_estoque.consultar_estoque(db, filtros, 0, 1000)
-    itens_produto = [item for item in todos_itens if item.produto_id == produto_id]
-    
-    return itens_produto
+    return RespostaORJSON(await db.run_sync(
+        service_consulta_estoque.consultar_estoque_por_produto, produto_id, tipo_produto
+    ))
 
 @router.get("/por-armazem/{armazem_id}", response_model=List[ConsultaEstoqueRead])
-def consultar_estoque_por_armazem(
+async def consultar_estoque_por_armazem(
     armazem_id: int,
     skip: int = Query(0, description="Pular N registros", ge=0),
     limit: int = Query(100, description="Limitar resultados", ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Consultar todos os itens de um armazém específico"""
     # Filtrar por armazém específico
@@ -155,14 +289,17 @@ def consultar_estoque_por_armazem(
         quantidade_max=None,
         status=None
     )
-    return service_consulta_estoque.consultar_estoque(db, filtros, skip, limit)
+    return RespostaORJSON(await db.run_sync(service_consulta_estoque.consultar_estoque_linhas, filtros, skip, limit))
 
 @router.get("/por-item-estoque/{item_estoque_id}", response_model=List[ConsultaEstoqueRead])
-def consultar_estoque_por_item_estoque(
+async def consultar_estoque_por_item_estoque(
     item_estoque_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Consultar estoque de um item específico por seu item_estoque_id"""
-    # Reutiliza a consulta geral e filtra pelo item_estoque_id
-    todos = service_consulta_estoque.consultar_estoque(db, None, 0, 1000)
-    return [item for item in todos if item.item_estoque_id == item_estoque_id]
+    return RespostaORJSON(await db.run_sync(service_consulta_estoque.consultar_estoque_por_item_estoque, item_estoque_id))
+
+@router.post("/snapshot/reconstruir", response_model=ReconstrucaoSnapshot, dependencies=[Depends(timeout_relatorio)])
+async def reconstruir_snapshot_estoque(db: AsyncSession = Depends(get_async_db)):
+    """Reconstruir o snapshot de estoque a partir das tabelas de origem (corrige divergências)"""
+    return await db.run_sync(service_snapshot_estoque.reconstruir_snapshot)
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List, Dict
 from datetime import datetime, date
 from enum import Enum
+from app.busca import ModoBusca
 
 class StatusEstoque(str, Enum):
     VENCIDO = "vencido"
@@ -36,9 +37,19 @@ class ConsultaEstoqueBase(BaseModel):
 class ConsultaEstoqueRead(ConsultaEstoqueBase):
     pass
 
+class OrdenacaoConsultaEstoque(str, Enum):
+    ITEM_ESTOQUE = "item_estoque_id"
+    DATA_VALIDADE = "data_validade"
+    PRODUTO_NOME = "produto_nome"
+
+class PaginaConsultaEstoque(BaseModel):
+    itens: List[ConsultaEstoqueRead]
+    next_cursor: Optional[str] = Field(None, description="Cursor da próxima página; nulo na última")
+
 class FiltroConsultaEstoque(BaseModel):
     # Filtros de produto
     produto_nome: Optional[str] = Field(None, description="Filtrar por nome do produto (busca parcial)")
+    modo_busca: ModoBusca = Field(ModoBusca.CONTEM, description="Como comparar produto_nome")
     codigo_barras: Optional[str] = Field(None, description="Filtrar por código de barras")
     tipo_produto: Optional[TipoProduto] = Field(None, description="Filtrar por tipo de produto")
     
@@ -68,6 +79,58 @@ class ResumoEstoque(BaseModel):
     produtos_estoque_critico: int
     valor_total_estoque: float
 
+class AgrupamentoResumoEstoque(str, Enum):
+    ARMAZEM = "armazem"
+    TIPO_PRODUTO = "tipo_produto"
+
+class ResumoEstoqueGrupo(ResumoEstoque):
+    # Preenchidos conforme o agrupamento escolhido
+    armazem_id: Optional[int] = None
+    armazem_local: Optional[str] = None
+    tipo_produto: Optional[TipoProduto] = None
+
 class EstoqueDetalhado(BaseModel):
-    resumo: ResumoEstoque
+    resumo: Optional[ResumoEstoque] = Field(None, description="Ausente quando incluir_resumo=false")
     itens: List[ConsultaEstoqueRead]
+
+class ReconstrucaoSnapshot(BaseModel):
+    linhas_gravadas: int
+    linhas_removidas: int
+
+class EstoqueArmazemCodigoBarras(BaseModel):
+    armazem_id: int
+    armazem_local: str
+    quantidade_atual: int
+    quantidade_minima: int
+
+class ItemCodigoBarras(BaseModel):
+    """Dados do item para o caixa, com a quantidade em cada armazém"""
+    item_estoque_id: int
+    codigo_barras: str
+    produto_id: int
+    produto_nome: str
+    tipo_produto: TipoProduto
+    preco: float
+    data_validade: date
+    lote: str
+    fornecedor_id: int
+    fornecedor_nome: str
+    quantidade_total: int
+    armazens: List[EstoqueArmazemCodigoBarras]
+
+class ConsultaLoteEstoque(BaseModel):
+    codigos_barras: List[str] = Field(default_factory=list, max_length=1000)
+    item_estoque_ids: List[int] = Field(default_factory=list, max_length=1000)
+
+    @model_validator(mode='after')
+    def verificar_algum_informado(self):
+        if not self.codigos_barras and not self.item_estoque_ids:
+            raise ValueError("Informe codigos_barras ou item_estoque_ids")
+        return self
+
+class ResultadoLoteEstoque(BaseModel):
+    """Resultados indexados pelo valor enviado; os não encontrados ficam com null"""
+    por_codigo_barras: Dict[str, Optional[ItemCodigoBarras]]
+    por_item_estoque_id: Dict[int, Optional[ItemCodigoBarras]]
+    codigos_barras_nao_encontrados: List[str]
+    item_estoque_ids_nao_encontrados: List[int]
@@ -0,0 +1,164 @@
+# Busca por código de barras no caixa, com cache em memória por worker
+from typing import Dict, Iterable, List, Optional
+import os
+import threading
+
+from sqlalchemy import Integer, String, any_, bindparam, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from app.cache import CacheLRU
+from app.ConsultaEstoque.model_estoque_snapshot import EstoqueSnapshot
+
+# Quantos códigos manter em memória e por quanto tempo.
+# A invalidação só alcança o worker que fez a escrita; nos demais a entrada vale até o TTL
+CACHE_CODIGO_BARRAS_TAMANHO = int(os.getenv("CACHE_CODIGO_BARRAS_TAMANHO", "10000"))
+CACHE_CODIGO_BARRAS_TTL_SECONDS = float(os.getenv("CACHE_CODIGO_BARRAS_TTL_SECONDS", "30"))
+
+# item_estoque_id -> codigo_barras das entradas em cache, para invalidar a partir das escritas
+_codigo_por_item = {}
+# Incrementada a cada invalidação: uma leitura iniciada antes dela não grava no cache
+_geracao = 0
+_lock_geracao = threading.Lock()
+
+def _ao_descartar(codigo_barras, item):
+    if _codigo_por_item.get(item["item_estoque_id"]) == codigo_barras:
+        del _codigo_por_item[item["item_estoque_id"]]
+
+_cache = CacheLRU("codigo_barras", CACHE_CODIGO_BARRAS_TAMANHO, CACHE_CODIGO_BARRAS_TTL_SECONDS, _ao_descartar)
+
+_COLUNAS_ITEM = [
+    EstoqueSnapshot.item_estoque_id,
+    EstoqueSnapshot.codigo_barras,
+    EstoqueSnapshot.produto_id,
+    EstoqueSnapshot.produto_nome,
+    EstoqueSnapshot.tipo_produto,
+    EstoqueSnapshot.preco,
+    EstoqueSnapshot.data_validade,
+    EstoqueSnapshot.lote,
+    EstoqueSnapshot.fornecedor_id,
+    EstoqueSnapshot.fornecedor_nome,
+    EstoqueSnapshot.armazem_id,
+    EstoqueSnapshot.armazem_local,
+    EstoqueSnapshot.quantidade_atual,
+    EstoqueSnapshot.quantidade_minima,
+]
+
+def _agrupar_itens(linhas) -> Dict[int, dict]:
+    """Linhas do snapshot (ordenadas por item e armazém) agrupadas no formato de ItemCodigoBarras"""
+    itens = {}
+    for linha in linhas:
+        item = itens.get(linha.item_estoque_id)
+        if item is None:
+            item = itens[linha.item_estoque_id] = {
+                "item_estoque_id": linha.item_estoque_id,
+                "codigo_barras": linha.codigo_barras,
+                "produto_id": linha.produto_id,
+                "produto_nome": linha.produto_nome,
+                "tipo_produto": linha.tipo_produto,
+                "preco": linha.preco,
+                "data_validade": linha.data_validade,
+                "lote": linha.lote,
+                "fornecedor_id": linha.fornecedor_id,
+                "fornecedor_nome": linha.fornecedor_nome,
+                "quantidade_total": 0,
+                "armazens": [],
+            }
+        item["armazens"].append({
+            "armazem_id": linha.armazem_id,
+            "armazem_local": linha.armazem_local,
+            "quantidade_atual": linha.quantidade_atual,
+            "quantidade_minima": linha.quantidade_minima,
+        })
+        item["quantidade_total"] += linha.quantidade_atual
+    return itens
+
+def _carregar_item(db: Session, codigo_barras: str) -> Optional[dict]:
+    """Item do código a partir do snapshot (índice em codigo_barras)"""
+    linhas = db.query(*_COLUNAS_ITEM).filter(
+        EstoqueSnapshot.codigo_barras == codigo_barras
+    ).order_by(EstoqueSnapshot.armazem_id).all()
+    return next(iter(_agrupar_itens(linhas).values()), None)
+
+def _guardar_no_cache(itens: Iterable[dict], geracao: int):
+    # Só grava se nenhuma escrita invalidou o cache enquanto a consulta rodava
+    with _lock_geracao:
+        if geracao != _geracao:
+            return
+        for item in itens:
+            _cache.gravar(item["codigo_barras"], item)
+            _codigo_por_item[item["item_estoque_id"]] = item["codigo_barras"]
+
+def buscar_por_codigo_barras(db: Session, codigo_barras: str) -> Optional[dict]:
+    """Item do código de barras no formato de ItemCodigoBarras; None se não estiver em nenhum armazém.
+
+    O dict devolvido é compartilhado com o cache e não deve ser alterado.
+    """
+    item = _cache.obter(codigo_barras)
+    if item is not None:
+        return item
+
+    geracao = _geracao
+    item = _carregar_item(db, codigo_barras)
+    if item is not None:
+        _guardar_no_cache([item], geracao)
+    return item
+
+def buscar_lote(db: Session, codigos_barras: List[str], item_estoque_ids: List[int]) -> dict:
+    """Vários itens de uma vez, no formato de ResultadoLoteEstoque.
+
+    Primeiro o cache; o que faltar vem de uma única consulta com
+    ``codigo_barras = ANY(:codigos) OR item_estoque_id = ANY(:ids)``.
+    Entradas não encontradas ficam com valor None e também são listadas à parte.
+    """
+    por_codigo = {codigo: _cache.obter(codigo) for codigo in dict.fromkeys(codigos_barras)}
+    por_item = {}
+    for item_estoque_id in dict.fromkeys(item_estoque_ids):
+        codigo = _codigo_por_item.get(item_estoque_id)
+        por_item[item_estoque_id] = _cache.obter(codigo) if codigo is not None else None
+
+    codigos_faltando = [codigo for codigo, item in por_codigo.items() if item is None]
+    ids_faltando = [item_estoque_id for item_estoque_id, item in por_item.items() if item is None]
+    if codigos_faltando or ids_faltando:
+        geracao = _geracao
+        condicoes = []
+        if codigos_faltando:
+            condicoes.append(EstoqueSnapshot.codigo_barras == any_(bindparam("codigos", codigos_faltando, type_=ARRAY(String))))
+        if ids_faltando:
+            condicoes.append(EstoqueSnapshot.item_estoque_id == any_(bindparam("ids", ids_faltando, type_=ARRAY(Integer))))
+        linhas = db.query(*_COLUNAS_ITEM).filter(or_(*condicoes)).order_by(
+            EstoqueSnapshot.item_estoque_id, EstoqueSnapshot.armazem_id
+        ).all()
+        encontrados = _agrupar_itens(linhas)
+        _guardar_no_cache(encontrados.values(), geracao)
+        por_codigo_encontrado = {item["codigo_barras"]: item for item in encontrados.values()}
+        for codigo in codigos_faltando:
+            por_codigo[codigo] = por_codigo_encontrado.get(codigo)
+        for item_estoque_id in ids_faltando:
+            por_item[item_estoque_id] = encontrados.get(item_estoque_id)
+
+    return {
+        "por_codigo_barras": por_codigo,
+        "por_item_estoque_id": por_item,
+        "codigos_barras_nao_encontrados": [codigo for codigo, item in por_codigo.items() if item is None],
+        "item_estoque_ids_nao_encontrados": [item_estoque_id for item_estoque_id, item in por_item.items() if item is None],
+    }
+
+def invalidar_itens(item_estoque_ids: Iterable[int] = (), codigos_barras: Iterable[str] = ()):
+    """Remove as entradas afetadas por uma escrita; chamar depois do commit"""
+    global _geracao
+    with _lock_geracao:
+        _geracao += 1
+        for item_estoque_id in item_estoque_ids:
+            codigo_barras = _codigo_por_item.get(item_estoque_id)
+            if codigo_barras is not None:
+                _cache.invalidar(codigo_barras)
+        for codigo_barras in codigos_barras:
+            _cache.invalidar(codigo_barras)
+
+def invalidar_todos():
+    """Esvazia o cache (alterações de fornecedor ou armazém atingem muitos itens)"""
+    global _geracao
+    with _lock_geracao:
+        _geracao += 1
+        _cache.limpar()
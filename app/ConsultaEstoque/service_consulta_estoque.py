@@ -1,218 +1,353 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, case, cast, Date
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, func, case, tuple_, distinct
 from typing import List, Optional
 from datetime import datetime, timedelta, date
-import logging
+import os
 
 from app.ConsultaEstoque.schema_consulta_estoque import (
     ConsultaEstoqueRead, 
     FiltroConsultaEstoque, 
     ResumoEstoque, 
-    EstoqueDetalhado,
     StatusEstoque,
-    TipoProduto
+    TipoProduto,
+    OrdenacaoConsultaEstoque,
+    AgrupamentoResumoEstoque,
+    ResumoEstoqueGrupo
 )
-from app.ItemEstoque.model_item_estoque import ItemEstoque
-from app.ItemArmazenado.model_item_armazenado import ItemArmazenado
-from app.Armazem.model_armazem import Armazem
-from app.Fornecedor.model_fornecedor import Fornecedor
-from app.Medicamento.model_medicamento import Medicamento
-from app.CuidadoPessoal.model_cuidado_pessoal import CuidadoPessoal
-from app.SuplementoAlimentar.model_suplemento_alimentar import SuplementoAlimentar
+from app.paginacao import codificar_cursor, decodificar_cursor
+from app.busca import ModoBusca, condicao_busca, relevancia
+from app.cache import CacheLRU
+from app.settings import sessao_na_replica
+from app.ConsultaEstoque.model_estoque_snapshot import EstoqueSnapshot
 
-def _determinar_status(quantidade_atual: int, quantidade_minima: int, dias_para_vencimento: int) -> StatusEstoque:
-    """Determina o status do item baseado nas regras de negócio"""
-    hoje = date.today()
-    
-    # Produto vencido
-    if dias_para_vencimento < 0:
-        return StatusEstoque.VENCIDO
-    
-    # Produto próximo do vencimento (30 dias)
-    if dias_para_vencimento <= 30:
-        return StatusEstoque.PROXIMO_VENCIMENTO
-    
-    # Estoque crítico (quantidade = 0)
-    if quantidade_atual == 0:
-        return StatusEstoque.ESTOQUE_CRITICO
-    
-    # Estoque baixo (quantidade <= mínima)
-    if quantidade_atual <= quantidade_minima:
-        return StatusEstoque.ESTOQUE_BAIXO
-    
-    return StatusEstoque.NORMAL
+# Resumos já calculados, por filtros + versão dos dados (app/versao_estoque.py)
+_cache_resumo = CacheLRU(
+    "resumo_estoque",
+    int(os.getenv("CACHE_RESUMO_ESTOQUE_TAMANHO", "256")),
+    float(os.getenv("CACHE_RESUMO_ESTOQUE_TTL_SECONDS", "300")),
+)
 
-def consultar_estoque(db: Session, filtros: FiltroConsultaEstoque = None, skip: int = 0, limit: int = 100) -> List[ConsultaEstoqueRead]:
-    """Consulta o estoque com filtros aplicados"""
-    
-    # Query base com joins
-    query = db.query(
-        ItemEstoque.id.label('item_estoque_id'),
-        ItemEstoque.produto_id,
-        ItemEstoque.produto_nome,
-        ItemEstoque.tipo_produto,
-        ItemEstoque.codigo_barras,
-        ItemEstoque.preco,
-        ItemEstoque.data_validade,
-        ItemEstoque.lote,
-        ItemEstoque.fornecedor_id,
-        Fornecedor.nome.label('fornecedor_nome'),
-        ItemArmazenado.armazem_id,
-        Armazem.local_armazem.label('armazem_local'),
-        ItemArmazenado.quantidade.label('quantidade_atual'),
-        Armazem.quantidade_minima,
-        # Calcular dias para vencimento: converte timestamp para date e subtrai current_date (resulta em integer)
-        (cast(ItemEstoque.data_validade, Date) - func.current_date()).label('dias_para_vencimento')
-    ).join(
-        ItemArmazenado, ItemEstoque.id == ItemArmazenado.item_estoque_id
-    ).join(
-        Armazem, ItemArmazenado.armazem_id == Armazem.id
-    ).join(
-        Fornecedor, ItemEstoque.fornecedor_id == Fornecedor.id
+# Dias para vencimento: date - current_date resulta em integer
+_DIAS_PARA_VENCIMENTO = EstoqueSnapshot.data_validade - func.current_date()
+_LIMITE_PROXIMO_VENCIMENTO = 30
+
+# Status calculado no banco, na mesma ordem de prioridade das regras de negócio
+_STATUS_ESTOQUE = case(
+    (_DIAS_PARA_VENCIMENTO < 0, StatusEstoque.VENCIDO.value),
+    (_DIAS_PARA_VENCIMENTO <= _LIMITE_PROXIMO_VENCIMENTO, StatusEstoque.PROXIMO_VENCIMENTO.value),
+    (EstoqueSnapshot.quantidade_atual == 0, StatusEstoque.ESTOQUE_CRITICO.value),
+    (EstoqueSnapshot.quantidade_atual <= EstoqueSnapshot.quantidade_minima, StatusEstoque.ESTOQUE_BAIXO.value),
+    else_=StatusEstoque.NORMAL.value
+)
+
+def _condicao_status(status: StatusEstoque):
+    """Predicado equivalente a ``_STATUS_ESTOQUE == status`` escrito sobre as colunas.
+
+    Ao contrário do CASE, compara data_validade e quantidade diretamente, então
+    o planejador pode usar os índices dessas colunas.
+    """
+    hoje = func.current_date()
+    limite_vencimento = hoje + _LIMITE_PROXIMO_VENCIMENTO
+    if status == StatusEstoque.VENCIDO:
+        return EstoqueSnapshot.data_validade < hoje
+    if status == StatusEstoque.PROXIMO_VENCIMENTO:
+        return and_(EstoqueSnapshot.data_validade >= hoje, EstoqueSnapshot.data_validade <= limite_vencimento)
+    # Os demais status só valem para itens fora da janela de vencimento
+    fora_do_vencimento = EstoqueSnapshot.data_validade > limite_vencimento
+    if status == StatusEstoque.ESTOQUE_CRITICO:
+        return and_(fora_do_vencimento, EstoqueSnapshot.quantidade_atual == 0)
+    if status == StatusEstoque.ESTOQUE_BAIXO:
+        return and_(
+            fora_do_vencimento,
+            EstoqueSnapshot.quantidade_atual > 0,
+            EstoqueSnapshot.quantidade_atual <= EstoqueSnapshot.quantidade_minima
+        )
+    return and_(
+        fora_do_vencimento,
+        EstoqueSnapshot.quantidade_atual > 0,
+        EstoqueSnapshot.quantidade_atual > EstoqueSnapshot.quantidade_minima
     )
+
+def _colunas_consulta() -> list:
+    """Colunas de ConsultaEstoqueRead, lidas de estoque_snapshot"""
+    return [
+        EstoqueSnapshot.item_estoque_id,
+        EstoqueSnapshot.produto_id,
+        EstoqueSnapshot.produto_nome,
+        EstoqueSnapshot.tipo_produto,
+        EstoqueSnapshot.codigo_barras,
+        EstoqueSnapshot.preco,
+        EstoqueSnapshot.data_validade,
+        EstoqueSnapshot.lote,
+        EstoqueSnapshot.fornecedor_id,
+        EstoqueSnapshot.fornecedor_nome,
+        EstoqueSnapshot.armazem_id,
+        EstoqueSnapshot.armazem_local,
+        EstoqueSnapshot.quantidade_atual,
+        EstoqueSnapshot.quantidade_minima,
+        _DIAS_PARA_VENCIMENTO.label('dias_para_vencimento'),
+        _STATUS_ESTOQUE.label('status')
+    ]
+
+def _montar_consulta_estoque(db: Session, filtros: FiltroConsultaEstoque = None):
+    """Query base da consulta de estoque (snapshot + filtros), sem ordenação nem paginação"""
+    
+    # Uma única tabela: os dados de item, fornecedor e armazém já estão no snapshot
+    query = db.query(*_colunas_consulta())
     
-    # Aplicar filtros se fornecidos
+    return _aplicar_filtros_estoque(query, filtros)
+
+def _aplicar_filtros_estoque(query, filtros: FiltroConsultaEstoque = None):
+    """Aplica os filtros da consulta sobre as colunas de estoque_snapshot"""
     if filtros:
-        # Filtro por nome do produto
+        # Filtro por nome do produto (índice de trigramas, sem diferenciar acentos)
         if filtros.produto_nome:
-            query = query.filter(ItemEstoque.produto_nome.ilike(f"%{filtros.produto_nome}%"))
+            query = query.filter(condicao_busca([EstoqueSnapshot.produto_nome], filtros.produto_nome, filtros.modo_busca))
         
         # Filtro por código de barras
         if filtros.codigo_barras:
-            query = query.filter(ItemEstoque.codigo_barras == filtros.codigo_barras)
+            query = query.filter(EstoqueSnapshot.codigo_barras == filtros.codigo_barras)
         
         # Filtro por tipo de produto
         if filtros.tipo_produto:
-            query = query.filter(ItemEstoque.tipo_produto == filtros.tipo_produto.value)
+            query = query.filter(EstoqueSnapshot.tipo_produto == filtros.tipo_produto.value)
         
         # Filtro por fornecedor
         if filtros.fornecedor_id:
-            query = query.filter(ItemEstoque.fornecedor_id == filtros.fornecedor_id)
+            query = query.filter(EstoqueSnapshot.fornecedor_id == filtros.fornecedor_id)
         
         # Filtro por armazém
         if filtros.armazem_id:
-            query = query.filter(ItemArmazenado.armazem_id == filtros.armazem_id)
+            query = query.filter(EstoqueSnapshot.armazem_id == filtros.armazem_id)
         
         # Filtro de produtos vencidos
         if filtros.vencidos:
-            query = query.filter(ItemEstoque.data_validade < func.current_date())
+            query = query.filter(EstoqueSnapshot.data_validade < func.current_date())
         
         # Filtro por dias para vencimento
         if filtros.dias_vencimento is not None:
             data_limite = datetime.now().date() + timedelta(days=filtros.dias_vencimento)
-            query = query.filter(ItemEstoque.data_validade <= data_limite)
+            query = query.filter(EstoqueSnapshot.data_validade <= data_limite)
         
         # Filtro de estoque baixo
         if filtros.estoque_baixo:
-            query = query.filter(ItemArmazenado.quantidade <= Armazem.quantidade_minima)
+            query = query.filter(EstoqueSnapshot.quantidade_atual <= EstoqueSnapshot.quantidade_minima)
         
         # Filtro de estoque crítico
         if filtros.estoque_critico:
-            query = query.filter(ItemArmazenado.quantidade == 0)
+            query = query.filter(EstoqueSnapshot.quantidade_atual == 0)
         
         # Filtro por quantidade mínima
         if filtros.quantidade_min is not None:
-            query = query.filter(ItemArmazenado.quantidade >= filtros.quantidade_min)
+            query = query.filter(EstoqueSnapshot.quantidade_atual >= filtros.quantidade_min)
         
         # Filtro por quantidade máxima
         if filtros.quantidade_max is not None:
-            query = query.filter(ItemArmazenado.quantidade <= filtros.quantidade_max)
-    
-    # Aplicar paginação
-    resultados = query.offset(skip).limit(limit).all()
+            query = query.filter(EstoqueSnapshot.quantidade_atual <= filtros.quantidade_max)
+        
+        # Filtro por status: aplicado no banco, antes da paginação
+        if filtros.status:
+            query = query.filter(or_(*[_condicao_status(status) for status in filtros.status]))
     
-    # Converter para o schema de resposta
+    return query
+
+def _linhas_para_itens(resultados) -> List[dict]:
+    """Converte as linhas do banco para o formato de ConsultaEstoqueRead"""
     itens_estoque = []
-    hoje = date.today()
     
     for resultado in resultados:
         dias_para_vencimento = resultado.dias_para_vencimento
-        status = _determinar_status(
-            resultado.quantidade_atual, 
-            resultado.quantidade_minima, 
-            dias_para_vencimento
-        )
-        
-        # Se há filtro de status específico, aplicar
-        if filtros and filtros.status and status not in filtros.status:
-            continue
-        
-        item = ConsultaEstoqueRead(
-            item_estoque_id=resultado.item_estoque_id,
-            produto_id=resultado.produto_id,
-            produto_nome=resultado.produto_nome,
-            tipo_produto=TipoProduto(resultado.tipo_produto),
-            codigo_barras=resultado.codigo_barras,
-            preco=resultado.preco,
-            data_validade=resultado.data_validade,
-            lote=resultado.lote,
-            fornecedor_id=resultado.fornecedor_id,
-            fornecedor_nome=resultado.fornecedor_nome,
-            armazem_id=resultado.armazem_id,
-            armazem_local=resultado.armazem_local,
-            quantidade_atual=resultado.quantidade_atual,
-            quantidade_minima=resultado.quantidade_minima,
-            status=status,
-            dias_para_vencimento=int(dias_para_vencimento) if dias_para_vencimento is not None else None
-        )
+        item = resultado._asdict()
+        item["tipo_produto"] = TipoProduto(resultado.tipo_produto)
+        item["status"] = StatusEstoque(resultado.status)
+        item["dias_para_vencimento"] = int(dias_para_vencimento) if dias_para_vencimento is not None else None
         itens_estoque.append(item)
     
     return itens_estoque
 
-def gerar_resumo_estoque(db: Session) -> ResumoEstoque:
-    """Gera resumo geral do estoque"""
+def consultar_estoque_linhas(db: Session, filtros: FiltroConsultaEstoque = None, skip: int = 0, limit: int = 100) -> List[dict]:
+    """Consulta o estoque com filtros aplicados, devolvendo dicts prontos para serialização.
+
+    As linhas vêm do banco já no formato de ConsultaEstoqueRead; as rotas as
+    serializam direto com orjson, sem instanciar nem validar um modelo por linha.
+    """
+    query = _montar_consulta_estoque(db, filtros)
+    
+    # Na busca por relevância os nomes mais parecidos vêm primeiro
+    if filtros and filtros.produto_nome and filtros.modo_busca == ModoBusca.RELEVANCIA:
+        query = query.order_by(relevancia([EstoqueSnapshot.produto_nome], filtros.produto_nome).desc())
     
-    # Consultar todos os itens para calcular estatísticas
-    todos_itens = consultar_estoque(db, limit=10000)  # Limite alto para pegar todos
+    # Ordem estável para que as páginas não se sobreponham
+    resultados = query.order_by(
+        EstoqueSnapshot.item_estoque_id, EstoqueSnapshot.armazem_id
+    ).offset(skip).limit(limit).all()
+    
+    return _linhas_para_itens(resultados)
+
+def consultar_estoque_por_produto(db: Session, produto_id: int, tipo_produto: Optional[TipoProduto] = None) -> List[dict]:
+    """Linhas de estoque de um produto em todos os armazéns (índice em produto_id, tipo_produto).
+
+    Cada tipo de produto tem a sua própria sequência de ids; informe tipo_produto
+    para não misturar, por exemplo, o medicamento 5 com o suplemento 5.
+    """
+    query = _montar_consulta_estoque(db).filter(EstoqueSnapshot.produto_id == produto_id)
+    if tipo_produto:
+        query = query.filter(EstoqueSnapshot.tipo_produto == tipo_produto.value)
+    resultados = query.order_by(EstoqueSnapshot.item_estoque_id, EstoqueSnapshot.armazem_id).all()
+    return _linhas_para_itens(resultados)
+
+def consultar_estoque_por_item_estoque(db: Session, item_estoque_id: int) -> List[dict]:
+    """Linhas de estoque de um item em todos os armazéns (prefixo da chave primária do snapshot)"""
+    resultados = _montar_consulta_estoque(db).filter(
+        EstoqueSnapshot.item_estoque_id == item_estoque_id
+    ).order_by(EstoqueSnapshot.armazem_id).all()
+    return _linhas_para_itens(resultados)
+
+# Chave de ordenação de cada opção; (item_estoque_id, armazem_id) desempata e identifica a linha
+_COLUNAS_ORDENACAO = {
+    OrdenacaoConsultaEstoque.ITEM_ESTOQUE: [],
+    OrdenacaoConsultaEstoque.DATA_VALIDADE: [EstoqueSnapshot.data_validade],
+    OrdenacaoConsultaEstoque.PRODUTO_NOME: [EstoqueSnapshot.produto_nome],
+}
+
+def consultar_estoque_por_cursor(
+    db: Session,
+    filtros: FiltroConsultaEstoque = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    ordenar_por: OrdenacaoConsultaEstoque = OrdenacaoConsultaEstoque.ITEM_ESTOQUE,
+) -> dict:
+    """Página da consulta de estoque por keyset, no formato de PaginaConsultaEstoque.
+
+    Em vez de OFFSET, filtra as linhas depois da última chave vista, então o
+    custo de cada página não depende da profundidade.
+    """
+    colunas = _COLUNAS_ORDENACAO[ordenar_por] + [EstoqueSnapshot.item_estoque_id, EstoqueSnapshot.armazem_id]
+    query = _montar_consulta_estoque(db, filtros)
     
-    total_itens = len(todos_itens)
-    produtos_diferentes = len(set(item.produto_id for item in todos_itens))
+    if cursor:
+        valores = decodificar_cursor(cursor, ordenar_por.value)
+        if len(valores) != len(colunas) or not all(isinstance(v, int) for v in valores[-2:]):
+            raise HTTPException(status_code=400, detail="Cursor inválido para esta ordenação")
+        if ordenar_por == OrdenacaoConsultaEstoque.DATA_VALIDADE:
+            try:
+                valores[0] = date.fromisoformat(valores[0])
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Cursor inválido para esta ordenação")
+        query = query.filter(tuple_(*colunas) > tuple_(*valores))
     
-    # Contar por status
-    vencidos = sum(1 for item in todos_itens if item.status == StatusEstoque.VENCIDO)
-    proximo_vencimento = sum(1 for item in todos_itens if item.status == StatusEstoque.PROXIMO_VENCIMENTO)
-    estoque_baixo = sum(1 for item in todos_itens if item.status == StatusEstoque.ESTOQUE_BAIXO)
-    estoque_critico = sum(1 for item in todos_itens if item.status == StatusEstoque.ESTOQUE_CRITICO)
+    # Uma linha a mais só para saber se existe próxima página
+    resultados = query.order_by(*colunas).limit(limit + 1).all()
+    tem_proxima = len(resultados) > limit
+    resultados = resultados[:limit]
     
-    # Calcular valor total
-    valor_total = sum(item.preco * item.quantidade_atual for item in todos_itens)
+    next_cursor = None
+    if tem_proxima:
+        ultima = resultados[-1]
+        valores = [getattr(ultima, coluna.key) for coluna in _COLUNAS_ORDENACAO[ordenar_por]]
+        next_cursor = codificar_cursor(valores + [ultima.item_estoque_id, ultima.armazem_id], ordenar_por.value)
     
-    return ResumoEstoque(
-        total_itens=total_itens,
-        total_produtos_diferentes=produtos_diferentes,
-        produtos_vencidos=vencidos,
-        produtos_proximo_vencimento=proximo_vencimento,
-        produtos_estoque_baixo=estoque_baixo,
-        produtos_estoque_critico=estoque_critico,
-        valor_total_estoque=valor_total
-    )
+    return {
+        "itens": _linhas_para_itens(resultados),
+        "next_cursor": next_cursor
+    }
 
-def consultar_estoque_detalhado(db: Session, filtros: FiltroConsultaEstoque = None, skip: int = 0, limit: int = 100) -> EstoqueDetalhado:
-    """Consulta detalhada do estoque com resumo"""
+def consultar_estoque(db: Session, filtros: FiltroConsultaEstoque = None, skip: int = 0, limit: int = 100) -> List[ConsultaEstoqueRead]:
+    """Consulta o estoque com filtros aplicados"""
+    # Linhas vindas do banco já têm os tipos certos: model_construct evita revalidar cada uma
+    return [ConsultaEstoqueRead.model_construct(**item) for item in consultar_estoque_linhas(db, filtros, skip, limit)]
+
+def _colunas_resumo() -> list:
+    """Agregados do resumo: uma passada sobre as linhas, memória constante"""
+    return [
+        func.count().label('total_itens'),
+        func.count(distinct(EstoqueSnapshot.produto_id)).label('total_produtos_diferentes'),
+        func.count().filter(_condicao_status(StatusEstoque.VENCIDO)).label('produtos_vencidos'),
+        func.count().filter(_condicao_status(StatusEstoque.PROXIMO_VENCIMENTO)).label('produtos_proximo_vencimento'),
+        func.count().filter(_condicao_status(StatusEstoque.ESTOQUE_BAIXO)).label('produtos_estoque_baixo'),
+        func.count().filter(_condicao_status(StatusEstoque.ESTOQUE_CRITICO)).label('produtos_estoque_critico'),
+        func.coalesce(func.sum(EstoqueSnapshot.preco * EstoqueSnapshot.quantidade_atual), 0).label('valor_total_estoque'),
+    ]
+
+def _consulta_resumo(db: Session, colunas_grupo: list, filtros: FiltroConsultaEstoque = None):
+    query = db.query(*colunas_grupo, *_colunas_resumo()).select_from(EstoqueSnapshot)
+    return _aplicar_filtros_estoque(query, filtros)
+
+def gerar_resumo_estoque(db: Session, filtros: FiltroConsultaEstoque = None) -> ResumoEstoque:
+    """Gera resumo geral do estoque com uma única consulta agregada"""
+    resultado = _consulta_resumo(db, [], filtros).one()
+    return ResumoEstoque(**resultado._asdict())
+
+def gerar_resumo_estoque_agrupado(
+    db: Session,
+    agrupar_por: AgrupamentoResumoEstoque,
+    filtros: FiltroConsultaEstoque = None,
+) -> List[ResumoEstoqueGrupo]:
+    """Resumo do estoque por armazém ou por tipo de produto (GROUP BY no banco)"""
+    if agrupar_por == AgrupamentoResumoEstoque.ARMAZEM:
+        colunas_grupo = [EstoqueSnapshot.armazem_id, EstoqueSnapshot.armazem_local]
+    else:
+        colunas_grupo = [EstoqueSnapshot.tipo_produto]
     
-    resumo = gerar_resumo_estoque(db)
-    itens = consultar_estoque(db, filtros, skip, limit)
+    resultados = _consulta_resumo(db, colunas_grupo, filtros).group_by(*colunas_grupo).order_by(*colunas_grupo).all()
+    return [ResumoEstoqueGrupo(**resultado._asdict()) for resultado in resultados]
+
+def gerar_resumo_estoque_em_cache(db: Session, filtros: FiltroConsultaEstoque = None, versao: Optional[int] = None) -> ResumoEstoque:
+    """gerar_resumo_estoque reaproveitado entre requisições enquanto os dados não mudam.
+
+    A chave é o conjunto de filtros (JSON canônico), a versão dos dados de
+    estoque e a data: qualquer escrita gera uma versão nova e a virada do dia
+    muda vencidos e próximos do vencimento. Sem versão, calcula direto.
+    A versão vem do primário: um resumo calculado na réplica (possivelmente
+    atrasada) é devolvido, mas não entra no cache com essa versão.
+    """
+    if versao is None:
+        return gerar_resumo_estoque(db, filtros)
+    chave = (filtros.model_dump_json(exclude_defaults=True) if filtros else "", versao, date.today())
+    resumo = _cache_resumo.obter(chave)
+    if resumo is None:
+        resumo = gerar_resumo_estoque(db, filtros)
+        if not sessao_na_replica(db):
+            _cache_resumo.gravar(chave, resumo)
+    return resumo
+
+def consultar_estoque_detalhado(
+    db: Session,
+    filtros: FiltroConsultaEstoque = None,
+    skip: int = 0,
+    limit: int = 100,
+    versao: Optional[int] = None,
+    incluir_resumo: bool = True,
+) -> dict:
+    """Consulta detalhada do estoque com resumo (no formato de EstoqueDetalhado).
+
+    O resumo é do estoque inteiro e não depende da página: vem do cache, e
+    quem só pagina pode dispensá-lo com ``incluir_resumo=False``.
+    """
     
-    return EstoqueDetalhado(
-        resumo=resumo,
-        itens=itens
-    )
+    resumo = gerar_resumo_estoque_em_cache(db, None, versao) if incluir_resumo else None
+    itens = consultar_estoque_linhas(db, filtros, skip, limit)
+    
+    return {
+        "resumo": resumo,
+        "itens": itens
+    }
 
-def consultar_produtos_vencidos(db: Session, dias_limite: int = 0) -> List[ConsultaEstoqueRead]:
+def consultar_produtos_vencidos(db: Session, dias_limite: int = 0) -> List[dict]:
     """Consulta produtos vencidos ou próximos do vencimento"""
     
     filtros = FiltroConsultaEstoque(
         dias_vencimento=dias_limite
     )
     
-    return consultar_estoque(db, filtros)
+    return consultar_estoque_linhas(db, filtros)
 
-def consultar_estoque_critico(db: Session) -> List[ConsultaEstoqueRead]:
+def consultar_estoque_critico(db: Session) -> List[dict]:
     """Consulta itens com estoque crítico ou baixo"""
     
     filtros = FiltroConsultaEstoque(
         status=[StatusEstoque.ESTOQUE_CRITICO, StatusEstoque.ESTOQUE_BAIXO]
     )
     
-    return consultar_estoque(db, filtros)
+    return consultar_estoque_linhas(db, filtros)
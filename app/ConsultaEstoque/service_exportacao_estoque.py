@@ -0,0 +1,43 @@
+# Exportação da posição completa de estoque em NDJSON (uma linha JSON por item e armazém)
+from typing import AsyncIterator
+import os
+
+from sqlalchemy import select
+
+from app.ConsultaEstoque.model_estoque_snapshot import EstoqueSnapshot
+from app.ConsultaEstoque.schema_consulta_estoque import FiltroConsultaEstoque
+from app.ConsultaEstoque.service_consulta_estoque import (
+    _aplicar_filtros_estoque,
+    _colunas_consulta,
+    _linhas_para_itens,
+)
+from app.serializacao import serializar
+from app.settings import fabrica_sessao_leitura_async, timeout_relatorio
+
+# Linhas buscadas do cursor do servidor a cada FETCH; também é o tamanho de cada bloco enviado
+EXPORTACAO_LINHAS_POR_LOTE = int(os.getenv("EXPORTACAO_LINHAS_POR_LOTE", "2000"))
+
+def montar_consulta_exportacao(filtros: FiltroConsultaEstoque = None):
+    """Mesmas colunas e filtros da consulta de estoque, na ordem da chave primária do snapshot"""
+    consulta = select(*_colunas_consulta())
+    return _aplicar_filtros_estoque(consulta, filtros).order_by(
+        EstoqueSnapshot.item_estoque_id, EstoqueSnapshot.armazem_id
+    )
+
+async def exportar_estoque_ndjson(filtros: FiltroConsultaEstoque = None) -> AsyncIterator[bytes]:
+    """Gera o NDJSON lote a lote a partir de um cursor no servidor.
+
+    A sessão é aberta aqui, e não por dependência, porque precisa viver
+    enquanto a resposta é enviada. Só um lote fica em memória por vez; se o
+    cliente desconectar, o gerador é cancelado e a sessão fecha o cursor.
+    """
+    # Cada FETCH é uma instrução: vale o timeout de relatório, não o de PDV
+    await timeout_relatorio()
+    fabrica = await fabrica_sessao_leitura_async()
+    async with fabrica() as db:
+        resultado = await db.stream(
+            montar_consulta_exportacao(filtros),
+            execution_options={"yield_per": EXPORTACAO_LINHAS_POR_LOTE},
+        )
+        async for lote in resultado.partitions():
+            yield b"".join(serializar(item) + b"\n" for item in _linhas_para_itens(lote))
@@ -0,0 +1,110 @@
+# Manutenção da tabela estoque_snapshot a partir de item_estoque, item_armazenado, armazem e fornecedor
+from typing import Iterable, Optional
+import logging
+
+from sqlalchemy import and_, cast, Date, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.ConsultaEstoque.model_estoque_snapshot import EstoqueSnapshot
+from app.ItemEstoque.model_item_estoque import ItemEstoque
+from app.ItemArmazenado.model_item_armazenado import ItemArmazenado
+from app.Armazem.model_armazem import Armazem
+from app.Fornecedor.model_fornecedor import Fornecedor
+from app.ConsultaEstoque.service_codigo_barras import invalidar_todos
+from app.versao_estoque import incrementar_versao_estoque
+
+logger = logging.getLogger(__name__)
+
+# Colunas do snapshot, na ordem do SELECT de origem
+_COLUNAS = [
+    "item_estoque_id", "armazem_id", "produto_id", "produto_nome", "tipo_produto",
+    "codigo_barras", "preco", "data_validade", "lote", "fornecedor_id", "fornecedor_nome",
+    "armazem_local", "quantidade_atual", "quantidade_minima", "atualizado_em",
+]
+
+def _select_origem():
+    """O mesmo join de quatro tabelas que as consultas faziam, uma linha por item e armazém"""
+    return select(
+        ItemArmazenado.item_estoque_id,
+        ItemArmazenado.armazem_id,
+        ItemEstoque.produto_id,
+        ItemEstoque.produto_nome,
+        ItemEstoque.tipo_produto,
+        ItemEstoque.codigo_barras,
+        ItemEstoque.preco,
+        cast(ItemEstoque.data_validade, Date),
+        ItemEstoque.lote,
+        ItemEstoque.fornecedor_id,
+        Fornecedor.nome,
+        Armazem.local_armazem,
+        ItemArmazenado.quantidade,
+        Armazem.quantidade_minima,
+        func.now(),
+    ).join(
+        ItemEstoque, ItemArmazenado.item_estoque_id == ItemEstoque.id
+    ).join(
+        Armazem, ItemArmazenado.armazem_id == Armazem.id
+    ).join(
+        Fornecedor, ItemEstoque.fornecedor_id == Fornecedor.id
+    )
+
+def _upsert(db: Session, *condicoes) -> int:
+    origem = _select_origem()
+    if condicoes:
+        origem = origem.where(and_(*condicoes))
+    instrucao = insert(EstoqueSnapshot).from_select(_COLUNAS, origem)
+    instrucao = instrucao.on_conflict_do_update(
+        index_elements=[EstoqueSnapshot.item_estoque_id, EstoqueSnapshot.armazem_id],
+        set_={coluna: instrucao.excluded[coluna] for coluna in _COLUNAS[2:]},
+    )
+    return db.execute(instrucao).rowcount
+
+def sincronizar_snapshot(
+    db: Session,
+    item_estoque_ids: Optional[Iterable[int]] = None,
+    armazem_ids: Optional[Iterable[int]] = None,
+    fornecedor_ids: Optional[Iterable[int]] = None,
+) -> int:
+    """Regrava as linhas do snapshot afetadas por uma escrita, sem fazer commit.
+
+    Deve ser chamado antes do commit do serviço que alterou as tabelas de
+    origem, para que snapshot e origem mudem na mesma transação. Os filtros
+    se combinam com AND; sem nenhum, todas as linhas são regravadas.
+    """
+    # A sessão não usa autoflush: as alterações pendentes precisam chegar ao banco antes do SELECT
+    db.flush()
+    condicoes = []
+    if item_estoque_ids is not None:
+        condicoes.append(ItemArmazenado.item_estoque_id.in_(list(item_estoque_ids)))
+    if armazem_ids is not None:
+        condicoes.append(ItemArmazenado.armazem_id.in_(list(armazem_ids)))
+    if fornecedor_ids is not None:
+        condicoes.append(ItemEstoque.fornecedor_id.in_(list(fornecedor_ids)))
+    return _upsert(db, *condicoes)
+
+def reconstruir_snapshot(db: Session) -> dict:
+    """Corrige qualquer divergência: remove linhas órfãs e regrava todas as demais.
+
+    Não usa TRUNCATE, para não bloquear as leituras durante a reconstrução.
+    """
+    removidas = db.query(EstoqueSnapshot).filter(
+        ~tuple_(EstoqueSnapshot.item_estoque_id, EstoqueSnapshot.armazem_id).in_(
+            select(ItemArmazenado.item_estoque_id, ItemArmazenado.armazem_id)
+        )
+    ).delete(synchronize_session=False)
+    gravadas = _upsert(db)
+    db.commit()
+    invalidar_todos()
+    incrementar_versao_estoque(db)
+    logger.info("Snapshot de estoque reconstruído: %d linhas gravadas, %d removidas", gravadas, removidas)
+    return {"linhas_gravadas": gravadas, "linhas_removidas": removidas}
+
+if __name__ == "__main__":
+    import app.main  # noqa: F401 - registra todos os mapeamentos antes de consultar
+    from app.settings import SessionLocal, usar_timeout_manutencao
+
+    logging.basicConfig(level=logging.INFO)
+    usar_timeout_manutencao()
+    with SessionLocal() as sessao:
+        print(reconstruir_snapshot(sessao))
@@ -2,6 +2,9 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from app.Fornecedor.model_fornecedor import Fornecedor
 from app.Fornecedor.schema_fornecedor import FornecedorCreate
+from app.ConsultaEstoque.service_snapshot_estoque import sincronizar_snapshot
+from app.ConsultaEstoque.service_codigo_barras import invalidar_todos
+from app.versao_estoque import incrementar_versao_estoque
 
 def create_fornecedor(db: Session, fornecedor: FornecedorCreate):
     # Verifica se CNPJ já existe
@@ -37,7 +40,11 @@ def update_fornecedor(db: Session, id: int, fornecedor: FornecedorCreate):
         
     for key, value in fornecedor.dict().items():
         setattr(db_fornecedor, key, value)
+    # O nome do fornecedor é copiado em estoque_snapshot
+    sincronizar_snapshot(db, fornecedor_ids=[id])
     db.commit()
+    invalidar_todos()
+    incrementar_versao_estoque(db)
     db.refresh(db_fornecedor)
     return db_fornecedor
 
@@ -0,0 +1 @@
+# Módulo de Histórico de Estoque (posição em uma data passada)
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, TIMESTAMP, ForeignKey
+from app.settings import Base
+
+class EstoqueCheckpoint(Base):
+    """Cópia de item_armazenado em um instante; base para reconstruir o estoque em datas passadas"""
+    __tablename__ = "estoque_checkpoint"
+
+    momento = Column(TIMESTAMP, primary_key=True)
+    item_estoque_id = Column(Integer, ForeignKey('item_estoque.id', ondelete='CASCADE'), primary_key=True)
+    armazem_id = Column(Integer, ForeignKey('armazem.id', ondelete='CASCADE'), primary_key=True)
+    quantidade = Column(Integer, nullable=False)
@@ -0,0 +1,27 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.settings import get_async_db, get_async_db_readonly, executar_cancelavel, timeout_relatorio
+from app.HistoricoEstoque.schema_historico_estoque import PosicaoEstoqueHistorico, CheckpointRegistrado
+from app.HistoricoEstoque import service_historico_estoque
+from app.serializacao import RespostaORJSON
+
+router = APIRouter(prefix="/historico-estoque", tags=["Histórico de Estoque"])
+
+@router.get("/posicao", response_model=PosicaoEstoqueHistorico, dependencies=[Depends(timeout_relatorio)])
+async def get_posicao_estoque(
+    request: Request,
+    momento: datetime = Query(..., description="Instante consultado (ex.: 2025-03-31T23:59:59)"),
+    armazem_id: int = Query(None, description="Filtrar por armazém"),
+    item_estoque_id: int = Query(None, description="Filtrar por item de estoque"),
+    db: AsyncSession = Depends(get_async_db_readonly),
+):
+    """Quantidade de cada item em cada armazém no instante informado (auditoria, fechamento)"""
+    return RespostaORJSON(await executar_cancelavel(
+        request, db, service_historico_estoque.reconstruir_posicao, momento, armazem_id, item_estoque_id
+    ))
+
+@router.post("/checkpoint", response_model=CheckpointRegistrado, dependencies=[Depends(timeout_relatorio)])
+async def registrar_checkpoint_estoque(db: AsyncSession = Depends(get_async_db)):
+    """Registrar agora um checkpoint das quantidades (normalmente feito por make checkpoint-estoque)"""
+    return await db.run_sync(service_historico_estoque.registrar_checkpoint)
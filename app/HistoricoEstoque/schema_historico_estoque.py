@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class PosicaoItemHistorico(BaseModel):
+    item_estoque_id: int
+    armazem_id: int
+    quantidade: int
+
+class PosicaoEstoqueHistorico(BaseModel):
+    momento: datetime = Field(description="Instante consultado")
+    checkpoint_utilizado: Optional[datetime] = Field(
+        None, description="Checkpoint de partida; vazio quando não há nenhum e todo o histórico é somado"
+    )
+    movimentacoes_aplicadas: int = Field(description="Movimentações gravadas entre o checkpoint e o instante consultado")
+    itens: List[PosicaoItemHistorico]
+
+class CheckpointRegistrado(BaseModel):
+    momento: datetime
+    linhas: int
@@ -0,0 +1,136 @@
+# Posição de estoque em uma data passada: checkpoint mais próximo + movimentações desde então
+from datetime import datetime
+from typing import Optional
+import logging
+
+from sqlalchemy import and_, case, cast, func, literal, select, text, TIMESTAMP
+from sqlalchemy.orm import Session
+
+from app.HistoricoEstoque.model_historico_estoque import EstoqueCheckpoint
+from app.ItemArmazenado.model_item_armazenado import ItemArmazenado
+from app.MovimentacaoEstoque.model_movimentacao_estoque import MovimentacaoEstoque
+
+logger = logging.getLogger(__name__)
+
+def registrar_checkpoint(db: Session) -> dict:
+    """Copia item_armazenado inteiro para estoque_checkpoint com o instante atual.
+
+    O lock SHARE espera as escritas de estoque em andamento terminarem e
+    segura as novas até o commit: toda movimentação com registrado_em antes
+    do momento está no checkpoint, e toda posterior fica fora dele.
+    Agendar uma vez por dia, fora do pico (make checkpoint-estoque).
+    """
+    db.execute(text("LOCK TABLE item_armazenado IN SHARE MODE"))
+    momento = db.execute(select(cast(func.clock_timestamp(), TIMESTAMP))).scalar_one()
+    origem = select(
+        literal(momento, EstoqueCheckpoint.momento.type),
+        ItemArmazenado.item_estoque_id,
+        ItemArmazenado.armazem_id,
+        ItemArmazenado.quantidade,
+    )
+    linhas = db.execute(
+        EstoqueCheckpoint.__table__.insert().from_select(
+            ["momento", "item_estoque_id", "armazem_id", "quantidade"], origem
+        )
+    ).rowcount
+    db.commit()
+    logger.info("Checkpoint de estoque registrado em %s com %d linhas", momento, linhas)
+    return {"momento": momento, "linhas": linhas}
+
+def _checkpoint_mais_proximo(db: Session, momento: datetime) -> Optional[datetime]:
+    """Checkpoint mais próximo do instante, antes ou depois (índice da chave primária)"""
+    anterior = db.query(func.max(EstoqueCheckpoint.momento)).filter(EstoqueCheckpoint.momento <= momento).scalar()
+    posterior = db.query(func.min(EstoqueCheckpoint.momento)).filter(EstoqueCheckpoint.momento > momento).scalar()
+    if anterior is None or posterior is None:
+        return anterior or posterior
+    return anterior if momento - anterior <= posterior - momento else posterior
+
+def reconstruir_posicao(
+    db: Session,
+    momento: datetime,
+    armazem_id: Optional[int] = None,
+    item_estoque_id: Optional[int] = None,
+) -> dict:
+    """Quantidade por item e armazém no instante informado (formato de PosicaoEstoqueHistorico).
+
+    Parte do checkpoint mais próximo e soma as movimentações gravadas entre
+    ele e o instante (ou as desfaz, se o checkpoint for posterior). A janela
+    usa registrado_em, preenchido pelo banco: uma movimentação retroativa
+    (data_movimentacao antiga) altera o estoque quando é gravada, e é assim
+    que ela entra na posição. Com checkpoints diários o custo é de no máximo
+    meio dia de movimentações. Sem nenhum checkpoint, soma todo o histórico
+    gravado até o instante.
+    Alterações de quantidade sem movimentação registrada (POST /item-armazenado)
+    só aparecem a partir do primeiro checkpoint seguinte.
+    """
+    checkpoint = _checkpoint_mais_proximo(db, momento)
+
+    base = select(
+        EstoqueCheckpoint.item_estoque_id,
+        EstoqueCheckpoint.armazem_id,
+        EstoqueCheckpoint.quantidade,
+    ).where(EstoqueCheckpoint.momento == checkpoint)
+
+    sinal = case((MovimentacaoEstoque.tipo == 'entrada', 1), else_=-1)
+    if checkpoint is not None and checkpoint > momento:
+        # Checkpoint posterior: desfaz as movimentações de (momento, checkpoint]
+        sinal = -sinal
+        intervalo = and_(MovimentacaoEstoque.registrado_em > momento, MovimentacaoEstoque.registrado_em <= checkpoint)
+    elif checkpoint is not None:
+        intervalo = and_(MovimentacaoEstoque.registrado_em > checkpoint, MovimentacaoEstoque.registrado_em <= momento)
+    else:
+        intervalo = MovimentacaoEstoque.registrado_em <= momento
+    movimentos = select(
+        MovimentacaoEstoque.item_estoque_id,
+        MovimentacaoEstoque.armazem_id,
+        func.sum(sinal * MovimentacaoEstoque.quantidade).label('delta'),
+        func.count().label('movimentacoes'),
+    ).where(intervalo, MovimentacaoEstoque.armazem_id.isnot(None))
+
+    if armazem_id is not None:
+        base = base.where(EstoqueCheckpoint.armazem_id == armazem_id)
+        movimentos = movimentos.where(MovimentacaoEstoque.armazem_id == armazem_id)
+    if item_estoque_id is not None:
+        base = base.where(EstoqueCheckpoint.item_estoque_id == item_estoque_id)
+        movimentos = movimentos.where(MovimentacaoEstoque.item_estoque_id == item_estoque_id)
+
+    base = base.subquery()
+    movimentos = movimentos.group_by(MovimentacaoEstoque.item_estoque_id, MovimentacaoEstoque.armazem_id).subquery()
+    item = func.coalesce(base.c.item_estoque_id, movimentos.c.item_estoque_id)
+    armazem = func.coalesce(base.c.armazem_id, movimentos.c.armazem_id)
+    resultados = db.execute(
+        select(
+            item.label('item_estoque_id'),
+            armazem.label('armazem_id'),
+            (func.coalesce(base.c.quantidade, 0) + func.coalesce(movimentos.c.delta, 0)).label('quantidade'),
+            func.coalesce(movimentos.c.movimentacoes, 0).label('movimentacoes'),
+        ).select_from(
+            base.outerjoin(
+                movimentos,
+                and_(
+                    base.c.item_estoque_id == movimentos.c.item_estoque_id,
+                    base.c.armazem_id == movimentos.c.armazem_id,
+                ),
+                full=True,
+            )
+        ).order_by(item, armazem)
+    ).all()
+
+    return {
+        "momento": momento,
+        "checkpoint_utilizado": checkpoint,
+        "movimentacoes_aplicadas": sum(linha.movimentacoes for linha in resultados),
+        "itens": [
+            {"item_estoque_id": linha.item_estoque_id, "armazem_id": linha.armazem_id, "quantidade": linha.quantidade}
+            for linha in resultados
+        ],
+    }
+
+if __name__ == "__main__":
+    import app.main  # noqa: F401 - registra todos os mapeamentos antes de consultar
+    from app.settings import SessionLocal, usar_timeout_manutencao
+
+    logging.basicConfig(level=logging.INFO)
+    usar_timeout_manutencao()
+    with SessionLocal() as sessao:
+        print(registrar_checkpoint(sessao))
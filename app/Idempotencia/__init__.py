@@ -0,0 +1 @@
+# Módulo de Idempotência (Idempotency-Key nas rotas de criação)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, TIMESTAMP, CHAR, func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.settings import Base
+
+class ChaveIdempotencia(Base):
+    """Chave enviada pelo cliente e a resposta da primeira execução, para repetir em novas tentativas"""
+    __tablename__ = "chave_idempotencia"
+
+    chave = Column(String(100), primary_key=True)
+    rota = Column(String(100), primary_key=True)
+    hash_corpo = Column(CHAR(64), nullable=False)
+    # Nula enquanto a primeira execução não terminou
+    resposta = Column(JSONB(none_as_null=True), nullable=True)
+    criado_em = Column(TIMESTAMP, nullable=False, server_default=func.now())
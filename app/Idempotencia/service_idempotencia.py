@@ -0,0 +1,130 @@
+# Idempotency-Key: uma requisição repetida devolve a resposta guardada em vez de executar de novo
+from datetime import timedelta
+from typing import Optional, Type
+import hashlib
+import logging
+import os
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.Idempotencia.model_idempotencia import ChaveIdempotencia
+from app.serializacao import serializar
+
+logger = logging.getLogger(__name__)
+
+# Por quanto tempo uma chave é lembrada; depois disso pode ser reutilizada e é apagada pela limpeza
+IDEMPOTENCIA_TTL_HORAS = float(os.getenv("IDEMPOTENCIA_TTL_HORAS", "24"))
+
+# Chave em Session.info com a função que grava a resposta antes do commit
+_RESPOSTA_PENDENTE = "idempotencia_resposta_pendente"
+
+def _hash_corpo(corpo: BaseModel) -> str:
+    return hashlib.sha256(serializar(jsonable_encoder(corpo))).hexdigest()
+
+def _limite_expiracao():
+    return func.localtimestamp() - timedelta(hours=IDEMPOTENCIA_TTL_HORAS)
+
+def _reservar(db: Session, chave: str, rota: str, hash_corpo: str) -> bool:
+    """Grava a chave na transação corrente; False se ela já existe e não expirou.
+
+    Uma requisição concorrente com a mesma chave espera aqui, na trava do
+    índice único, até a primeira terminar a transação.
+    """
+    instrucao = insert(ChaveIdempotencia).values(chave=chave, rota=rota, hash_corpo=hash_corpo)
+    instrucao = instrucao.on_conflict_do_update(
+        index_elements=[ChaveIdempotencia.chave, ChaveIdempotencia.rota],
+        set_={"hash_corpo": hash_corpo, "resposta": None, "criado_em": func.localtimestamp()},
+        where=ChaveIdempotencia.criado_em < _limite_expiracao(),
+    ).returning(ChaveIdempotencia.chave)
+    return db.execute(instrucao).first() is not None
+
+def _repetir(db: Session, chave: str, rota: str, hash_corpo: str) -> JSONResponse:
+    registro = db.execute(
+        select(ChaveIdempotencia.hash_corpo, ChaveIdempotencia.resposta)
+        .where(ChaveIdempotencia.chave == chave, ChaveIdempotencia.rota == rota)
+    ).first()
+    db.rollback()
+    if registro is not None and registro.hash_corpo != hash_corpo:
+        raise HTTPException(status_code=422, detail="Idempotency-Key já utilizada com outro corpo de requisição")
+    if registro is None or registro.resposta is None:
+        raise HTTPException(status_code=409, detail="Requisição com esta Idempotency-Key ainda em processamento")
+    return JSONResponse(content=registro.resposta, headers={"Idempotent-Replayed": "true"})
+
+def commit_com_resposta(db: Session, resposta) -> None:
+    """``db.commit()`` das escritas que aceitam Idempotency-Key.
+
+    Quando a requisição trouxe uma chave, a resposta é gravada na linha
+    reservada antes do commit, na mesma transação do trabalho.
+    """
+    gravar_resposta = db.info.pop(_RESPOSTA_PENDENTE, None)
+    if gravar_resposta is not None:
+        gravar_resposta(resposta)
+    db.commit()
+
+def executar_idempotente(
+    db: Session,
+    chave: Optional[str],
+    rota: str,
+    corpo: BaseModel,
+    modelo_resposta: Type[BaseModel],
+    servico,
+    *args,
+):
+    """Executa ``servico(db, *args)`` uma única vez por Idempotency-Key.
+
+    A chave é reservada antes do serviço, e a resposta é gravada nela pelo
+    ``commit_com_resposta`` do serviço: chave, resposta e trabalho entram no
+    mesmo commit. Se o serviço falhar (rollback), a chave some junto e a nova
+    tentativa executa de novo. Só respostas de sucesso são repetidas.
+    Devolve a resposta já serializada, igual à que as repetições recebem.
+    """
+    if chave is None:
+        return servico(db, *args)
+    hash_corpo = _hash_corpo(corpo)
+    if not _reservar(db, chave, rota, hash_corpo):
+        return _repetir(db, chave, rota, hash_corpo)
+
+    gravadas = []
+
+    def gravar_resposta(resultado):
+        # O flush gera ids e valores padrão que entram na resposta
+        db.flush()
+        resposta = modelo_resposta.model_validate(resultado, from_attributes=True).model_dump(mode="json")
+        db.execute(
+            update(ChaveIdempotencia)
+            .where(ChaveIdempotencia.chave == chave, ChaveIdempotencia.rota == rota)
+            .values(resposta=resposta)
+        )
+        gravadas.append(resposta)
+
+    db.info[_RESPOSTA_PENDENTE] = gravar_resposta
+    try:
+        resultado = servico(db, *args)
+    finally:
+        db.info.pop(_RESPOSTA_PENDENTE, None)
+    # Sem commit_com_resposta o serviço não gravou nada (ex.: lote sem linhas válidas) e a reserva foi desfeita
+    return gravadas[0] if gravadas else resultado
+
+def limpar_chaves_expiradas(db: Session) -> int:
+    """Apaga as chaves mais antigas que o TTL (make limpar-idempotencia, uma vez por dia)"""
+    removidas = db.execute(
+        delete(ChaveIdempotencia).where(ChaveIdempotencia.criado_em < _limite_expiracao())
+    ).rowcount
+    db.commit()
+    logger.info("Chaves de idempotência expiradas removidas: %d", removidas)
+    return removidas
+
+if __name__ == "__main__":
+    import app.main  # noqa: F401 - registra todos os mapeamentos antes de consultar
+    from app.settings import SessionLocal, usar_timeout_manutencao
+
+    logging.basicConfig(level=logging.INFO)
+    usar_timeout_manutencao()
+    with SessionLocal() as sessao:
+        print(limpar_chaves_expiradas(sessao))
@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
 from app.settings import get_db
 from app.ItemArmazenado.schema_item_armazenado import ItemArmazenadoCreate, ItemArmazenadoRead
 from app.ItemArmazenado.service_item_armazenado import criar_item_armazenado, listar_itens_armazenados
-from typing import List
+from typing import List, Optional
+from app.Idempotencia.service_idempotencia import executar_idempotente
 
 router = APIRouter(prefix="/item_armazenado", tags=["ItemArmazenado"])
 
 @router.post("/", response_model=ItemArmazenadoRead)
-def criar(item: ItemArmazenadoCreate, db: Session = Depends(get_db)):
-    return criar_item_armazenado(db, item)
+def criar(
+    item: ItemArmazenadoCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=100, description="Repetições com a mesma chave devolvem a primeira resposta"),
+    db: Session = Depends(get_db),
+):
+    return executar_idempotente(db, idempotency_key, "item-armazenado", item, ItemArmazenadoRead, criar_item_armazenado, item)
 
 @router.get("/", response_model=List[ItemArmazenadoRead])
 def listar(db: Session = Depends(get_db)):
@@ -3,6 +3,10 @@ from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 from app.ItemArmazenado.model_item_armazenado import ItemArmazenado
 from app.ItemArmazenado.schema_item_armazenado import ItemArmazenadoCreate
+from app.ConsultaEstoque.service_snapshot_estoque import sincronizar_snapshot
+from app.ConsultaEstoque.service_codigo_barras import invalidar_itens
+from app.versao_estoque import incrementar_versao_estoque
+from app.Idempotencia.service_idempotencia import commit_com_resposta
 from datetime import datetime
 
 def criar_item_armazenado(db: Session, item: ItemArmazenadoCreate):
@@ -16,7 +20,10 @@ def criar_item_armazenado(db: Session, item: ItemArmazenadoCreate):
         # Se já existe, atualizar a quantidade
         existing_item.quantidade += item.quantidade
         existing_item.data_atualizacao = datetime.now()
-        db.commit()
+        sincronizar_snapshot(db, item_estoque_ids=[item.item_estoque_id], armazem_ids=[item.armazem_id])
+        commit_com_resposta(db, existing_item)
+        invalidar_itens([item.item_estoque_id])
+        incrementar_versao_estoque(db)
         db.refresh(existing_item)
         return existing_item
     
@@ -30,7 +37,10 @@ def criar_item_armazenado(db: Session, item: ItemArmazenadoCreate):
     
     try:
         db.add(db_item)
-        db.commit()
+        sincronizar_snapshot(db, item_estoque_ids=[item.item_estoque_id], armazem_ids=[item.armazem_id])
+        commit_com_resposta(db, db_item)
+        invalidar_itens([item.item_estoque_id])
+        incrementar_versao_estoque(db)
         db.refresh(db_item)
         return db_item
     except IntegrityError as e:
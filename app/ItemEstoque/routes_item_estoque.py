@@ -1,15 +1,22 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 from app.settings import get_db
 from app.ItemEstoque.schema_item_estoque import ItemEstoqueCreate, ItemEstoqueRead
 from app.ItemEstoque import service_item_estoque
+from app.Idempotencia.service_idempotencia import executar_idempotente
 
 router = APIRouter(prefix="/item-estoque", tags=["Item Estoque"])
 
 @router.post("/", response_model=ItemEstoqueRead)
-def create_item(item: ItemEstoqueCreate, db: Session = Depends(get_db)):
-    return service_item_estoque.create_itemestoque(db, item)
+def create_item(
+    item: ItemEstoqueCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=100, description="Repetições com a mesma chave devolvem a primeira resposta"),
+    db: Session = Depends(get_db),
+):
+    return executar_idempotente(
+        db, idempotency_key, "item-estoque", item, ItemEstoqueRead, service_item_estoque.create_itemestoque, item
+    )
 
 @router.get("/", response_model=List[ItemEstoqueRead])
 def get_all_itens(db: Session = Depends(get_db)):
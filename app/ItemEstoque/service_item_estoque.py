@@ -5,6 +5,10 @@ from app.ItemEstoque.schema_item_estoque import ItemEstoqueCreate
 from app.Medicamento.model_medicamento import Medicamento
 from app.CuidadoPessoal.model_cuidado_pessoal import CuidadoPessoal
 from app.SuplementoAlimentar.model_suplemento_alimentar import SuplementoAlimentar
+from app.ConsultaEstoque.service_snapshot_estoque import sincronizar_snapshot
+from app.ConsultaEstoque.service_codigo_barras import invalidar_itens
+from app.versao_estoque import incrementar_versao_estoque
+from app.Idempotencia.service_idempotencia import commit_com_resposta
 import logging
 
 def create_itemestoque(db: Session, item: ItemEstoqueCreate):
@@ -46,7 +50,7 @@ def create_itemestoque(db: Session, item: ItemEstoqueCreate):
     data.pop("tipo_produto", None)
     db_item = ItemEstoque(**data, produto_id=produto_id, produto_nome=produto_nome, tipo_produto=tipo_produto)
     db.add(db_item)
-    db.commit()
+    commit_com_resposta(db, db_item)
     db.refresh(db_item)
     return db_item
 
@@ -94,7 +98,10 @@ def update_item(db: Session, id: int, item: ItemEstoqueCreate):
     db_item.produto_id = produto_id
     db_item.produto_nome = produto_nome
     db_item.tipo_produto = tipo_produto
+    sincronizar_snapshot(db, item_estoque_ids=[id])
     db.commit()
+    invalidar_itens([id])
+    incrementar_versao_estoque(db)
     db.refresh(db_item)
     return db_item
 
@@ -108,4 +115,6 @@ def delete_item(db: Session, id: int):
     # Agora pode deletar o item de estoque
     db.delete(db_item)
     db.commit()
+    invalidar_itens([id])
+    incrementar_versao_estoque(db)
     return {"message": "Item deletado com sucesso"}
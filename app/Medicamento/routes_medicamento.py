@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from app.settings import get_db
 from app.Medicamento.schema_medicamento import MedicamentoCreate, MedicamentoRead
 from app.Medicamento import service_medicamento
+from app.busca import ModoBusca
 
 router = APIRouter(prefix="/medicamento", tags=["Medicamento"])
 
@@ -15,6 +16,11 @@ def create_medicamento(medicamento: MedicamentoCreate, db: Session = Depends(get
 def get_all_medicamentos(db: Session = Depends(get_db)):
     return service_medicamento.get_all_medicamentos(db)
 
+# buscar por nome, princípio ativo ou fabricante
+@router.get("/search/", response_model=List[MedicamentoRead])
+def search_medicamentos(query: str, modo: ModoBusca = ModoBusca.CONTEM, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return service_medicamento.search_medicamentos(db, query, skip, limit, modo)
+
 @router.get("/{id}", response_model=MedicamentoRead)
 def get_medicamento_by_id(id: int, db: Session = Depends(get_db)):
     medicamento = service_medicamento.get_medicamento_by_id(db, id)
@@ -2,6 +2,7 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from app.Medicamento.model_medicamento import Medicamento
 from app.Medicamento.schema_medicamento import MedicamentoCreate
+from app.busca import ModoBusca, condicao_busca, relevancia
 
 def create_medicamento(db: Session, medicamento: MedicamentoCreate):
     db_medicamento = Medicamento(**medicamento.dict())
@@ -22,12 +23,12 @@ def get_medicamento_by_id(db: Session, id: int):
         )
     return medicamento
 
-def search_medicamentos(db: Session, query: str, skip: int = 0, limit: int = 100):
-    return db.query(Medicamento).filter(
-        Medicamento.nome.ilike(f"%{query}%") |
-        Medicamento.principio_ativo.ilike(f"%{query}%") |
-        Medicamento.fabricante.ilike(f"%{query}%")
-    ).offset(skip).limit(limit).all()
+def search_medicamentos(db: Session, query: str, skip: int = 0, limit: int = 100, modo: ModoBusca = ModoBusca.CONTEM):
+    colunas = [Medicamento.nome, Medicamento.principio_ativo, Medicamento.fabricante]
+    consulta = db.query(Medicamento).filter(condicao_busca(colunas, query, modo))
+    if modo == ModoBusca.RELEVANCIA:
+        consulta = consulta.order_by(relevancia(colunas, query).desc())
+    return consulta.order_by(Medicamento.id).offset(skip).limit(limit).all()
 
 def update_medicamento(db: Session, id: int, medicamento: MedicamentoCreate):
     db_medicamento = get_medicamento_by_id(db, id)
@@ -0,0 +1,50 @@
+# Módulo de Monitoramento
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from typing import List, Optional
+import os
+import secrets
+
+from app.settings import engine, async_engine, replica_engine, async_replica_engine, estado_replica, _env_bool
+from app.cache import estatisticas_caches
+from app.Monitoramento.schema_monitoramento import EstatisticasPools, QueryLenta, EstatisticasCache
+from app.Monitoramento.service_pool_conexoes import obter_estatisticas_pool
+from app.Monitoramento.service_queries_lentas import obter_queries_lentas
+
+# As rotas expõem SQL, planos de execução e o estado dos pools: só são montadas se habilitadas
+MONITORAMENTO_HABILITADO = _env_bool("MONITORAMENTO_HABILITADO", False)
+# Se informado, exigido no cabeçalho X-Monitoramento-Token
+MONITORAMENTO_TOKEN = os.getenv("MONITORAMENTO_TOKEN", "")
+
+async def exigir_token_monitoramento(x_monitoramento_token: Optional[str] = Header(None)):
+    if MONITORAMENTO_TOKEN and not secrets.compare_digest(x_monitoramento_token or "", MONITORAMENTO_TOKEN):
+        raise HTTPException(status_code=401, detail="Token de monitoramento inválido")
+
+router = APIRouter(
+    prefix="/monitoramento", tags=["Monitoramento"], dependencies=[Depends(exigir_token_monitoramento)]
+)
+
+@router.get("/pool", response_model=EstatisticasPools)
+def obter_estatisticas_pools():
+    """Estatísticas dos pools de conexão: uso, overflow, tempo de espera e timeouts"""
+    return EstatisticasPools(
+        sincrono=obter_estatisticas_pool(engine.pool),
+        assincrono=obter_estatisticas_pool(async_engine.sync_engine.pool),
+        replica=obter_estatisticas_pool(replica_engine.pool) if replica_engine else None,
+        replica_assincrona=(
+            obter_estatisticas_pool(async_replica_engine.sync_engine.pool) if async_replica_engine else None
+        ),
+        replica_em_uso=estado_replica.disponivel,
+        atraso_replica_segundos=estado_replica.atraso_segundos,
+    )
+
+@router.get("/queries-lentas", response_model=List[QueryLenta])
+def listar_queries_lentas(
+    limite: int = Query(50, description="Quantidade de registros mais recentes", ge=1, le=200),
+):
+    """Instruções acima de DB_SLOW_QUERY_MS registradas por este worker, com o plano de execução"""
+    return obter_queries_lentas(limite)
+
+@router.get("/cache", response_model=List[EstatisticasCache])
+def listar_estatisticas_cache():
+    """Acertos, falhas e ocupação dos caches em memória deste worker"""
+    return estatisticas_caches()
@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field
+from typing import Any, Optional
+
+class EstatisticasPool(BaseModel):
+    """Estado e contadores acumulados de um pool de conexões"""
+    tamanho_pool: int = Field(description="Conexões fixas do pool (DB_POOL_SIZE)")
+    max_overflow: int = Field(description="Conexões extras permitidas (DB_MAX_OVERFLOW)")
+    conexoes_em_uso: int = Field(description="Conexões em uso neste momento")
+    conexoes_ociosas: int = Field(description="Conexões abertas aguardando uso")
+    overflow_em_uso: int = Field(description="Conexões de overflow abertas neste momento")
+    total_checkouts: int = Field(description="Checkouts realizados desde o início do processo")
+    esperas_lentas: int = Field(description="Checkouts que levaram 100 ms ou mais")
+    timeouts: int = Field(description="Checkouts que estouraram DB_POOL_TIMEOUT")
+    tempo_espera_medio_ms: float
+    tempo_espera_max_ms: float
+
+class EstatisticasPools(BaseModel):
+    """Pools do processo atual (cada worker possui os seus)"""
+    sincrono: EstatisticasPool
+    assincrono: EstatisticasPool
+    replica: Optional[EstatisticasPool] = Field(None, description="Presente apenas com DATABASE_REPLICA_URL")
+    replica_assincrona: Optional[EstatisticasPool] = None
+    replica_em_uso: bool = Field(False, description="Se as leituras estão sendo roteadas para a réplica")
+    atraso_replica_segundos: Optional[float] = None
+
+class QueryLenta(BaseModel):
+    """Instrução que passou de DB_SLOW_QUERY_MS, com parâmetros já redigidos"""
+    registrado_em: str
+    rota: Optional[str] = Field(None, description="Rota que executou a instrução (vazio fora de requisições)")
+    duracao_ms: float
+    sql: str
+    parametros: Optional[Any] = None
+    plano: Optional[str] = Field(None, description="Saída do EXPLAIN; vazio enquanto a captura está pendente")
+    erro_plano: Optional[str] = None
+
+class EstatisticasCache(BaseModel):
+    """Contadores de um cache em memória deste worker"""
+    nome: str
+    tamanho: int
+    tamanho_maximo: int
+    ttl_segundos: float
+    acertos: int
+    falhas: int
+    taxa_acerto: float
+    expiradas: int
+    despejadas: int
+    invalidadas: int
@@ -0,0 +1,116 @@
+# Módulo de Monitoramento - instrumentação de SQL por requisição
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from app.Monitoramento.service_queries_lentas import registrar_se_lenta
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Quantas vezes a mesma instrução pode rodar numa requisição antes de ser tratada como N+1
+DB_N_MAIS_UM_LIMITE = int(os.getenv("DB_N_MAIS_UM_LIMITE", "10"))
+
+class MetricasRequisicao:
+    """Acumula as instruções SQL executadas durante uma requisição HTTP"""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope or {}
+        self.total_queries = 0
+        self.tempo_total_ms = 0.0
+        self.contagem_por_instrucao = {}
+        self.instrucoes_avisadas = set()
+
+    @property
+    def rota(self) -> str:
+        """Rota no formato do router (ex: /alertas/{alerta_id}) quando já resolvida"""
+        rota = self.scope.get("route")
+        caminho = getattr(rota, "path", None) or self.scope.get("path", "")
+        return f"{self.scope.get('method', '')} {caminho}".strip()
+
+    def registrar(self, instrucao: str, duracao_ms: float):
+        self.total_queries += 1
+        self.tempo_total_ms += duracao_ms
+        contagem = self.contagem_por_instrucao.get(instrucao, 0) + 1
+        self.contagem_por_instrucao[instrucao] = contagem
+        if contagem > DB_N_MAIS_UM_LIMITE and instrucao not in self.instrucoes_avisadas:
+            self.instrucoes_avisadas.add(instrucao)
+            logger.warning(
+                "Possível N+1 em %s: a mesma instrução rodou mais de %d vezes: %s",
+                self.rota, DB_N_MAIS_UM_LIMITE, " ".join(instrucao.split())[:300]
+            )
+
+_metricas_requisicao: ContextVar[Optional[MetricasRequisicao]] = ContextVar("metricas_requisicao", default=None)
+
+def obter_metricas_requisicao() -> Optional[MetricasRequisicao]:
+    return _metricas_requisicao.get()
+
+def _antes_de_executar(conn, cursor, statement, parameters, context, executemany):
+    # Guardado no contexto da execução para não vazar quando a instrução falha
+    context._inicio_monitoramento = time.perf_counter()
+
+def _depois_de_executar(conn, cursor, statement, parameters, context, executemany):
+    duracao_ms = (time.perf_counter() - context._inicio_monitoramento) * 1000
+    metricas = _metricas_requisicao.get()
+    if metricas is not None:
+        metricas.registrar(statement, duracao_ms)
+    registrar_se_lenta(statement, parameters, context, executemany, duracao_ms, metricas.rota if metricas else None)
+
+def instalar_instrumentacao_sql():
+    """Registra os eventos em todas as engines (síncronas e assíncronas) do processo"""
+    if not event.contains(Engine, "before_cursor_execute", _antes_de_executar):
+        event.listen(Engine, "before_cursor_execute", _antes_de_executar)
+        event.listen(Engine, "after_cursor_execute", _depois_de_executar)
+
+class MiddlewareMetricasSQL:
+    """Middleware ASGI que expõe X-DB-Queries e X-DB-Time-ms em cada resposta.
+
+    O início da resposta fica retido até o primeiro pedaço do corpo: se o corpo
+    vem inteiro, as consultas já terminaram e os cabeçalhos saem com os totais.
+    Em streaming (ex: /consulta-estoque/exportar) as consultas continuam depois
+    dos cabeçalhos, então eles são omitidos e os totais vão para o log no fim.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metricas = MetricasRequisicao(scope)
+        token = _metricas_requisicao.set(metricas)
+
+        inicio = None
+        em_streaming = False
+
+        async def send_com_metricas(message):
+            nonlocal inicio, em_streaming
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            fim = message["type"] == "http.response.body" and not message.get("more_body", False)
+            if inicio is not None:
+                if fim:
+                    headers = MutableHeaders(scope=inicio)
+                    headers.append("X-DB-Queries", str(metricas.total_queries))
+                    headers.append("X-DB-Time-ms", f"{metricas.tempo_total_ms:.1f}")
+                else:
+                    em_streaming = True
+                await send(inicio)
+                inicio = None
+            elif em_streaming and fim:
+                logger.info(
+                    "Resposta em streaming de %s: %d instruções SQL em %.1f ms",
+                    metricas.rota, metricas.total_queries, metricas.tempo_total_ms
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_metricas)
+        finally:
+            _metricas_requisicao.reset(token)
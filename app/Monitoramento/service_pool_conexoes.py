@@ -0,0 +1,79 @@
+# Módulo de Monitoramento - métricas do pool de conexões
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from threading import Lock
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Checkouts acima deste tempo indicam que a requisição esperou por uma conexão livre
+LIMITE_ESPERA_LENTA_MS = 100.0
+
+class MetricasPool:
+    """Contadores acumulados de checkout de conexões de um pool"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.total_checkouts = 0
+        self.esperas_lentas = 0
+        self.timeouts = 0
+        self.tempo_espera_total_ms = 0.0
+        self.tempo_espera_max_ms = 0.0
+
+    def registrar_checkout(self, duracao_ms: float):
+        with self._lock:
+            self.total_checkouts += 1
+            self.tempo_espera_total_ms += duracao_ms
+            if duracao_ms > self.tempo_espera_max_ms:
+                self.tempo_espera_max_ms = duracao_ms
+            if duracao_ms >= LIMITE_ESPERA_LENTA_MS:
+                self.esperas_lentas += 1
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+class _PoolMonitoradoMixin:
+    """Mede o tempo de cada checkout e conta os timeouts do pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasPool()
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super().connect()
+        except exc.TimeoutError:
+            self.metricas.registrar_timeout()
+            logger.warning(
+                "Timeout no checkout do pool: %s conexões em uso, overflow %s, aguardando há %.0f ms",
+                self.checkedout(), max(self.overflow(), 0), (time.perf_counter() - inicio) * 1000
+            )
+            raise
+        self.metricas.registrar_checkout((time.perf_counter() - inicio) * 1000)
+        return conexao
+
+class QueuePoolMonitorado(_PoolMonitoradoMixin, QueuePool):
+    pass
+
+class AsyncQueuePoolMonitorado(_PoolMonitoradoMixin, AsyncAdaptedQueuePool):
+    pass
+
+def obter_estatisticas_pool(pool) -> dict:
+    """Retorna o estado atual e os contadores acumulados de um pool monitorado"""
+    metricas = pool.metricas
+    total = metricas.total_checkouts
+    return {
+        "tamanho_pool": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "conexoes_em_uso": pool.checkedout(),
+        "conexoes_ociosas": pool.checkedin(),
+        "overflow_em_uso": max(pool.overflow(), 0),
+        "total_checkouts": total,
+        "esperas_lentas": metricas.esperas_lentas,
+        "timeouts": metricas.timeouts,
+        "tempo_espera_medio_ms": round(metricas.tempo_espera_total_ms / total, 3) if total else 0.0,
+        "tempo_espera_max_ms": round(metricas.tempo_espera_max_ms, 3),
+    }
@@ -0,0 +1,199 @@
+# Módulo de Monitoramento - log de instruções SQL lentas com captura de EXPLAIN
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Instruções acima deste tempo são registradas (0 desativa)
+DB_SLOW_QUERY_MS = int(os.getenv("DB_SLOW_QUERY_MS", "500"))
+# Arquivo rotativo com uma linha JSON por instrução lenta
+DB_SLOW_QUERY_LOG = os.getenv("DB_SLOW_QUERY_LOG", "logs/queries_lentas.log")
+# Captura o plano de execução em segundo plano
+DB_SLOW_QUERY_EXPLAIN = os.getenv("DB_SLOW_QUERY_EXPLAIN", "true").strip().lower() in ("1", "true", "sim", "yes")
+# Intervalo mínimo entre dois EXPLAIN da mesma instrução
+DB_SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = int(os.getenv("DB_SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "60"))
+
+_MAX_REGISTROS_MEMORIA = 200
+_MAX_EXPLAINS_PENDENTES = 10
+_MAX_LINHAS_EXECUTEMANY = 5
+_TIMEOUT_EXPLAIN_MS = 30000
+
+_PARAMETROS_SENSIVEIS = re.compile(r"cpf|nome|email|senha", re.IGNORECASE)
+_VALOR_CPF = re.compile(r"^\s*\d{3}\.?\d{3}\.?\d{3}-?\d{2}\s*$")
+_REDIGIDO = "***"
+_ESCRITA_EM_CTE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b")
+# SELECT que trava linhas ou chama função com efeito colateral: ANALYZE repetiria o efeito
+# (nextval não é desfeito pelo rollback)
+_SELECT_COM_EFEITO = re.compile(
+    r"\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b"
+    r"|\b(NEXTVAL|SETVAL|PG_(TRY_)?ADVISORY_\w+|PG_NOTIFY|PG_SLEEP\w*|DBLINK\w*|LO_\w+)\s*\("
+)
+# Constantes entre aspas no texto do plano (valores dos parâmetros, inclusive CPF e nomes)
+_LITERAL_NO_PLANO = re.compile(r"'(?:[^']|'')*'")
+
+_registros = deque(maxlen=_MAX_REGISTROS_MEMORIA)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain-queries-lentas")
+_vagas_explain = threading.BoundedSemaphore(_MAX_EXPLAINS_PENDENTES)
+_ultimo_explain = {}
+_lock = threading.Lock()
+
+_logger_arquivo = logging.getLogger("app.queries_lentas")
+_logger_arquivo.propagate = False
+
+def _configurar_arquivo():
+    if _logger_arquivo.handlers or not DB_SLOW_QUERY_LOG:
+        return
+    diretorio = os.path.dirname(DB_SLOW_QUERY_LOG)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+    handler = RotatingFileHandler(DB_SLOW_QUERY_LOG, maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _logger_arquivo.addHandler(handler)
+    _logger_arquivo.setLevel(logging.INFO)
+
+def _redigir_valor(nome: Optional[str], valor):
+    if nome and _PARAMETROS_SENSIVEIS.search(nome):
+        return _REDIGIDO
+    if isinstance(valor, str) and _VALOR_CPF.match(valor):
+        return _REDIGIDO
+    if isinstance(valor, (str, int, float, bool)) or valor is None:
+        return valor
+    return str(valor)
+
+def _redigir_linha(parametros, nomes_posicionais):
+    if isinstance(parametros, dict):
+        return {chave: _redigir_valor(chave, valor) for chave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        nomes = nomes_posicionais or []
+        return [
+            _redigir_valor(nomes[i] if i < len(nomes) else None, valor)
+            for i, valor in enumerate(parametros)
+        ]
+    return parametros
+
+def redigir_parametros(parametros, context=None, executemany: bool = False):
+    """Remove CPF e nomes dos parâmetros antes de gravá-los no log"""
+    # Drivers posicionais (asyncpg) não trazem o nome do parâmetro; o compilado traz
+    compilado = getattr(context, "compiled", None)
+    nomes_posicionais = getattr(compilado, "positiontup", None)
+    if executemany:
+        return [_redigir_linha(linha, nomes_posicionais) for linha in list(parametros)[:_MAX_LINHAS_EXECUTEMANY]]
+    return _redigir_linha(parametros, nomes_posicionais)
+
+def _instrucao_somente_leitura(statement: str, context) -> bool:
+    if getattr(context, "isinsert", False) or getattr(context, "isupdate", False) or getattr(context, "isdelete", False):
+        return False
+    instrucao = statement.lstrip().upper()
+    if _SELECT_COM_EFEITO.search(instrucao):
+        return False
+    if instrucao.startswith("WITH"):
+        # CTE pode conter escrita; ANALYZE a executaria de verdade antes do rollback
+        return not _ESCRITA_EM_CTE.search(instrucao)
+    return instrucao.startswith("SELECT")
+
+def _engine_da_instrucao(context):
+    """Engine síncrona (psycopg2) do mesmo banco que executou a instrução: primário ou réplica.
+
+    O EXPLAIN ANALYZE de um relatório lento da réplica não deve rodar de novo no primário.
+    """
+    from app.settings import engine, replica_engine, async_replica_engine
+
+    origem = getattr(getattr(context, "root_connection", None), "engine", None)
+    if replica_engine is not None and origem is not None and (
+        origem is replica_engine or (async_replica_engine is not None and origem is async_replica_engine.sync_engine)
+    ):
+        return replica_engine
+    return engine
+
+def redigir_plano(plano: str) -> str:
+    """O plano traz os valores dos parâmetros como constantes; troca todas por '***'"""
+    return _LITERAL_NO_PLANO.sub(f"'{_REDIGIDO}'", plano)
+
+def _capturar_plano(engine, statement: str, parametros, estilo_parametros: str, analisar: bool) -> str:
+    """Roda o EXPLAIN numa conexão DBAPI própria (fora dos eventos do SQLAlchemy) e desfaz tudo no final"""
+    opcoes = "ANALYZE, BUFFERS" if analisar else "VERBOSE"
+    conexao = engine.raw_connection()
+    try:
+        cursor = conexao.cursor()
+        cursor.execute(f"SET LOCAL statement_timeout = {_TIMEOUT_EXPLAIN_MS}")
+        if estilo_parametros == "numeric_dollar":
+            # Instrução do asyncpg ($1, $2...): prepara no servidor e executa com os valores via psycopg2
+            cursor.execute(f"PREPARE consulta_lenta AS {statement}")
+            marcadores = ", ".join(["%s"] * len(parametros))
+            execucao = f"EXECUTE consulta_lenta ({marcadores})" if parametros else "EXECUTE consulta_lenta"
+            cursor.execute(f"EXPLAIN ({opcoes}) {execucao}", tuple(parametros) if parametros else None)
+        else:
+            # Mesmos parâmetros que o driver recebeu, para manter o escape de % do psycopg2
+            cursor.execute(f"EXPLAIN ({opcoes}) {statement}", parametros)
+        return redigir_plano("\n".join(linha[0] for linha in cursor.fetchall()))
+    finally:
+        # ROLLBACK também descarta o PREPARE e qualquer efeito do ANALYZE
+        conexao.rollback()
+        conexao.close()
+
+def _explicar_e_gravar(registro: dict, engine, statement: str, parametros, estilo_parametros: str, analisar: bool):
+    try:
+        registro["plano"] = _capturar_plano(engine, statement, parametros, estilo_parametros, analisar)
+    except Exception as exc:
+        registro["erro_plano"] = str(exc).strip()
+    finally:
+        _vagas_explain.release()
+        _gravar_arquivo(registro)
+
+def _gravar_arquivo(registro: dict):
+    try:
+        _configurar_arquivo()
+        _logger_arquivo.info(json.dumps(registro, ensure_ascii=False, default=str))
+    except Exception:
+        logger.exception("Falha ao gravar o log de queries lentas")
+
+def _deve_explicar(statement: str) -> bool:
+    agora = time.monotonic()
+    with _lock:
+        ultimo = _ultimo_explain.get(statement)
+        if ultimo is not None and agora - ultimo < DB_SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+            return False
+        if len(_ultimo_explain) > 1000:
+            _ultimo_explain.clear()
+        _ultimo_explain[statement] = agora
+    return _vagas_explain.acquire(blocking=False)
+
+def registrar_se_lenta(statement: str, parameters, context, executemany: bool, duracao_ms: float, rota: Optional[str]):
+    """Chamado após cada instrução; registra e agenda o EXPLAIN quando passar do limite"""
+    if DB_SLOW_QUERY_MS <= 0 or duracao_ms < DB_SLOW_QUERY_MS:
+        return
+
+    registro = {
+        "registrado_em": datetime.now().isoformat(timespec="seconds"),
+        "rota": rota,
+        "duracao_ms": round(duracao_ms, 1),
+        "sql": statement,
+        "parametros": redigir_parametros(parameters, context, executemany),
+        "plano": None,
+        "erro_plano": None,
+    }
+    _registros.append(registro)
+    logger.warning("Query lenta (%.0f ms) em %s: %s", duracao_ms, rota or "-", " ".join(statement.split())[:300])
+
+    estilo_parametros = getattr(getattr(context, "dialect", None), "paramstyle", "pyformat")
+    # executemany não tem um único conjunto de parâmetros para explicar
+    if DB_SLOW_QUERY_EXPLAIN and not executemany and _deve_explicar(statement):
+        analisar = _instrucao_somente_leitura(statement, context)
+        _executor.submit(
+            _explicar_e_gravar, registro, _engine_da_instrucao(context), statement, parameters, estilo_parametros, analisar
+        )
+    else:
+        _gravar_arquivo(registro)
+
+def obter_queries_lentas(limite: int = 50) -> List[dict]:
+    """Registros mais recentes primeiro (somente deste processo)"""
+    return list(reversed(_registros))[:limite]
@@ -0,0 +1,89 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.main
+from app.Monitoramento import routes_monitoramento
+from app.Monitoramento.service_pool_conexoes import MetricasPool
+from app.Monitoramento.service_metricas_sql import (
+    MetricasRequisicao, MiddlewareMetricasSQL, DB_N_MAIS_UM_LIMITE, obter_metricas_requisicao
+)
+from app.Monitoramento.service_queries_lentas import redigir_parametros, redigir_plano, _instrucao_somente_leitura
+
+def test_metricas_pool_acumula_checkouts():
+    metricas = MetricasPool()
+    metricas.registrar_checkout(2.0)
+    metricas.registrar_checkout(150.0)
+    metricas.registrar_timeout()
+    assert metricas.total_checkouts == 2
+    assert metricas.esperas_lentas == 1
+    assert metricas.timeouts == 1
+    assert metricas.tempo_espera_max_ms == 150.0
+
+def test_metricas_requisicao_avisa_n_mais_um(caplog):
+    metricas = MetricasRequisicao({"method": "GET", "path": "/alertas/"})
+    for _ in range(DB_N_MAIS_UM_LIMITE + 2):
+        metricas.registrar("SELECT * FROM alerta_estoque WHERE id = %(id)s", 1.0)
+    assert metricas.total_queries == DB_N_MAIS_UM_LIMITE + 2
+    assert len([r for r in caplog.records if "N+1" in r.getMessage()]) == 1
+
+def _chamar_middleware(*corpos):
+    """Roda o middleware sobre uma app que faz uma consulta antes de cada pedaço do corpo"""
+    enviadas = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for i, corpo in enumerate(corpos):
+            obter_metricas_requisicao().registrar("SELECT 1", 2.0)
+            await send({"type": "http.response.body", "body": corpo, "more_body": i < len(corpos) - 1})
+
+    async def send(message):
+        enviadas.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/consulta-estoque/exportar", "headers": []}
+    asyncio.run(MiddlewareMetricasSQL(app)(scope, None, send))
+    return enviadas
+
+def test_middleware_metricas_cabecalhos_com_os_totais():
+    inicio, _ = _chamar_middleware(b"[]")
+    assert (b"x-db-queries", b"1") in inicio["headers"]
+    assert (b"x-db-time-ms", b"2.0") in inicio["headers"]
+
+def test_middleware_metricas_streaming_registra_no_log(caplog):
+    caplog.set_level("INFO")
+    inicio, *corpo = _chamar_middleware(b"a\n", b"b\n", b"")
+    assert not any(nome.startswith(b"x-db-") for nome, _ in inicio["headers"])
+    assert len(corpo) == 3
+    assert "3 instruções SQL" in caplog.records[-1].getMessage()
+
+def test_redigir_parametros_remove_cpf_e_nome():
+    parametros = {"cpf_comprador": "123.456.789-00", "nome_1": "%Maria%", "quantidade_1": 5, "obs": "12345678900"}
+    redigidos = redigir_parametros(parametros)
+    assert redigidos == {"cpf_comprador": "***", "nome_1": "***", "quantidade_1": 5, "obs": "***"}
+
+def test_redigir_plano_remove_constantes():
+    plano = "Filter: ((cpf_comprador)::text = '123.456.789-00'::text) AND (nome_comprador ~~ '%O''Neil%'::text)"
+    assert redigir_plano(plano) == "Filter: ((cpf_comprador)::text = '***'::text) AND (nome_comprador ~~ '***'::text)"
+
+def test_explain_analyze_so_em_select_sem_efeito():
+    assert _instrucao_somente_leitura("SELECT * FROM item_armazenado WHERE id = %(id)s", None)
+    assert not _instrucao_somente_leitura("SELECT quantidade FROM item_armazenado ORDER BY id FOR UPDATE", None)
+    assert not _instrucao_somente_leitura("SELECT 1 FROM t FOR NO KEY UPDATE SKIP LOCKED", None)
+    assert not _instrucao_somente_leitura("SELECT nextval('estoque_versao_seq')", None)
+    assert not _instrucao_somente_leitura("WITH x AS (DELETE FROM t RETURNING id) SELECT * FROM x", None)
+
+def _cliente_monitoramento():
+    aplicacao = FastAPI()
+    aplicacao.include_router(routes_monitoramento.router)
+    return TestClient(aplicacao)
+
+def test_monitoramento_desligado_por_padrao():
+    assert not any(getattr(rota, "path", "").startswith("/monitoramento") for rota in app.main.app.routes)
+
+def test_monitoramento_exige_o_token_configurado(monkeypatch):
+    monkeypatch.setattr(routes_monitoramento, "MONITORAMENTO_TOKEN", "segredo")
+    cliente = _cliente_monitoramento()
+    assert cliente.get("/monitoramento/cache").status_code == 401
+    assert cliente.get("/monitoramento/cache", headers={"X-Monitoramento-Token": "outro"}).status_code == 401
+    assert cliente.get("/monitoramento/cache", headers={"X-Monitoramento-Token": "segredo"}).status_code == 200
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
 from sqlalchemy.orm import relationship
 from app.settings import Base
 
 class MovimentacaoEstoque(Base):
     __tablename__ = "movimentacao_estoque"
 
+    # No banco a chave é (id, data_movimentacao), exigência do particionamento por mês; id segue único
     id = Column(Integer, primary_key=True, autoincrement=True)
     data_movimentacao = Column(DateTime, nullable=False)
     tipo = Column(String(50), nullable=False)
@@ -15,6 +16,8 @@ class MovimentacaoEstoque(Base):
     nome_comprador = Column(String(100), nullable=True)
     receita_digital = Column(String(255), nullable=True)
     armazem_id = Column(Integer, ForeignKey('armazem.id'), nullable=True)
+    # Preenchido pelo banco na gravação; data_movimentacao é informada pelo cliente e pode ser retroativa
+    registrado_em = Column(DateTime, nullable=False, server_default=func.clock_timestamp())
 
     item = relationship("ItemEstoque")
     funcionario = relationship("Funcionario")
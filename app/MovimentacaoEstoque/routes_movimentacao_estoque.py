@@ -1,19 +1,69 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from datetime import date
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
-from app.settings import get_db
-from app.MovimentacaoEstoque.schema_movimentacao_estoque import MovimentacaoEstoqueCreate, MovimentacaoEstoqueRead
+from app.settings import get_db, get_db_readonly
+from app.serializacao import RespostaORJSON
+from app.MovimentacaoEstoque.schema_movimentacao_estoque import (
+    MovimentacaoEstoqueCreate,
+    MovimentacaoEstoqueRead,
+    LoteMovimentacaoEstoque,
+    ResultadoLoteMovimentacao,
+    FiltroMovimentacaoEstoque,
+    PaginaMovimentacaoEstoque,
+    TipoMovimentacao
+)
 from app.MovimentacaoEstoque import service_movimentacao_estoque
+from app.Idempotencia.service_idempotencia import executar_idempotente
 
 router = APIRouter(prefix="/movimentacao-estoque", tags=["Movimentação Estoque"])
 
 @router.post("/", response_model=MovimentacaoEstoqueRead)
-def create_movimentacao(movimentacao: MovimentacaoEstoqueCreate, db: Session = Depends(get_db)):
-    return service_movimentacao_estoque.create_movimentacaoestoque(db, movimentacao)
+def create_movimentacao(
+    movimentacao: MovimentacaoEstoqueCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=100, description="Repetições com a mesma chave devolvem a primeira resposta"),
+    db: Session = Depends(get_db),
+):
+    return executar_idempotente(
+        db, idempotency_key, "movimentacao-estoque", movimentacao, MovimentacaoEstoqueRead,
+        service_movimentacao_estoque.create_movimentacaoestoque, movimentacao
+    )
 
-@router.get("/", response_model=List[MovimentacaoEstoqueRead])
-def get_all_movimentacoes(db: Session = Depends(get_db)):
-    return service_movimentacao_estoque.get_all_movimentacoes(db)
+@router.post("/lote", response_model=ResultadoLoteMovimentacao)
+def create_movimentacoes_em_lote(
+    lote: LoteMovimentacaoEstoque,
+    idempotency_key: Optional[str] = Header(None, max_length=100, description="Repetições com a mesma chave devolvem a primeira resposta"),
+    db: Session = Depends(get_db),
+):
+    """Registrar várias movimentações (ex.: recebimento de uma entrega) numa única transação"""
+    return executar_idempotente(
+        db, idempotency_key, "movimentacao-estoque/lote", lote, ResultadoLoteMovimentacao,
+        service_movimentacao_estoque.create_movimentacoes_em_lote, lote
+    )
+
+@router.get("/", response_model=PaginaMovimentacaoEstoque)
+def get_all_movimentacoes(
+    item_estoque_id: int = Query(None, description="Filtrar por item de estoque"),
+    armazem_id: int = Query(None, description="Filtrar por armazém"),
+    funcionario_id: int = Query(None, description="Filtrar por funcionário"),
+    tipo: TipoMovimentacao = Query(None, description="Filtrar por tipo"),
+    data_inicio: date = Query(None, description="Data inicial (inclusive)"),
+    data_fim: date = Query(None, description="Data final (inclusive)"),
+    decrescente: bool = Query(False, description="Mais recentes primeiro"),
+    cursor: str = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(100, description="Limitar resultados", ge=1, le=1000),
+    db: Session = Depends(get_db_readonly),
+):
+    """Listar movimentações por data e id, paginando por cursor (keyset)"""
+    filtros = FiltroMovimentacaoEstoque(
+        item_estoque_id=item_estoque_id,
+        armazem_id=armazem_id,
+        funcionario_id=funcionario_id,
+        tipo=tipo,
+        data_inicio=data_inicio,
+        data_fim=data_fim,
+    )
+    return RespostaORJSON(service_movimentacao_estoque.listar_movimentacoes(db, filtros, cursor, limit, decrescente))
 
 @router.get("/{id}", response_model=MovimentacaoEstoqueRead)
 def get_movimentacao_by_id(id: int, db: Session = Depends(get_db)):
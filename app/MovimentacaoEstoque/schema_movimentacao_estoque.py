@@ -1,6 +1,7 @@
-from pydantic import BaseModel, model_validator
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from enum import Enum
+from datetime import date, datetime
 
 class MovimentacaoEstoqueBase(BaseModel):
     data_movimentacao: datetime
@@ -14,6 +15,10 @@ class MovimentacaoEstoqueBase(BaseModel):
     armazem_id: int
 
 class MovimentacaoEstoqueCreate(MovimentacaoEstoqueBase):
+    quantidade: int = Field(gt=0)
+
+class LinhaLoteMovimentacao(MovimentacaoEstoqueBase):
+    # Sem validação de quantidade aqui: no melhor esforço uma linha inválida não pode rejeitar o lote todo
     pass
 
 class MovimentacaoEstoqueRead(MovimentacaoEstoqueBase):
@@ -21,3 +26,38 @@ class MovimentacaoEstoqueRead(MovimentacaoEstoqueBase):
 
     class Config:
         orm_mode = True
+
+class TipoMovimentacao(str, Enum):
+    ENTRADA = "entrada"
+    SAIDA = "saida"
+
+class FiltroMovimentacaoEstoque(BaseModel):
+    item_estoque_id: Optional[int] = None
+    armazem_id: Optional[int] = None
+    funcionario_id: Optional[int] = None
+    tipo: Optional[TipoMovimentacao] = None
+    data_inicio: Optional[date] = Field(None, description="Primeiro dia incluído")
+    data_fim: Optional[date] = Field(None, description="Último dia incluído")
+
+class PaginaMovimentacaoEstoque(BaseModel):
+    itens: List[MovimentacaoEstoqueRead]
+    next_cursor: Optional[str] = Field(None, description="Cursor da próxima página; nulo na última")
+
+class ModoLoteMovimentacao(str, Enum):
+    # Qualquer linha inválida cancela o lote inteiro (422 com os erros de cada linha)
+    TUDO_OU_NADA = "tudo_ou_nada"
+    # Aplica as linhas válidas e devolve os erros das demais
+    MELHOR_ESFORCO = "melhor_esforco"
+
+class LoteMovimentacaoEstoque(BaseModel):
+    movimentacoes: List[LinhaLoteMovimentacao] = Field(min_length=1, max_length=5000)
+    modo: ModoLoteMovimentacao = ModoLoteMovimentacao.TUDO_OU_NADA
+
+class ErroLinhaMovimentacao(BaseModel):
+    indice: int = Field(description="Posição da linha na lista enviada (começa em 0)")
+    detalhe: str
+
+class ResultadoLoteMovimentacao(BaseModel):
+    aplicadas: int
+    ids: List[Optional[int]] = Field(description="Id gerado para cada linha, na ordem enviada; null nas linhas rejeitadas")
+    erros: List[ErroLinhaMovimentacao]
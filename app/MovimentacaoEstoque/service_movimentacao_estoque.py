@@ -1,33 +1,206 @@
+from datetime import datetime, timedelta
+from typing import Optional
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from app.MovimentacaoEstoque.model_movimentacao_estoque import MovimentacaoEstoque
-from app.MovimentacaoEstoque.schema_movimentacao_estoque import MovimentacaoEstoqueCreate
+from app.MovimentacaoEstoque.schema_movimentacao_estoque import (
+    MovimentacaoEstoqueCreate,
+    MovimentacaoEstoqueRead,
+    LoteMovimentacaoEstoque,
+    ModoLoteMovimentacao,
+    FiltroMovimentacaoEstoque
+)
+from app.paginacao import codificar_cursor, decodificar_cursor
+from app.Idempotencia.service_idempotencia import commit_com_resposta
 from app.ItemArmazenado.model_item_armazenado import ItemArmazenado
-from sqlalchemy import and_
+from sqlalchemy import and_, column, insert, Integer, select, tuple_, update, values
+from app.ConsultaEstoque.service_snapshot_estoque import sincronizar_snapshot
+from app.ConsultaEstoque.service_codigo_barras import invalidar_itens
+from app.versao_estoque import incrementar_versao_estoque
 
 def create_movimentacaoestoque(db: Session, movimentacao: MovimentacaoEstoqueCreate):
-    # Buscar o item armazenado correspondente
-    item_armazenado = db.query(ItemArmazenado).filter(and_(ItemArmazenado.item_estoque_id == movimentacao.item_estoque_id, ItemArmazenado.armazem_id == movimentacao.armazem_id)).first()
-    if not item_armazenado:
-        raise HTTPException(status_code=404, detail="Item não encontrado no armazém informado")
-    if movimentacao.tipo.lower() == 'saida':
-        if item_armazenado.quantidade < movimentacao.quantidade:
-            raise HTTPException(status_code=400, detail="Quantidade insuficiente em estoque para saída")
-        item_armazenado.quantidade -= movimentacao.quantidade
-    elif movimentacao.tipo.lower() == 'entrada':
-        item_armazenado.quantidade += movimentacao.quantidade
+    """Atualiza o saldo e grava a movimentação numa única transação.
+
+    O saldo é alterado por um UPDATE condicional (quantidade >= :q na saída),
+    então duas vendas simultâneas não passam ambas pela verificação: a
+    segunda espera a trava da linha e reavalia a condição com o saldo novo.
+    """
+    tipo = movimentacao.tipo.lower()
+    condicoes = [
+        ItemArmazenado.item_estoque_id == movimentacao.item_estoque_id,
+        ItemArmazenado.armazem_id == movimentacao.armazem_id,
+    ]
+    if tipo == 'saida':
+        condicoes.append(ItemArmazenado.quantidade >= movimentacao.quantidade)
+        variacao = -movimentacao.quantidade
+    elif tipo == 'entrada':
+        variacao = movimentacao.quantidade
     else:
         raise HTTPException(status_code=400, detail="Tipo de movimentação inválido (use 'entrada' ou 'saida')")
-    db.commit()
-    db.refresh(item_armazenado)
-    db_movimentacao = MovimentacaoEstoque(**movimentacao.dict())
+    saldo = db.execute(
+        update(ItemArmazenado)
+        .where(and_(*condicoes))
+        .values(quantidade=ItemArmazenado.quantidade + variacao)
+        .returning(ItemArmazenado.quantidade)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if saldo is None:
+        # Nenhuma linha atualizada: só falta descobrir o motivo para a mensagem de erro
+        db.rollback()
+        existe = db.query(ItemArmazenado.id).filter(and_(*condicoes[:2])).first()
+        if not existe:
+            raise HTTPException(status_code=404, detail="Item não encontrado no armazém informado")
+        raise HTTPException(status_code=400, detail="Quantidade insuficiente em estoque para saída")
+    db_movimentacao = MovimentacaoEstoque(**movimentacao.model_dump(exclude={"tipo"}), tipo=tipo)
     db.add(db_movimentacao)
-    db.commit()
-    db.refresh(db_movimentacao)
-    return db_movimentacao
+    sincronizar_snapshot(db, item_estoque_ids=[movimentacao.item_estoque_id], armazem_ids=[movimentacao.armazem_id])
+    # Resposta montada antes do commit (o flush já gerou o id), sem um SELECT extra depois dele
+    resposta = MovimentacaoEstoqueRead.model_validate(db_movimentacao, from_attributes=True)
+    commit_com_resposta(db, resposta)
+    invalidar_itens([movimentacao.item_estoque_id])
+    incrementar_versao_estoque(db)
+    return resposta
+
+def create_movimentacoes_em_lote(db: Session, lote: LoteMovimentacaoEstoque) -> dict:
+    """Aplica N movimentações com um commit (formato de ResultadoLoteMovimentacao).
+
+    Uma consulta trava e lê os saldos de todos os pares item/armazém do lote,
+    as linhas são validadas em ordem contra o saldo corrente, e as variações
+    líquidas entram num único UPDATE ... FROM (VALUES ...). As movimentações
+    são inseridas com INSERT de várias linhas.
+    """
+    movimentacoes = lote.movimentacoes
+    pares = {(m.item_estoque_id, m.armazem_id) for m in movimentacoes}
+    # FOR UPDATE na ordem do id: lotes concorrentes travam as mesmas linhas na mesma ordem, sem deadlock
+    saldos = {
+        (linha.item_estoque_id, linha.armazem_id): linha.quantidade
+        for linha in db.execute(
+            select(ItemArmazenado.item_estoque_id, ItemArmazenado.armazem_id, ItemArmazenado.quantidade)
+            .where(tuple_(ItemArmazenado.item_estoque_id, ItemArmazenado.armazem_id).in_(list(pares)))
+            .order_by(ItemArmazenado.id)
+            .with_for_update()
+        )
+    }
+    saldos_iniciais = dict(saldos)
+
+    aceitas = []
+    erros = []
+    for indice, movimentacao in enumerate(movimentacoes):
+        tipo = movimentacao.tipo.lower()
+        par = (movimentacao.item_estoque_id, movimentacao.armazem_id)
+        if tipo not in ('entrada', 'saida'):
+            erro = "Tipo de movimentação inválido (use 'entrada' ou 'saida')"
+        elif movimentacao.quantidade <= 0:
+            erro = "Quantidade deve ser maior que zero"
+        elif par not in saldos:
+            erro = "Item não encontrado no armazém informado"
+        elif tipo == 'saida' and saldos[par] < movimentacao.quantidade:
+            erro = "Quantidade insuficiente em estoque para saída"
+        else:
+            saldos[par] += movimentacao.quantidade if tipo == 'entrada' else -movimentacao.quantidade
+            aceitas.append((indice, movimentacao, tipo))
+            continue
+        erros.append({"indice": indice, "detalhe": erro})
+
+    if erros and lote.modo == ModoLoteMovimentacao.TUDO_OU_NADA:
+        db.rollback()
+        raise HTTPException(status_code=422, detail={
+            "mensagem": "Nenhuma movimentação aplicada: o lote tem linhas inválidas",
+            "erros": erros,
+        })
+    ids = [None] * len(movimentacoes)
+    if not aceitas:
+        db.rollback()
+        return {"aplicadas": 0, "ids": ids, "erros": erros}
+
+    variacoes = [
+        (item_estoque_id, armazem_id, saldo - saldos_iniciais[(item_estoque_id, armazem_id)])
+        for (item_estoque_id, armazem_id), saldo in saldos.items()
+        if saldo != saldos_iniciais[(item_estoque_id, armazem_id)]
+    ]
+    if variacoes:
+        tabela_variacoes = values(
+            column('item_estoque_id', Integer), column('armazem_id', Integer), column('variacao', Integer),
+            name='variacoes',
+        ).data(variacoes)
+        db.execute(
+            update(ItemArmazenado)
+            .where(
+                ItemArmazenado.item_estoque_id == tabela_variacoes.c.item_estoque_id,
+                ItemArmazenado.armazem_id == tabela_variacoes.c.armazem_id,
+            )
+            .values(quantidade=ItemArmazenado.quantidade + tabela_variacoes.c.variacao)
+            .execution_options(synchronize_session=False)
+        )
+    gerados = db.execute(
+        insert(MovimentacaoEstoque).returning(MovimentacaoEstoque.id, sort_by_parameter_order=True),
+        [dict(movimentacao.model_dump(exclude={"tipo"}), tipo=tipo) for _, movimentacao, tipo in aceitas],
+    ).scalars().all()
+    for (indice, _, _), id in zip(aceitas, gerados):
+        ids[indice] = id
+
+    item_estoque_ids = {movimentacao.item_estoque_id for _, movimentacao, _ in aceitas}
+    sincronizar_snapshot(
+        db, item_estoque_ids=item_estoque_ids, armazem_ids={movimentacao.armazem_id for _, movimentacao, _ in aceitas}
+    )
+    resultado = {"aplicadas": len(aceitas), "ids": ids, "erros": erros}
+    commit_com_resposta(db, resultado)
+    invalidar_itens(item_estoque_ids)
+    incrementar_versao_estoque(db)
+    return resultado
+
+def listar_movimentacoes(
+    db: Session,
+    filtros: FiltroMovimentacaoEstoque,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    decrescente: bool = False,
+) -> dict:
+    """Página de movimentações por keyset em (data_movimentacao, id), no formato de PaginaMovimentacaoEstoque.
+
+    Cada filtro de igualdade tem um índice (coluna, data_movimentacao, id), então
+    a página sai do índice já ordenada, qualquer que seja a profundidade.
+    """
+    ordenacao = "desc" if decrescente else "asc"
+    chave = tuple_(MovimentacaoEstoque.data_movimentacao, MovimentacaoEstoque.id)
+    # Só os campos de MovimentacaoEstoqueRead: a resposta sai por orjson, sem o filtro do response_model
+    query = select(*(MovimentacaoEstoque.__table__.c[campo] for campo in MovimentacaoEstoqueRead.model_fields))
+    if filtros.item_estoque_id is not None:
+        query = query.where(MovimentacaoEstoque.item_estoque_id == filtros.item_estoque_id)
+    if filtros.armazem_id is not None:
+        query = query.where(MovimentacaoEstoque.armazem_id == filtros.armazem_id)
+    if filtros.funcionario_id is not None:
+        query = query.where(MovimentacaoEstoque.funcionario_id == filtros.funcionario_id)
+    if filtros.tipo is not None:
+        query = query.where(MovimentacaoEstoque.tipo == filtros.tipo.value)
+    # Intervalo semiaberto sobre a coluna pura, sem cast para date, para usar os índices
+    if filtros.data_inicio is not None:
+        query = query.where(MovimentacaoEstoque.data_movimentacao >= filtros.data_inicio)
+    if filtros.data_fim is not None:
+        query = query.where(MovimentacaoEstoque.data_movimentacao < filtros.data_fim + timedelta(days=1))
+
+    if cursor:
+        valores = decodificar_cursor(cursor, ordenacao)
+        try:
+            data_movimentacao, id = datetime.fromisoformat(valores[0]), int(valores[1])
+        except (IndexError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Cursor inválido para esta ordenação")
+        posicao = tuple_(data_movimentacao, id)
+        query = query.where(chave < posicao if decrescente else chave > posicao)
+
+    colunas = [MovimentacaoEstoque.data_movimentacao, MovimentacaoEstoque.id]
+    if decrescente:
+        colunas = [coluna.desc() for coluna in colunas]
+    # Uma linha a mais só para saber se existe próxima página
+    resultados = db.execute(query.order_by(*colunas).limit(limit + 1)).mappings().all()
+    tem_proxima = len(resultados) > limit
+    itens = [dict(linha) for linha in resultados[:limit]]
 
-def get_all_movimentacoes(db: Session):
-    return db.query(MovimentacaoEstoque).all()
+    next_cursor = None
+    if tem_proxima:
+        ultima = itens[-1]
+        next_cursor = codificar_cursor([ultima["data_movimentacao"].isoformat(), ultima["id"]], ordenacao)
+    return {"itens": itens, "next_cursor": next_cursor}
 
 def get_movimentacao_by_id(db: Session, id: int):
     return db.query(MovimentacaoEstoque).filter(MovimentacaoEstoque.id == id).first()
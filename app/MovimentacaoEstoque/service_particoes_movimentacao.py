@@ -0,0 +1,137 @@
+# Manutenção das partições mensais de movimentacao_estoque (make particoes-movimentacao)
+from datetime import date, datetime
+from typing import Optional
+import logging
+import os
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Meses futuros que devem existir antes de chegarem movimentações com essas datas
+MOVIMENTACAO_MESES_FUTUROS = int(os.getenv("MOVIMENTACAO_MESES_FUTUROS", "3"))
+# Meses mantidos anexados; os anteriores são desanexados e ficam como tabelas de arquivo. 0 = manter tudo
+MOVIMENTACAO_MESES_RETENCAO = int(os.getenv("MOVIMENTACAO_MESES_RETENCAO", "0"))
+
+_PARTICAO_MENSAL = re.compile(r"^movimentacao_estoque_(\d{4})(\d{2})$")
+
+_SQL_EXISTE = text("SELECT to_regclass(:nome) IS NOT NULL")
+_SQL_PARTICOES = text("""
+    SELECT particao.relname
+    FROM pg_inherits
+    JOIN pg_class particao ON particao.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = 'movimentacao_estoque'::regclass
+    ORDER BY particao.relname
+""")
+_SQL_ULTIMO_CHECKPOINT = text("SELECT max(momento) FROM estoque_checkpoint")
+
+def _somar_meses(mes: date, meses: int) -> date:
+    total = mes.year * 12 + mes.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+def _nome_particao(mes: date) -> str:
+    return f"movimentacao_estoque_{mes:%Y%m}"
+
+def _criar_particao(db: Session, mes: date) -> int:
+    """Cria a partição do mês levando as linhas do mês que caíram em movimentacao_estoque_padrao.
+
+    Com essas linhas na padrão, CREATE TABLE ... PARTITION OF falharia: a
+    tabela é criada avulsa, recebe as linhas e só então é anexada. Devolve
+    quantas linhas foram movidas.
+    """
+    fim = _somar_meses(mes, 1)
+    # O nome e as datas vêm de um date, seguros para a DDL
+    nome = _nome_particao(mes)
+    db.execute(text(f'CREATE TABLE "{nome}" (LIKE movimentacao_estoque INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    movidas = db.execute(text(f"""
+        WITH movidas AS (
+            DELETE FROM movimentacao_estoque_padrao
+            WHERE data_movimentacao >= :inicio AND data_movimentacao < :fim
+            RETURNING *
+        )
+        INSERT INTO "{nome}" SELECT * FROM movidas
+    """), {"inicio": mes, "fim": fim}).rowcount
+    # O ATTACH cria na partição os índices e as chaves estrangeiras da tabela pai
+    db.execute(text(
+        f"ALTER TABLE movimentacao_estoque ATTACH PARTITION \"{nome}\" "
+        f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{fim.isoformat()}')"
+    ))
+    if movidas:
+        logger.warning("%d movimentações movidas de movimentacao_estoque_padrao para %s", movidas, nome)
+    return movidas
+
+def _coberta_por_checkpoint(db: Session, nome: str, fim: date, ultimo_checkpoint: Optional[datetime]) -> bool:
+    """Se o último checkpoint de estoque é posterior a tudo o que está na partição.
+
+    O histórico soma as movimentações pelo registrado_em a partir do checkpoint
+    mais próximo; uma movimentação retroativa pode ter sido gravada depois do
+    fim do mês, por isso vale o maior registrado_em da partição.
+    """
+    if ultimo_checkpoint is None:
+        return False
+    ultimo_registro = db.execute(text(f'SELECT max(registrado_em) FROM "{nome}"')).scalar()
+    return ultimo_checkpoint >= max(datetime.combine(fim, datetime.min.time()), ultimo_registro or datetime.min)
+
+def manter_particoes(db: Session, hoje: Optional[date] = None) -> dict:
+    """Cria as partições do mês atual e dos próximos meses e desanexa as antigas.
+
+    Agendar uma vez por dia (ou ao menos uma vez por mês). Se a manutenção
+    atrasar, as linhas sem partição caem em movimentacao_estoque_padrao e
+    são movidas para a partição do mês quando ela é criada.
+    Um mês só é desanexado quando há um checkpoint de estoque posterior a
+    todas as suas movimentações (make checkpoint-estoque); até lá fica anexado.
+    DETACH trava a tabela pai por um instante; rode fora do horário de pico.
+    """
+    mes_atual = (hoje or date.today()).replace(day=1)
+    faltantes = [
+        mes for mes in (_somar_meses(mes_atual, i) for i in range(MOVIMENTACAO_MESES_FUTUROS + 1))
+        # Uma partição desanexada (arquivada) mantém o nome e não é recriada
+        if not db.execute(_SQL_EXISTE, {"nome": _nome_particao(mes)}).scalar_one()
+    ]
+    movidas = 0
+    if faltantes:
+        # Até o commit nenhuma linha nova entra na padrão, senão o ATTACH a encontraria lá
+        db.execute(text("LOCK TABLE movimentacao_estoque_padrao IN SHARE ROW EXCLUSIVE MODE"))
+        for mes in faltantes:
+            movidas += _criar_particao(db, mes)
+
+    desanexadas, aguardando_checkpoint = [], []
+    if MOVIMENTACAO_MESES_RETENCAO > 0:
+        limite = _somar_meses(mes_atual, -MOVIMENTACAO_MESES_RETENCAO)
+        ultimo_checkpoint = db.execute(_SQL_ULTIMO_CHECKPOINT).scalar()
+        for nome in db.execute(_SQL_PARTICOES).scalars().all():
+            encontrado = _PARTICAO_MENSAL.match(nome)
+            if not encontrado:
+                continue
+            mes = date(int(encontrado.group(1)), int(encontrado.group(2)), 1)
+            if mes >= limite:
+                continue
+            # O nome vem do catálogo e do padrão acima, seguro para a DDL
+            if not _coberta_por_checkpoint(db, nome, _somar_meses(mes, 1), ultimo_checkpoint):
+                aguardando_checkpoint.append(nome)
+                continue
+            db.execute(text(f'ALTER TABLE movimentacao_estoque DETACH PARTITION "{nome}"'))
+            desanexadas.append(nome)
+    db.commit()
+    if aguardando_checkpoint:
+        logger.warning("Partições mantidas por falta de checkpoint posterior: %s", aguardando_checkpoint)
+    logger.info(
+        "Partições de movimentação: %d criadas (%d linhas movidas da padrão), desanexadas: %s",
+        len(faltantes), movidas, desanexadas or "nenhuma"
+    )
+    return {
+        "criadas": len(faltantes),
+        "linhas_movidas": movidas,
+        "desanexadas": desanexadas,
+        "aguardando_checkpoint": aguardando_checkpoint,
+    }
+
+if __name__ == "__main__":
+    from app.settings import SessionLocal, usar_timeout_manutencao
+
+    logging.basicConfig(level=logging.INFO)
+    usar_timeout_manutencao()
+    with SessionLocal() as sessao:
+        print(manter_particoes(sessao))
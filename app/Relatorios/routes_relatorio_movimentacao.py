@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import date, datetime
 import io
 
-from app.settings import get_db
+from app.settings import get_async_db_readonly, executar_cancelavel, timeout_relatorio
 
 
 
@@ -21,14 +21,16 @@ from .service_relatorio_movimentacao import ServiceRelatorioMovimentacao
 
 router = APIRouter(
     prefix="/relatorios/movimentacoes",
+    dependencies=[Depends(timeout_relatorio)],
     tags=["Relatórios - Movimentações"]
 )
 
 @router.get("/mais-vendido", response_model=ItemMaisVendidoResponse)
-def obter_item_mais_vendido(
+async def obter_item_mais_vendido(
+    request: Request,
     mes: int = Query(..., ge=1, le=12, description="Mês para relatório"),
     ano: int = Query(..., description="Ano para relatório"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Retorna o item mais retirado (mais vendido) no mês/ano especificado.
@@ -37,13 +39,16 @@ def obter_item_mais_vendido(
         from calendar import monthrange
         inicio = date(ano, mes, 1)
         fim = date(ano, mes, monthrange(ano, mes)[1])
-        item = ServiceRelatorioMovimentacao.obter_item_mais_vendido(db, inicio, fim)
+        item = await executar_cancelavel(request, db, ServiceRelatorioMovimentacao.obter_item_mais_vendido, inicio, fim)
         return ItemMaisVendidoResponse(item=item or "")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao obter item mais vendido: {e}")
 
 @router.get("/", response_model=RelatorioMovimentacao)
-def obter_relatorio_movimentacoes(
+async def obter_relatorio_movimentacoes(
+    request: Request,
     data_inicio: Optional[date] = Query(None, description="Data inicial do período (YYYY-MM-DD)"),
     data_fim: Optional[date] = Query(None, description="Data final do período (YYYY-MM-DD)"),
     tipo: Optional[TipoMovimentacao] = Query(None, description="Tipo de movimentação"),
@@ -51,7 +56,7 @@ def obter_relatorio_movimentacoes(
     armazem_id: Optional[int] = Query(None, description="ID do armazém"),
     funcionario_id: Optional[int] = Query(None, description="ID do funcionário responsável"),
     item_id: Optional[int] = Query(None, description="ID do item de estoque"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Gera relatório completo de movimentações de estoque com filtros opcionais.
@@ -80,9 +85,11 @@ def obter_relatorio_movimentacoes(
             item_id=item_id
         )
         
-        relatorio = ServiceRelatorioMovimentacao.gerar_relatorio(db, filtros)
+        relatorio = await executar_cancelavel(request, db, ServiceRelatorioMovimentacao.gerar_relatorio, filtros)
         return relatorio
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -90,12 +97,13 @@ def obter_relatorio_movimentacoes(
         )
 
 @router.get("/estatisticas", response_model=EstatisticasMovimentacao)
-def obter_estatisticas_movimentacoes(
+async def obter_estatisticas_movimentacoes(
+    request: Request,
     data_inicio: Optional[date] = Query(None, description="Data inicial do período (YYYY-MM-DD)"),
     data_fim: Optional[date] = Query(None, description="Data final do período (YYYY-MM-DD)"),
     mes: Optional[int] = Query(None, ge=1, le=12, description="Mês para relatório rápido"),
     ano: Optional[int] = Query(None, description="Ano para relatório rápido"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém apenas as estatísticas das movimentações para um período.
@@ -114,11 +122,14 @@ def obter_estatisticas_movimentacoes(
             inicio = date(ano, mes, 1)
             fim = date(ano, mes, monthrange(ano, mes)[1])
             data_inicio, data_fim = inicio, fim
-        estatisticas = ServiceRelatorioMovimentacao.obter_resumo_periodo(
-            db, data_inicio, data_fim
+        estatisticas = await executar_cancelavel(
+            request, db,
+            ServiceRelatorioMovimentacao.obter_resumo_periodo, data_inicio, data_fim
         )
         return estatisticas
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -126,8 +137,9 @@ def obter_estatisticas_movimentacoes(
         )
 
 @router.get("/estatisticas/mes-atual", response_model=EstatisticasMovimentacao)
-def obter_estatisticas_mes_atual(
-    db: Session = Depends(get_db),
+async def obter_estatisticas_mes_atual(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém estatísticas das movimentações apenas do mês atual.
@@ -139,11 +151,14 @@ def obter_estatisticas_mes_atual(
         hoje = date.today()
         inicio_mes = date(hoje.year, hoje.month, 1)
         
-        estatisticas = ServiceRelatorioMovimentacao.obter_resumo_periodo(
-            db, inicio_mes, hoje
+        estatisticas = await executar_cancelavel(
+            request, db,
+            ServiceRelatorioMovimentacao.obter_resumo_periodo, inicio_mes, hoje
         )
         return estatisticas
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -151,7 +166,8 @@ def obter_estatisticas_mes_atual(
         )
 
 @router.get("/export/csv")
-def exportar_movimentacoes_csv(
+async def exportar_movimentacoes_csv(
+    request: Request,
     data_inicio: Optional[date] = Query(None, description="Data inicial do período"),
     data_fim: Optional[date] = Query(None, description="Data final do período"),
     tipo: Optional[TipoMovimentacao] = Query(None, description="Tipo de movimentação"),
@@ -159,7 +175,7 @@ def exportar_movimentacoes_csv(
     armazem_id: Optional[int] = Query(None, description="ID do armazém"),
     funcionario_id: Optional[int] = Query(None, description="ID do funcionário responsável"),
     item_id: Optional[int] = Query(None, description="ID do item de estoque"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Exporta relatório de movimentações em formato CSV.
@@ -180,7 +196,7 @@ def exportar_movimentacoes_csv(
             item_id=item_id
         )
         
-        relatorio = ServiceRelatorioMovimentacao.gerar_relatorio(db, filtros)
+        relatorio = await executar_cancelavel(request, db, ServiceRelatorioMovimentacao.gerar_relatorio, filtros)
         csv_content = ServiceRelatorioMovimentacao.exportar_csv(relatorio)
         
         # Criar nome do arquivo baseado no período
@@ -197,6 +213,8 @@ def exportar_movimentacoes_csv(
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -204,11 +222,12 @@ def exportar_movimentacoes_csv(
         )
 
 @router.get("/por-produto/{produto_nome}")
-def obter_movimentacoes_por_produto(
+async def obter_movimentacoes_por_produto(
+    request: Request,
     produto_nome: str,
     data_inicio: Optional[date] = Query(None, description="Data inicial do período"),
     data_fim: Optional[date] = Query(None, description="Data final do período"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém movimentações específicas de um produto.
@@ -222,9 +241,11 @@ def obter_movimentacoes_por_produto(
             data_fim=data_fim
         )
         
-        relatorio = ServiceRelatorioMovimentacao.gerar_relatorio(db, filtros)
+        relatorio = await executar_cancelavel(request, db, ServiceRelatorioMovimentacao.gerar_relatorio, filtros)
         return relatorio
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -232,11 +253,12 @@ def obter_movimentacoes_por_produto(
         )
 
 @router.get("/por-armazem/{armazem_id}")
-def obter_movimentacoes_por_armazem(
+async def obter_movimentacoes_por_armazem(
+    request: Request,
     armazem_id: int,
     data_inicio: Optional[date] = Query(None, description="Data inicial do período"),
     data_fim: Optional[date] = Query(None, description="Data final do período"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém movimentações específicas de um armazém.
@@ -250,9 +272,11 @@ def obter_movimentacoes_por_armazem(
             data_fim=data_fim
         )
         
-        relatorio = ServiceRelatorioMovimentacao.gerar_relatorio(db, filtros)
+        relatorio = await executar_cancelavel(request, db, ServiceRelatorioMovimentacao.gerar_relatorio, filtros)
         return relatorio
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -260,11 +284,12 @@ def obter_movimentacoes_por_armazem(
         )
 
 @router.get("/por-funcionario/{funcionario_id}")
-def obter_movimentacoes_por_funcionario(
+async def obter_movimentacoes_por_funcionario(
+    request: Request,
     funcionario_id: int,
     data_inicio: Optional[date] = Query(None, description="Data inicial do período"),
     data_fim: Optional[date] = Query(None, description="Data final do período"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """
     Obtém movimentações realizadas por um funcionário específico.
@@ -278,9 +303,11 @@ def obter_movimentacoes_por_funcionario(
             data_fim=data_fim
         )
         
-        relatorio = ServiceRelatorioMovimentacao.gerar_relatorio(db, filtros)
+        relatorio = await executar_cancelavel(request, db, ServiceRelatorioMovimentacao.gerar_relatorio, filtros)
         return relatorio
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
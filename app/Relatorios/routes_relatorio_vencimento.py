@@ -1,8 +1,8 @@
 from typing import List
-from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from app.settings import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.settings import get_async_db, get_async_db_readonly, executar_cancelavel, timeout_relatorio
 
 
 from app.Relatorios.schema_relatorio_vencimento import (
@@ -12,13 +12,20 @@ from app.Relatorios.schema_relatorio_vencimento import (
     ExportacaoConfig
 )
 from app.Relatorios import service_relatorio_vencimento
+from app.serializacao import RespostaORJSON
+from app.versao_estoque import etag_versao_estoque
 import io
 from datetime import date
 
-router = APIRouter(prefix="/relatorios/vencimento", tags=["Relatórios - Vencimento"])
+router = APIRouter(
+    prefix="/relatorios/vencimento",
+    tags=["Relatórios - Vencimento"],
+    dependencies=[Depends(timeout_relatorio)],
+)
 
 @router.get("/", response_model=RelatorioVencimento)
-def gerar_relatorio_vencimento(
+async def gerar_relatorio_vencimento(
+    request: Request,
     dias_limite: int = Query(30, description="Dias limite para análise", ge=0, le=365),
     incluir_vencidos: bool = Query(True, description="Incluir produtos já vencidos"),
     armazem_id: int = Query(None, description="Filtrar por armazém específico"),
@@ -26,7 +33,7 @@ def gerar_relatorio_vencimento(
     tipo_produto: str = Query(None, description="Filtrar por tipo de produto"),
     valor_minimo: float = Query(None, description="Valor mínimo para incluir", ge=0),
     apenas_com_estoque: bool = Query(True, description="Apenas itens com estoque > 0"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Gerar relatório completo de produtos vencidos e próximos do vencimento"""
     
@@ -40,10 +47,13 @@ def gerar_relatorio_vencimento(
         apenas_com_estoque=apenas_com_estoque
     )
     
-    return service_relatorio_vencimento.gerar_relatorio_vencimento(db, filtros)
+    return RespostaORJSON(await executar_cancelavel(
+        request, db, service_relatorio_vencimento.gerar_relatorio_vencimento_linhas, filtros
+    ))
 
 @router.get("/csv")
-def exportar_relatorio_csv(
+async def exportar_relatorio_csv(
+    request: Request,
     dias_limite: int = Query(30, description="Dias limite para análise", ge=0, le=365),
     incluir_vencidos: bool = Query(True, description="Incluir produtos já vencidos"),
     armazem_id: int = Query(None, description="Filtrar por armazém específico"),
@@ -51,7 +61,7 @@ def exportar_relatorio_csv(
     tipo_produto: str = Query(None, description="Filtrar por tipo de produto"),
     valor_minimo: float = Query(None, description="Valor mínimo para incluir", ge=0),
     apenas_com_estoque: bool = Query(True, description="Apenas itens com estoque > 0"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Exportar relatório de vencimento em formato CSV"""
     
@@ -65,7 +75,7 @@ def exportar_relatorio_csv(
         apenas_com_estoque=apenas_com_estoque
     )
     
-    relatorio = service_relatorio_vencimento.gerar_relatorio_vencimento(db, filtros)
+    relatorio = await executar_cancelavel(request, db, service_relatorio_vencimento.gerar_relatorio_vencimento, filtros)
     csv_content = service_relatorio_vencimento.exportar_relatorio_csv(relatorio)
     
     # Nome do arquivo com data
@@ -80,23 +90,29 @@ def exportar_relatorio_csv(
     )
 
 @router.get("/vencidos-hoje", response_model=List[ItemVencimento])
-def produtos_vencidos_hoje(
-    db: Session = Depends(get_db),
+async def produtos_vencidos_hoje(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Produtos que vencem hoje - para dashboard/alertas"""
-    return service_relatorio_vencimento.obter_produtos_vencidos_hoje(db)
+    return RespostaORJSON(await executar_cancelavel(request, db, service_relatorio_vencimento.obter_produtos_vencidos_hoje))
 
 @router.get("/criticos", response_model=List[ItemVencimento])
-def produtos_criticos(
+async def produtos_criticos(
+    request: Request,
     dias_limite: int = Query(3, description="Dias limite para considerar crítico", ge=0, le=7),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Produtos em situação crítica (vencimento muito próximo)"""
-    return service_relatorio_vencimento.obter_produtos_criticos(db, dias_limite)
+    return RespostaORJSON(await executar_cancelavel(
+        request, db, service_relatorio_vencimento.obter_produtos_criticos, dias_limite
+    ))
 
-@router.get("/resumo-rapido")
-def resumo_vencimento_rapido(
-    db: Session = Depends(get_db),
+@router.get("/resumo-rapido", dependencies=[Depends(etag_versao_estoque)])
+async def resumo_vencimento_rapido(
+    request: Request,
+    # Primário: a ETag vem da versão do primário e não pode acompanhar dados atrasados da réplica
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Resumo rápido para dashboard - produtos críticos dos próximos 7 dias"""
     
@@ -106,24 +122,28 @@ def resumo_vencimento_rapido(
         apenas_com_estoque=True
     )
     
-    relatorio = service_relatorio_vencimento.gerar_relatorio_vencimento(db, filtros)
+    relatorio = await executar_cancelavel(
+        request, db, service_relatorio_vencimento.gerar_relatorio_vencimento_linhas, filtros
+    )
+    resumo = relatorio["resumo"]
     
     return {
         "data_consulta": date.today(),
-        "produtos_vencidos": relatorio.resumo.produtos_vencidos,
-        "vence_hoje": relatorio.resumo.produtos_vence_hoje,
-        "vence_amanha": relatorio.resumo.produtos_vence_amanha,
-        "vence_3_dias": relatorio.resumo.produtos_vence_3_dias,
-        "vence_7_dias": relatorio.resumo.produtos_vence_7_dias,
-        "valor_comprometido": relatorio.resumo.valor_total_vencidos + relatorio.resumo.valor_total_criticos
+        "produtos_vencidos": resumo.produtos_vencidos,
+        "vence_hoje": resumo.produtos_vence_hoje,
+        "vence_amanha": resumo.produtos_vence_amanha,
+        "vence_3_dias": resumo.produtos_vence_3_dias,
+        "vence_7_dias": resumo.produtos_vence_7_dias,
+        "valor_comprometido": resumo.valor_total_vencidos + resumo.valor_total_criticos
     }
 
 @router.get("/por-armazem/{armazem_id}", response_model=RelatorioVencimento)
-def relatorio_vencimento_por_armazem(
+async def relatorio_vencimento_por_armazem(
+    request: Request,
     armazem_id: int,
     dias_limite: int = Query(30, description="Dias limite para análise", ge=0, le=365),
     incluir_vencidos: bool = Query(True, description="Incluir produtos já vencidos"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Relatório de vencimento específico de um armazém"""
     
@@ -134,14 +154,17 @@ def relatorio_vencimento_por_armazem(
         apenas_com_estoque=True
     )
     
-    return service_relatorio_vencimento.gerar_relatorio_vencimento(db, filtros)
+    return RespostaORJSON(await executar_cancelavel(
+        request, db, service_relatorio_vencimento.gerar_relatorio_vencimento_linhas, filtros
+    ))
 
 @router.get("/por-fornecedor/{fornecedor_id}", response_model=RelatorioVencimento)
-def relatorio_vencimento_por_fornecedor(
+async def relatorio_vencimento_por_fornecedor(
+    request: Request,
     fornecedor_id: int,
     dias_limite: int = Query(30, description="Dias limite para análise", ge=0, le=365),
     incluir_vencidos: bool = Query(True, description="Incluir produtos já vencidos"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db_readonly),
 ):
     """Relatório de vencimento específico de um fornecedor"""
     
@@ -152,4 +175,6 @@ def relatorio_vencimento_por_fornecedor(
         apenas_com_estoque=True
     )
     
-    return service_relatorio_vencimento.gerar_relatorio_vencimento(db, filtros)
+    return RespostaORJSON(await executar_cancelavel(
+        request, db, service_relatorio_vencimento.gerar_relatorio_vencimento_linhas, filtros
+    ))
@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_, func, desc
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import csv
 import io
 
@@ -68,14 +68,15 @@ class ServiceRelatorioMovimentacao:
     def _aplicar_filtros(query, filtros: FiltroRelatorioMovimentacao):
         """Aplica filtros à query de movimentações"""
         
+        # Intervalo semiaberto sobre a coluna pura: usa os índices e lê só as partições do período
         if filtros.data_inicio:
             query = query.filter(
-                func.date(MovimentacaoEstoque.data_movimentacao) >= filtros.data_inicio
+                MovimentacaoEstoque.data_movimentacao >= filtros.data_inicio
             )
         
         if filtros.data_fim:
             query = query.filter(
-                func.date(MovimentacaoEstoque.data_movimentacao) <= filtros.data_fim
+                MovimentacaoEstoque.data_movimentacao < filtros.data_fim + timedelta(days=1)
             )
         
         if filtros.tipo:
@@ -224,8 +225,8 @@ class ServiceRelatorioMovimentacao:
             MovimentacaoEstoque.item_estoque_id.label('item_estoque_id'),
             func.sum(MovimentacaoEstoque.quantidade).label('total')
         ).filter(
-            func.date(MovimentacaoEstoque.data_movimentacao) >= data_inicio,
-            func.date(MovimentacaoEstoque.data_movimentacao) <= data_fim,
+            MovimentacaoEstoque.data_movimentacao >= data_inicio,
+            MovimentacaoEstoque.data_movimentacao < data_fim + timedelta(days=1),
             MovimentacaoEstoque.tipo == 'saida'
         ).group_by(MovimentacaoEstoque.item_estoque_id).order_by(desc('total')).limit(1).first()
         if not subq:
@@ -1,6 +1,6 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, cast, Date
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 import csv
@@ -32,8 +32,8 @@ def _determinar_status_vencimento(dias_para_vencimento: int) -> StatusVencimento
     else:
         return StatusVencimento.NORMAL
 
-def gerar_relatorio_vencimento(db: Session, filtros: FiltroRelatorioVencimento) -> RelatorioVencimento:
-    """Gera relatório completo de produtos vencidos e próximos do vencimento"""
+def gerar_relatorio_vencimento_linhas(db: Session, filtros: FiltroRelatorioVencimento) -> dict:
+    """Gera o relatório no formato de RelatorioVencimento, com itens em dicts prontos para serialização"""
     
     hoje = date.today()
     data_limite = hoje + timedelta(days=filtros.dias_limite)
@@ -53,8 +53,8 @@ def gerar_relatorio_vencimento(db: Session, filtros: FiltroRelatorioVencimento)
         ItemArmazenado.armazem_id,
         Armazem.local_armazem.label('armazem_nome'),
         ItemArmazenado.quantidade.label('quantidade_atual'),
-        # Calcular dias para vencimento
-        (func.extract('day', ItemEstoque.data_validade - func.current_date())).label('dias_para_vencimento')
+        # Calcular dias para vencimento (date - date resulta em integer)
+        (cast(ItemEstoque.data_validade, Date) - func.current_date()).label('dias_para_vencimento')
     ).join(
         ItemArmazenado, ItemEstoque.id == ItemArmazenado.item_estoque_id
     ).join(
@@ -116,24 +116,10 @@ def gerar_relatorio_vencimento(db: Session, filtros: FiltroRelatorioVencimento)
         status_vencimento = _determinar_status_vencimento(dias_para_vencimento)
         valor_total = resultado.valor_unitario * resultado.quantidade_atual
         
-        item = ItemVencimento(
-            item_estoque_id=resultado.item_estoque_id,
-            produto_id=resultado.produto_id,
-            produto_nome=resultado.produto_nome,
-            tipo_produto=resultado.tipo_produto,
-            codigo_barras=resultado.codigo_barras,
-            lote=resultado.lote,
-            data_validade=resultado.data_validade,
-            dias_para_vencimento=dias_para_vencimento,
-            status_vencimento=status_vencimento,
-            quantidade_atual=resultado.quantidade_atual,
-            valor_unitario=resultado.valor_unitario,
-            valor_total=valor_total,
-            fornecedor_id=resultado.fornecedor_id,
-            fornecedor_nome=resultado.fornecedor_nome,
-            armazem_id=resultado.armazem_id,
-            armazem_nome=resultado.armazem_nome
-        )
+        item = resultado._asdict()
+        item["dias_para_vencimento"] = dias_para_vencimento
+        item["status_vencimento"] = status_vencimento
+        item["valor_total"] = valor_total
         
         itens_vencimento.append(item)
         
@@ -178,14 +164,19 @@ def gerar_relatorio_vencimento(db: Session, filtros: FiltroRelatorioVencimento)
     )
     
     # Montar relatório final
-    relatorio = RelatorioVencimento(
-        data_geracao=hoje,
-        parametros=filtros.dict(),
-        resumo=resumo,
-        itens=itens_vencimento
-    )
-    
-    return relatorio
+    return {
+        "data_geracao": hoje,
+        "parametros": filtros.dict(),
+        "resumo": resumo,
+        "itens": itens_vencimento
+    }
+
+def gerar_relatorio_vencimento(db: Session, filtros: FiltroRelatorioVencimento) -> RelatorioVencimento:
+    """Gera relatório completo de produtos vencidos e próximos do vencimento"""
+    relatorio = gerar_relatorio_vencimento_linhas(db, filtros)
+    # Itens vindos do banco já têm os tipos do schema: model_construct evita revalidar cada um
+    relatorio["itens"] = [ItemVencimento.model_construct(**item) for item in relatorio["itens"]]
+    return RelatorioVencimento.model_construct(**relatorio)
 
 def exportar_relatorio_csv(relatorio: RelatorioVencimento) -> str:
     """Exporta relatório para formato CSV"""
@@ -222,20 +213,23 @@ def exportar_relatorio_csv(relatorio: RelatorioVencimento) -> str:
     
     return output.getvalue()
 
-def obter_produtos_vencidos_hoje(db: Session) -> List[ItemVencimento]:
+def obter_produtos_vencidos_hoje(db: Session) -> List[dict]:
     """Retorna produtos que vencem hoje"""
     filtros = FiltroRelatorioVencimento(
         dias_limite=0,
         incluir_vencidos=False
     )
-    relatorio = gerar_relatorio_vencimento(db, filtros)
-    return [item for item in relatorio.itens if item.dias_para_vencimento == 0]
+    relatorio = gerar_relatorio_vencimento_linhas(db, filtros)
+    return [item for item in relatorio["itens"] if item["dias_para_vencimento"] == 0]
 
-def obter_produtos_criticos(db: Session, dias_limite: int = 3) -> List[ItemVencimento]:
+def obter_produtos_criticos(db: Session, dias_limite: int = 3) -> List[dict]:
     """Retorna produtos em situação crítica (vencimento próximo)"""
     filtros = FiltroRelatorioVencimento(
         dias_limite=dias_limite,
         incluir_vencidos=True
     )
-    relatorio = gerar_relatorio_vencimento(db, filtros)
-    return [item for item in relatorio.itens if item.status_vencimento in [StatusVencimento.VENCIDO, StatusVencimento.CRITICO]]
+    relatorio = gerar_relatorio_vencimento_linhas(db, filtros)
+    return [
+        item for item in relatorio["itens"]
+        if item["status_vencimento"] in [StatusVencimento.VENCIDO, StatusVencimento.CRITICO]
+    ]
@@ -4,6 +4,7 @@ from typing import List
 from app.settings import get_db
 from app.SuplementoAlimentar.schema_suplemento_alimentar import SuplementoAlimentarCreate, SuplementoAlimentarRead
 from app.SuplementoAlimentar import service_suplemento_alimentar
+from app.busca import ModoBusca
 
 router = APIRouter(prefix="/suplemento-alimentar", tags=["SuplementoAlimentar"])
 
@@ -20,8 +21,8 @@ def get_suplemento_by_id(id: int, db: Session = Depends(get_db)):
     return service_suplemento_alimentar.get_suplemento_by_id(db, id)
 
 @router.get("/search/", response_model=List[SuplementoAlimentarRead])
-def search_suplementos(query: str, db: Session = Depends(get_db)):
-    return service_suplemento_alimentar.search_suplementos(db, query)
+def search_suplementos(query: str, modo: ModoBusca = ModoBusca.CONTEM, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return service_suplemento_alimentar.search_suplementos(db, query, skip, limit, modo)
 
 @router.put("/{id}", response_model=SuplementoAlimentarRead)
 def update_suplemento(id: int, suplemento: SuplementoAlimentarCreate, db: Session = Depends(get_db)):
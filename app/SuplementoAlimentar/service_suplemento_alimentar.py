@@ -2,6 +2,7 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from app.SuplementoAlimentar.model_suplemento_alimentar import SuplementoAlimentar
 from app.SuplementoAlimentar.schema_suplemento_alimentar import SuplementoAlimentarCreate
+from app.busca import ModoBusca, condicao_busca, relevancia
 
 def create_suplemento(db: Session, suplemento: SuplementoAlimentarCreate):
     db_suplemento = SuplementoAlimentar(**suplemento.dict())
@@ -22,12 +23,12 @@ def get_suplemento_by_id(db: Session, id: int):
         )
     return suplemento
 
-def search_suplementos(db: Session, query: str):
-    return db.query(SuplementoAlimentar).filter(
-        SuplementoAlimentar.nome.ilike(f"%{query}%") |
-        SuplementoAlimentar.principio_ativo.ilike(f"%{query}%") |
-        SuplementoAlimentar.fabricante.ilike(f"%{query}%")
-    ).all()
+def search_suplementos(db: Session, query: str, skip: int = 0, limit: int = 100, modo: ModoBusca = ModoBusca.CONTEM):
+    colunas = [SuplementoAlimentar.nome, SuplementoAlimentar.principio_ativo, SuplementoAlimentar.fabricante]
+    consulta = db.query(SuplementoAlimentar).filter(condicao_busca(colunas, query, modo))
+    if modo == ModoBusca.RELEVANCIA:
+        consulta = consulta.order_by(relevancia(colunas, query).desc())
+    return consulta.order_by(SuplementoAlimentar.id).offset(skip).limit(limit).all()
 
 def update_suplemento(db: Session, id: int, suplemento: SuplementoAlimentarCreate):
     db_suplemento = get_suplemento_by_id(db, id)
@@ -0,0 +1,32 @@
+# Atualização de um banco criado por uma versão anterior do init.sql (make atualizar-banco)
+from pathlib import Path
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.ConsultaEstoque.service_snapshot_estoque import reconstruir_snapshot
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_ATUALIZACAO = Path(__file__).resolve().parent.parent / "atualizar_banco.sql"
+
+def atualizar_banco(db: Session) -> dict:
+    """Aplica atualizar_banco.sql e preenche estoque_snapshot, com um único commit no fim.
+
+    Se qualquer passo falhar, nada é aplicado e o banco fica como estava.
+    """
+    # no_parameters: o script tem % (format() do plpgsql) que o driver não pode tratar como parâmetro
+    db.connection().execution_options(no_parameters=True).exec_driver_sql(
+        SCRIPT_ATUALIZACAO.read_text(encoding="utf-8")
+    )
+    logger.info("Esquema atualizado; reconstruindo estoque_snapshot")
+    return reconstruir_snapshot(db)
+
+if __name__ == "__main__":
+    import app.main  # noqa: F401 - registra todos os mapeamentos antes de consultar
+    from app.settings import SessionLocal, usar_timeout_manutencao
+
+    logging.basicConfig(level=logging.INFO)
+    usar_timeout_manutencao()
+    with SessionLocal() as sessao:
+        print(atualizar_banco(sessao))
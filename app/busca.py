@@ -0,0 +1,43 @@
+# Busca por nome com pg_trgm + unaccent, compartilhada pelos serviços de produto e de estoque
+from enum import Enum
+from typing import List
+
+from sqlalchemy import func, literal, or_
+
+class ModoBusca(str, Enum):
+    # Trecho do texto, sem diferenciar acento nem maiúsculas
+    CONTEM = "contem"
+    # Também aceita erros de digitação ('dipirna' acha 'Dipirona') e ordena pela similaridade
+    RELEVANCIA = "relevancia"
+
+def normalizar(expressao):
+    """f_busca_normalizada (init.sql): lower + unaccent, a mesma expressão dos índices GIN de trigramas"""
+    return func.f_busca_normalizada(expressao)
+
+def _escapar_like(termo: str) -> str:
+    return termo.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+def condicao_contem(coluna, termo: str):
+    """Equivalente indexável de ``coluna ILIKE '%termo%'`` que também ignora acentos"""
+    padrao = literal(f"%{_escapar_like(termo)}%")
+    return normalizar(coluna).like(normalizar(padrao), escape="!")
+
+def condicao_parecida(coluna, termo: str):
+    """Alguma palavra da coluna é parecida com o termo (pg_trgm.word_similarity_threshold).
+
+    ``coluna %> termo`` é o comutador de ``termo <% coluna``; com a coluna à
+    esquerda o operador pertence à classe gin_trgm_ops e usa o índice.
+    """
+    return normalizar(coluna).op("%>")(normalizar(literal(termo)))
+
+def condicao_busca(colunas: List, termo: str, modo: ModoBusca = ModoBusca.CONTEM):
+    """OR das condições do modo escolhido sobre todas as colunas"""
+    condicoes = [condicao_contem(coluna, termo) for coluna in colunas]
+    if modo == ModoBusca.RELEVANCIA:
+        condicoes += [condicao_parecida(coluna, termo) for coluna in colunas]
+    return or_(*condicoes)
+
+def relevancia(colunas: List, termo: str):
+    """Maior word_similarity entre o termo e as colunas, para ORDER BY ... DESC"""
+    similaridades = [func.word_similarity(normalizar(literal(termo)), normalizar(coluna)) for coluna in colunas]
+    return similaridades[0] if len(similaridades) == 1 else func.greatest(*similaridades)
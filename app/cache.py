@@ -0,0 +1,101 @@
+# Cache LRU com TTL em memória, por processo (cada worker tem o seu)
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+import threading
+import time
+
+class CacheLRU:
+    """Mapa limitado por tamanho e por tempo de vida, com contadores de acerto.
+
+    Seguro entre threads: as rotas síncronas rodam no threadpool e as
+    assíncronas no loop de eventos, e as duas podem usar o mesmo cache.
+    ``ao_descartar(chave, valor)`` é chamado sempre que uma entrada sai do
+    cache (expiração, despejo por tamanho ou invalidação).
+    """
+
+    def __init__(self, nome: str, tamanho_maximo: int, ttl_segundos: float,
+                 ao_descartar: Optional[Callable[[Hashable, Any], None]] = None):
+        self.nome = nome
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl_segundos = ttl_segundos
+        self._ao_descartar = ao_descartar
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expiradas = 0
+        self.despejadas = 0
+        self.invalidadas = 0
+        _caches[nome] = self
+
+    def _descartar(self, chave, valor):
+        if self._ao_descartar is not None:
+            self._ao_descartar(chave, valor)
+
+    def obter(self, chave: Hashable, padrao: Any = None) -> Any:
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return padrao
+            valor, expira_em = entrada
+            if expira_em <= time.monotonic():
+                del self._entradas[chave]
+                self.expiradas += 1
+                self.falhas += 1
+                self._descartar(chave, valor)
+                return padrao
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def gravar(self, chave: Hashable, valor: Any):
+        if self.tamanho_maximo <= 0:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._descartar(chave, anterior[0])
+            self._entradas[chave] = (valor, time.monotonic() + self.ttl_segundos)
+            while len(self._entradas) > self.tamanho_maximo:
+                chave_antiga, (valor_antigo, _) = self._entradas.popitem(last=False)
+                self.despejadas += 1
+                self._descartar(chave_antiga, valor_antigo)
+
+    def invalidar(self, chave: Hashable) -> bool:
+        with self._lock:
+            entrada = self._entradas.pop(chave, None)
+            if entrada is None:
+                return False
+            self.invalidadas += 1
+            self._descartar(chave, entrada[0])
+            return True
+
+    def limpar(self):
+        with self._lock:
+            for chave, (valor, _) in self._entradas.items():
+                self._descartar(chave, valor)
+            self.invalidadas += len(self._entradas)
+            self._entradas.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "nome": self.nome,
+                "tamanho": len(self._entradas),
+                "tamanho_maximo": self.tamanho_maximo,
+                "ttl_segundos": self.ttl_segundos,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "expiradas": self.expiradas,
+                "despejadas": self.despejadas,
+                "invalidadas": self.invalidadas,
+            }
+
+_caches: Dict[str, CacheLRU] = {}
+
+def estatisticas_caches() -> List[dict]:
+    """Contadores de todos os caches registrados neste processo"""
+    return [cache.estatisticas() for cache in _caches.values()]
@@ -1,6 +1,9 @@
 import os
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import create_engine, text  # Adicione text aqui
 from sqlalchemy.orm import sessionmaker
@@ -21,9 +24,20 @@ from app.ConsultaEstoque.routes_consulta_estoque import router as router_consult
 from app.Relatorios.routes_relatorio_vencimento import router as router_relatorio_vencimento
 from app.Relatorios.routes_relatorio_movimentacao import router as router_relatorio_movimentacao
 from app.Alertas.routes_alertas import router as router_alertas
+from app.HistoricoEstoque.routes_historico_estoque import router as router_historico_estoque
+from app.Monitoramento.routes_monitoramento import router as router_monitoramento, MONITORAMENTO_HABILITADO
+from app.Monitoramento.service_metricas_sql import MiddlewareMetricasSQL, instalar_instrumentacao_sql
+from app.settings import tempo_limite_excedido, aquecer_pools, encerrar_pools
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cada worker só começa a aceitar conexões depois do startup, já com o pool aberto
+    await aquecer_pools()
+    yield
+    await encerrar_pools()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configuração de CORS para permitir requisições do frontend
 app.add_middleware(
@@ -33,8 +47,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "X-DB-Time-ms", "ETag", "Idempotent-Replayed"],
 )
 
+# Contagem de queries e tempo de banco por requisição (headers X-DB-*) e detecção de N+1
+instalar_instrumentacao_sql()
+app.add_middleware(MiddlewareMetricasSQL)
+
+@app.exception_handler(DBAPIError)
+async def tratar_erro_banco(request: Request, exc: DBAPIError):
+    """Consulta cancelada por statement_timeout vira 504; os demais erros seguem como 500"""
+    if tempo_limite_excedido(exc):
+        return JSONResponse(status_code=504, content={"detail": "A consulta excedeu o tempo limite"})
+    raise exc
+
 app.include_router(router_armazem)
 app.include_router(router_cuidado_pessoal)
 app.include_router(router_fornecedor)
@@ -51,6 +77,9 @@ app.include_router(router_consulta_estoque)
 app.include_router(router_relatorio_vencimento)  
 app.include_router(router_relatorio_movimentacao)  
 app.include_router(router_alertas)
+app.include_router(router_historico_estoque)
+if MONITORAMENTO_HABILITADO:
+    app.include_router(router_monitoramento)
 
 
 @app.get("/")
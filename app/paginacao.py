@@ -0,0 +1,26 @@
+# Paginação por cursor (keyset) compartilhada pelas consultas grandes
+from typing import Any, List, Optional
+import base64
+import json
+
+from fastapi import HTTPException
+
+def codificar_cursor(valores: List[Any], ordenacao: Optional[str] = None) -> str:
+    """Cursor opaco com os valores da chave de ordenação da última linha da página"""
+    conteudo = {"v": valores}
+    if ordenacao:
+        conteudo["o"] = ordenacao
+    bruto = json.dumps(conteudo, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str, ordenacao: Optional[str] = None) -> List[Any]:
+    """Valida o cursor recebido do cliente; cursor malformado ou de outra ordenação gera 400"""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        conteudo = json.loads(bruto)
+        valores = conteudo["v"]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(valores, list) or conteudo.get("o") != ordenacao:
+        raise HTTPException(status_code=400, detail="Cursor inválido para esta ordenação")
+    return valores
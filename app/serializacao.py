@@ -0,0 +1,28 @@
+# Serialização rápida de respostas grandes com orjson
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+def _padrao(valor):
+    """Tipos que o orjson não serializa sozinho (date, datetime, Enum e dict ele já trata)"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, BaseModel):
+        return valor.model_dump()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+def serializar(conteudo) -> bytes:
+    return orjson.dumps(conteudo, default=_padrao, option=orjson.OPT_NON_STR_KEYS)
+
+class RespostaORJSON(JSONResponse):
+    """Resposta JSON para linhas já confiáveis (montadas a partir do banco pelo serviço).
+
+    Quando a rota devolve a resposta pronta, o FastAPI não passa o conteúdo
+    pelo ``response_model`` de novo; o modelo continua declarado na rota e
+    segue documentado no OpenAPI.
+    """
+
+    def render(self, content) -> bytes:
+        return serializar(content)
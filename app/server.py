@@ -0,0 +1,37 @@
+# Ponto de entrada de produção: python -m app.server
+import os
+
+import uvicorn
+
+from app.settings import _env_bool, _env_int
+
+# Um worker por núcleo, salvo se WEB_WORKERS for informado.
+# Cada worker tem os próprios pools: conexões no banco = workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) x engines
+WEB_WORKERS = _env_int("WEB_WORKERS", os.cpu_count() or 1)
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+WEB_PORT = _env_int("WEB_PORT", 8000)
+# Maior que o idle timeout do balanceador, para ele nunca reaproveitar uma conexão que o uvicorn já fechou
+WEB_KEEPALIVE_SECONDS = _env_int("WEB_KEEPALIVE_SECONDS", 75)
+# Tempo para terminar as requisições em andamento após SIGTERM
+WEB_GRACEFUL_TIMEOUT_SECONDS = _env_int("WEB_GRACEFUL_TIMEOUT_SECONDS", 30)
+# Recicla o worker após N requisições (0 desativa); o supervisor do uvicorn sobe outro no lugar
+WEB_MAX_REQUESTS = _env_int("WEB_MAX_REQUESTS", 0)
+
+def main():
+    uvicorn.run(
+        "app.main:app",
+        host=WEB_HOST,
+        port=WEB_PORT,
+        workers=WEB_WORKERS,
+        loop="uvloop",
+        http="httptools",
+        timeout_keep_alive=WEB_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=WEB_GRACEFUL_TIMEOUT_SECONDS,
+        limit_max_requests=WEB_MAX_REQUESTS or None,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("WEB_FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        access_log=_env_bool("WEB_ACCESS_LOG", False),
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,279 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+import asyncio
+import logging
 import os
+import time
+
+from app.Monitoramento.service_pool_conexoes import QueuePoolMonitorado, AsyncQueuePoolMonitorado
+
+def _env_int(nome: str, padrao: int) -> int:
+    valor = os.getenv(nome)
+    return int(valor) if valor not in (None, "") else padrao
+
+def _env_bool(nome: str, padrao: bool) -> bool:
+    valor = os.getenv(nome)
+    return valor.strip().lower() in ("1", "true", "sim", "yes") if valor not in (None, "") else padrao
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# URL assíncrona: se não informada, reaproveita DATABASE_URL trocando o driver para asyncpg
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or str(
+    make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+)
+
+# Réplica de leitura opcional para relatórios e consultas de estoque
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL") or (
+    str(make_url(DATABASE_REPLICA_URL).set(drivername="postgresql+asyncpg")) if DATABASE_REPLICA_URL else None
+)
+# Atraso máximo de replicação tolerado antes de voltar a ler do primário
+DB_REPLICA_MAX_LAG_SECONDS = _env_int("DB_REPLICA_MAX_LAG_SECONDS", 30)
+# Intervalo entre verificações do atraso da réplica
+DB_REPLICA_CHECK_INTERVAL_SECONDS = _env_int("DB_REPLICA_CHECK_INTERVAL_SECONDS", 5)
+
+logger = logging.getLogger(__name__)
+
+# Configuração do pool (valores padrão iguais aos do SQLAlchemy)
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", False)
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", -1)
+
+POOL_KWARGS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+    "pool_recycle": DB_POOL_RECYCLE,
+}
 
-engine = create_engine(DATABASE_URL)
+# statement_timeout padrão das conexões (PDV/CRUD) e o das rotas de relatório (0 desativa)
+DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 5000)
+DB_STATEMENT_TIMEOUT_RELATORIO_MS = _env_int("DB_STATEMENT_TIMEOUT_RELATORIO_MS", 120000)
+# statement_timeout dos scripts de manutenção (make snapshot-estoque, checkpoint-estoque, ...)
+DB_STATEMENT_TIMEOUT_MANUTENCAO_MS = _env_int("DB_STATEMENT_TIMEOUT_MANUTENCAO_MS", 1800000)
+# Intervalo de verificação de desconexão do cliente durante consultas longas
+DB_INTERVALO_VERIFICA_DESCONEXAO_SECONDS = 0.5
+
+# O timeout vai na abertura da conexão, sem custo por transação
+CONNECT_ARGS = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+ASYNC_CONNECT_ARGS = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+
+engine = create_engine(DATABASE_URL, poolclass=QueuePoolMonitorado, connect_args=CONNECT_ARGS, **POOL_KWARGS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, poolclass=AsyncQueuePoolMonitorado, connect_args=ASYNC_CONNECT_ARGS, **POOL_KWARGS
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+if DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        DATABASE_REPLICA_URL, poolclass=QueuePoolMonitorado, connect_args=CONNECT_ARGS, **POOL_KWARGS
+    )
+    async_replica_engine = create_async_engine(
+        ASYNC_DATABASE_REPLICA_URL, poolclass=AsyncQueuePoolMonitorado, connect_args=ASYNC_CONNECT_ARGS,
+        **POOL_KWARGS
+    )
+else:
+    replica_engine = None
+    async_replica_engine = None
+
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine or engine)
+AsyncReplicaSessionLocal = async_sessionmaker(
+    bind=async_replica_engine or async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+def aquecer_pool_sincrono(quantidade: int = DB_POOL_SIZE):
+    """Abre ``quantidade`` conexões e as devolve ao pool, para a primeira requisição não pagar o connect"""
+    conexoes = []
+    try:
+        for _ in range(quantidade):
+            conexoes.append(engine.connect())
+    finally:
+        for conexao in conexoes:
+            conexao.close()
+
+async def aquecer_pool_assincrono(quantidade: int = DB_POOL_SIZE):
+    conexoes = []
+    try:
+        for _ in range(quantidade):
+            conexoes.append(await async_engine.connect())
+    finally:
+        for conexao in conexoes:
+            await conexao.close()
+
+async def aquecer_pools():
+    """Chamado no startup de cada worker; falha de banco não impede a subida"""
+    try:
+        await asyncio.to_thread(aquecer_pool_sincrono)
+        await aquecer_pool_assincrono()
+    except Exception:
+        logger.exception("Não foi possível aquecer o pool de conexões")
+
+async def encerrar_pools():
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+    engine.dispose()
+    if replica_engine is not None:
+        replica_engine.dispose()
+
+# Timeout da classe de rota atual; None mantém o padrão da conexão
+_timeout_instrucao_ms: ContextVar[Optional[int]] = ContextVar("timeout_instrucao_ms", default=None)
+
+@event.listens_for(Session, "after_begin")
+def _aplicar_timeout_da_rota(session, transaction, connection):
+    timeout_ms = _timeout_instrucao_ms.get()
+    if timeout_ms is not None and timeout_ms != DB_STATEMENT_TIMEOUT_MS:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+async def timeout_relatorio():
+    """Dependência de router: transações da requisição usam DB_STATEMENT_TIMEOUT_RELATORIO_MS"""
+    _timeout_instrucao_ms.set(DB_STATEMENT_TIMEOUT_RELATORIO_MS)
+
+def usar_timeout_manutencao():
+    """Para os scripts de manutenção: as transações seguintes usam DB_STATEMENT_TIMEOUT_MANUTENCAO_MS"""
+    _timeout_instrucao_ms.set(DB_STATEMENT_TIMEOUT_MANUTENCAO_MS)
+
+def tempo_limite_excedido(exc: BaseException) -> bool:
+    """Se o erro é o cancelamento por statement_timeout (SQLSTATE 57014)"""
+    if not isinstance(exc, DBAPIError):
+        return False
+    orig = exc.orig
+    return (getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)) == "57014"
+
+async def executar_cancelavel(request: Request, db: AsyncSession, servico, *args):
+    """Executa ``db.run_sync(servico, *args)`` cancelando a consulta se o cliente desconectar.
+
+    O cancelamento da task interrompe o asyncpg, que envia um pedido de
+    cancelamento ao Postgres; sem isso a consulta continuaria rodando no banco
+    depois que a aba do navegador foi fechada.
+    """
+    tarefa = asyncio.ensure_future(db.run_sync(servico, *args))
+    try:
+        while True:
+            concluidas, _ = await asyncio.wait({tarefa}, timeout=DB_INTERVALO_VERIFICA_DESCONEXAO_SECONDS)
+            if concluidas:
+                return tarefa.result()
+            if await request.is_disconnected():
+                tarefa.cancel()
+                await asyncio.gather(tarefa, return_exceptions=True)
+                logger.info("Cliente desconectou; consulta de %s cancelada", request.url.path)
+                # 499: convenção do nginx para "cliente fechou a requisição"; ninguém vai ler a resposta
+                raise HTTPException(status_code=499, detail="Cliente desconectou")
+    except DBAPIError as exc:
+        if tempo_limite_excedido(exc):
+            raise HTTPException(status_code=504, detail="A consulta excedeu o tempo limite; refine os filtros")
+        raise
+    finally:
+        if not tarefa.done():
+            tarefa.cancel()
+
+# Zero quando a réplica já aplicou tudo o que recebeu; senão, idade da última transação aplicada
+_SQL_ATRASO_REPLICA = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class EstadoReplica:
+    """Guarda o resultado da última verificação de atraso da réplica"""
+
+    def __init__(self):
+        self.disponivel = False
+        self.atraso_segundos = None
+        self.verificado_em = 0.0
+
+    def precisa_verificar(self) -> bool:
+        """Reserva a próxima verificação para que requisições simultâneas não disparem várias"""
+        agora = time.monotonic()
+        if agora - self.verificado_em < DB_REPLICA_CHECK_INTERVAL_SECONDS:
+            return False
+        self.verificado_em = agora
+        return True
+
+    def registrar(self, atraso_segundos):
+        self.verificado_em = time.monotonic()
+        self.atraso_segundos = atraso_segundos
+        disponivel = atraso_segundos is not None and atraso_segundos <= DB_REPLICA_MAX_LAG_SECONDS
+        if self.disponivel and not disponivel:
+            logger.warning("Réplica indisponível ou atrasada (%s s); leituras voltam para o primário", atraso_segundos)
+        self.disponivel = disponivel
+
+estado_replica = EstadoReplica()
+
+def replica_disponivel() -> bool:
+    if replica_engine is None:
+        return False
+    if estado_replica.precisa_verificar():
+        try:
+            with replica_engine.connect() as conn:
+                estado_replica.registrar(float(conn.execute(_SQL_ATRASO_REPLICA).scalar()))
+        except Exception:
+            logger.exception("Falha ao verificar a réplica de leitura")
+            estado_replica.registrar(None)
+    return estado_replica.disponivel
+
+async def replica_disponivel_async() -> bool:
+    if async_replica_engine is None:
+        return False
+    if estado_replica.precisa_verificar():
+        try:
+            async with async_replica_engine.connect() as conn:
+                estado_replica.registrar(float((await conn.execute(_SQL_ATRASO_REPLICA)).scalar()))
+        except Exception:
+            logger.exception("Falha ao verificar a réplica de leitura")
+            estado_replica.registrar(None)
+    return estado_replica.disponivel
+
+def sessao_na_replica(db: Session) -> bool:
+    """Se a sessão síncrona (inclusive a de ``run_sync``) lê da réplica, que pode estar atrasada"""
+    conexao = db.get_bind()
+    if replica_engine is not None and conexao is replica_engine:
+        return True
+    return async_replica_engine is not None and conexao is async_replica_engine.sync_engine
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """Sessão assíncrona para rotas de leitura intensiva (consultas, relatórios e alertas).
+
+    Os serviços continuam escritos com a API síncrona do ORM e são executados
+    via ``await db.run_sync(servico, ...)``, que roda a função no mesmo loop de
+    eventos sem ocupar uma thread do threadpool do Starlette.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_db_readonly():
+    """Sessão de leitura: usa a réplica quando configurada e em dia, senão o primário"""
+    db = ReplicaSessionLocal() if replica_disponivel() else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def fabrica_sessao_leitura_async():
+    """Fábrica de sessões assíncronas de leitura: réplica quando disponível, senão o primário"""
+    return AsyncReplicaSessionLocal if await replica_disponivel_async() else AsyncSessionLocal
+
+async def get_async_db_readonly():
+    """Versão assíncrona de get_db_readonly para as rotas de relatórios, consultas e alertas"""
+    fabrica = await fabrica_sessao_leitura_async()
+    async with fabrica() as db:
+        yield db
@@ -0,0 +1,69 @@
+# Versão dos dados de estoque e alertas, usada como ETag nas rotas consultadas pelos painéis
+from datetime import date
+import os
+import threading
+import time
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.settings import async_engine
+
+# Por quanto tempo cada worker reaproveita a última versão lida do banco.
+# O worker que faz a escrita vê a nova versão na hora; os demais, em até este tempo
+ESTOQUE_VERSAO_TTL_SECONDS = float(os.getenv("ESTOQUE_VERSAO_TTL_SECONDS", "2"))
+
+_SQL_INCREMENTAR = text("SELECT nextval('estoque_versao_seq')")
+_SQL_LER = text("SELECT last_value FROM estoque_versao_seq")
+
+_versao = None
+_lida_em = 0.0
+_lock = threading.Lock()
+
+def _guardar(versao: int):
+    global _versao, _lida_em
+    with _lock:
+        if _versao is None or versao > _versao:
+            _versao = versao
+        _lida_em = time.monotonic()
+
+def incrementar_versao_estoque(db: Session) -> int:
+    """Gera uma nova versão; chamar depois do commit da escrita.
+
+    Antes do commit, um painel poderia ler a versão nova junto com os dados
+    antigos e ficar com uma ETag errada até a próxima escrita. nextval não é
+    desfeito por rollback, então a chamada não precisa de commit próprio.
+    """
+    versao = db.execute(_SQL_INCREMENTAR).scalar_one()
+    _guardar(versao)
+    return versao
+
+async def obter_versao_estoque() -> int:
+    """Versão atual; consulta o banco (uma leitura da sequence) no máximo uma vez por TTL"""
+    if _versao is not None and time.monotonic() - _lida_em < ESTOQUE_VERSAO_TTL_SECONDS:
+        return _versao
+    async with async_engine.connect() as conexao:
+        versao = (await conexao.execute(_SQL_LER)).scalar_one()
+    _guardar(versao)
+    return _versao
+
+def _etag_confere(if_none_match: str, etag: str) -> bool:
+    candidatas = [valor.strip() for valor in if_none_match.split(",")]
+    return "*" in candidatas or etag in candidatas
+
+async def etag_versao_estoque(request: Request, response: Response):
+    """Dependência de rota: responde 304 sem consultar os dados quando a versão não mudou.
+
+    A data entra na ETag porque vencidos e dias para vencimento mudam na
+    virada do dia, mesmo sem escrita. A versão é lida do primário, então a
+    rota precisa ler os dados do primário também (get_async_db): com a
+    réplica atrasada, o painel receberia a ETag nova com os dados antigos e
+    ficaria com 304 até a próxima escrita.
+    """
+    etag = f'W/"{await obter_versao_estoque()}-{date.today().isoformat()}"'
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_confere(if_none_match, etag):
+        raise HTTPException(status_code=304, headers=cabecalhos)
+    response.headers.update(cabecalhos)
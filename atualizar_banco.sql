@@ -0,0 +1,175 @@
+-- Atualiza um banco criado por uma versão anterior do init.sql até o esquema atual (make atualizar-banco).
+-- Cada passo verifica se já foi aplicado, então o script pode rodar de novo num banco já atualizado.
+-- O make roda o script e a reconstrução de estoque_snapshot numa única transação. Pare a aplicação
+-- antes: a conversão de movimentacao_estoque trava a tabela enquanto copia as linhas.
+
+-- Extensões da busca por nome (trigramas e remoção de acentos)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() é STABLE e não pode ser usada em índice; com o dicionário fixo o resultado é imutável
+CREATE OR REPLACE FUNCTION f_busca_normalizada(texto text) RETURNS text AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- Tabela estoque_snapshot: preenchida pela reconstrução que o make roda depois deste script
+CREATE TABLE IF NOT EXISTS estoque_snapshot (
+    item_estoque_id INT NOT NULL REFERENCES item_estoque(id) ON DELETE CASCADE,
+    armazem_id INT NOT NULL REFERENCES armazem(id) ON DELETE CASCADE,
+    produto_id INT NOT NULL,
+    produto_nome VARCHAR(100) NOT NULL,
+    tipo_produto VARCHAR(20) NOT NULL,
+    codigo_barras VARCHAR(80) NOT NULL,
+    preco DECIMAL(10,2) NOT NULL,
+    data_validade DATE NOT NULL,
+    lote VARCHAR(50) NOT NULL,
+    fornecedor_id INT NOT NULL,
+    fornecedor_nome VARCHAR(100) NOT NULL,
+    armazem_local VARCHAR(100) NOT NULL,
+    quantidade_atual INT NOT NULL,
+    quantidade_minima INT NOT NULL,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (item_estoque_id, armazem_id)
+);
+
+-- Versão dos dados de estoque (ETag dos painéis); consome o primeiro valor só se a sequence for nova
+CREATE SEQUENCE IF NOT EXISTS estoque_versao_seq;
+SELECT nextval('estoque_versao_seq') FROM pg_sequences
+WHERE schemaname = current_schema() AND sequencename = 'estoque_versao_seq' AND last_value IS NULL;
+
+-- Histórico de estoque e Idempotency-Key
+CREATE TABLE IF NOT EXISTS estoque_checkpoint (
+    momento TIMESTAMP NOT NULL,
+    item_estoque_id INT NOT NULL REFERENCES item_estoque(id) ON DELETE CASCADE,
+    armazem_id INT NOT NULL REFERENCES armazem(id) ON DELETE CASCADE,
+    quantidade INT NOT NULL,
+    PRIMARY KEY (momento, item_estoque_id, armazem_id)
+);
+
+CREATE TABLE IF NOT EXISTS chave_idempotencia (
+    chave VARCHAR(100) NOT NULL,
+    rota VARCHAR(100) NOT NULL,
+    hash_corpo CHAR(64) NOT NULL,
+    resposta JSONB,
+    criado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (chave, rota)
+);
+
+-- Mesma função do init.sql
+CREATE OR REPLACE FUNCTION criar_particoes_movimentacao(inicio DATE, meses INT) RETURNS INT AS $$
+DECLARE
+    mes DATE := date_trunc('month', inicio)::date;
+    nome TEXT;
+    criadas INT := 0;
+BEGIN
+    FOR i IN 1..meses LOOP
+        nome := 'movimentacao_estoque_' || to_char(mes, 'YYYYMM');
+        -- Uma partição desanexada (arquivada) mantém o nome e não é recriada
+        IF to_regclass(nome) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF movimentacao_estoque FOR VALUES FROM (%L) TO (%L)',
+                nome, mes, (mes + INTERVAL '1 month')::date
+            );
+            criadas := criadas + 1;
+        END IF;
+        mes := (mes + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN criadas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- movimentacao_estoque comum vira particionada por mês: a tabela antiga é renomeada, a nova é criada
+-- com as partições de todos os meses com movimentações, as linhas são copiadas e a antiga é removida
+DO $$
+DECLARE
+    primeiro_mes DATE;
+    mes_atual DATE := date_trunc('month', CURRENT_DATE)::date;
+    copiadas BIGINT;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'movimentacao_estoque'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE movimentacao_estoque RENAME TO movimentacao_estoque_antiga;
+    ALTER TABLE movimentacao_estoque_antiga RENAME CONSTRAINT movimentacao_estoque_pkey TO movimentacao_estoque_antiga_pkey;
+    -- A sequence do SERIAL passa para a tabela nova, e os ids continuam de onde pararam
+    ALTER SEQUENCE movimentacao_estoque_id_seq OWNED BY NONE;
+
+    CREATE TABLE movimentacao_estoque (
+        id INT NOT NULL DEFAULT nextval('movimentacao_estoque_id_seq'),
+        item_estoque_id INT NOT NULL REFERENCES item_estoque(id),
+        funcionario_id INT REFERENCES funcionario(id),
+        data_movimentacao TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('entrada', 'saida')),
+        quantidade INT NOT NULL CHECK (quantidade > 0),
+        cpf_comprador VARCHAR(14),
+        nome_comprador VARCHAR(100),
+        receita_digital TEXT,
+        armazem_id INT REFERENCES armazem(id),
+        -- Instante em que a linha foi gravada (data_movimentacao vem do cliente); base do histórico de estoque
+        registrado_em TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+        PRIMARY KEY (id, data_movimentacao)
+    ) PARTITION BY RANGE (data_movimentacao);
+
+    ALTER SEQUENCE movimentacao_estoque_id_seq OWNED BY movimentacao_estoque.id;
+    CREATE TABLE movimentacao_estoque_padrao PARTITION OF movimentacao_estoque DEFAULT;
+
+    -- Do mês da movimentação mais antiga (ou de um ano atrás) até três meses à frente
+    SELECT LEAST(date_trunc('month', min(data_movimentacao))::date, (mes_atual - INTERVAL '12 months')::date)
+    INTO primeiro_mes
+    FROM movimentacao_estoque_antiga;
+    PERFORM criar_particoes_movimentacao(
+        primeiro_mes,
+        ((EXTRACT(YEAR FROM mes_atual) - EXTRACT(YEAR FROM primeiro_mes)) * 12
+            + EXTRACT(MONTH FROM mes_atual) - EXTRACT(MONTH FROM primeiro_mes))::int + 4
+    );
+
+    -- Linhas antigas não têm o instante de gravação; a data da movimentação é a melhor aproximação
+    INSERT INTO movimentacao_estoque (
+        id, item_estoque_id, funcionario_id, data_movimentacao, tipo, quantidade,
+        cpf_comprador, nome_comprador, receita_digital, armazem_id, registrado_em
+    )
+    SELECT
+        id, item_estoque_id, funcionario_id, data_movimentacao, tipo, quantidade,
+        cpf_comprador, nome_comprador, receita_digital, armazem_id, data_movimentacao
+    FROM movimentacao_estoque_antiga;
+    GET DIAGNOSTICS copiadas = ROW_COUNT;
+
+    DROP TABLE movimentacao_estoque_antiga;
+    RAISE NOTICE 'movimentacao_estoque particionada por mês: % linhas copiadas', copiadas;
+END;
+$$;
+
+-- Índices criados depois da conversão, já sobre a tabela particionada
+
+-- Índices da consulta de estoque sobre o snapshot (a PK já cobre a ordenação por item e armazém)
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_validade ON estoque_snapshot(data_validade, item_estoque_id, armazem_id);
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_nome ON estoque_snapshot(produto_nome, item_estoque_id, armazem_id);
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_codigo_barras ON estoque_snapshot(codigo_barras);
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_armazem ON estoque_snapshot(armazem_id);
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_fornecedor ON estoque_snapshot(fornecedor_id);
+-- Consulta por produto (tela de detalhe); a consulta por item usa o prefixo da chave primária
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_produto ON estoque_snapshot(produto_id, tipo_produto);
+-- Itens zerados (status estoque_critico) são poucos: índice parcial pequeno
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_zerado ON estoque_snapshot(item_estoque_id, armazem_id) WHERE quantidade_atual = 0;
+
+-- Índices de trigramas da busca por nome (app/busca.py): atendem LIKE '%termo%' e o operador %> do pg_trgm
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_nome_trgm ON estoque_snapshot USING gin (f_busca_normalizada(produto_nome) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_medicamento_nome_trgm ON medicamento USING gin (f_busca_normalizada(nome) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_medicamento_principio_ativo_trgm ON medicamento USING gin (f_busca_normalizada(principio_ativo) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_medicamento_fabricante_trgm ON medicamento USING gin (f_busca_normalizada(fabricante) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_suplemento_nome_trgm ON suplemento_alimentar USING gin (f_busca_normalizada(nome) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_suplemento_principio_ativo_trgm ON suplemento_alimentar USING gin (f_busca_normalizada(principio_ativo) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_suplemento_fabricante_trgm ON suplemento_alimentar USING gin (f_busca_normalizada(fabricante) gin_trgm_ops);
+
+-- Intervalo de gravação entre um checkpoint e o instante consultado (histórico de estoque)
+CREATE INDEX IF NOT EXISTS idx_movimentacao_registrado_em ON movimentacao_estoque(registrado_em);
+
+-- Listagem de movimentações por keyset em (data_movimentacao, id), com e sem filtro de igualdade
+CREATE INDEX IF NOT EXISTS idx_movimentacao_data_id ON movimentacao_estoque(data_movimentacao, id);
+CREATE INDEX IF NOT EXISTS idx_movimentacao_item_data_id ON movimentacao_estoque(item_estoque_id, data_movimentacao, id);
+CREATE INDEX IF NOT EXISTS idx_movimentacao_armazem_data_id ON movimentacao_estoque(armazem_id, data_movimentacao, id);
+CREATE INDEX IF NOT EXISTS idx_movimentacao_funcionario_data_id ON movimentacao_estoque(funcionario_id, data_movimentacao, id);
+
+-- Limpeza das chaves de idempotência expiradas
+CREATE INDEX IF NOT EXISTS idx_chave_idempotencia_criado_em ON chave_idempotencia(criado_em);
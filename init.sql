@@ -1,3 +1,12 @@
+-- Extensões da busca por nome (trigramas e remoção de acentos)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() é STABLE e não pode ser usada em índice; com o dicionário fixo o resultado é imutável
+CREATE OR REPLACE FUNCTION f_busca_normalizada(texto text) RETURNS text AS $$
+    SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
 -- Tabela armazem
 CREATE TABLE armazem (
     id SERIAL PRIMARY KEY,
@@ -109,9 +118,37 @@ CREATE TABLE item_armazenado (
     UNIQUE (armazem_id, item_estoque_id)
 );
 
--- Tabela movimentacao_estoque
+-- Tabela estoque_snapshot: uma linha por item e armazém, já com os dados de item, fornecedor e armazém
+-- Mantida pela aplicação na mesma transação das escritas; reconstrução: make snapshot-estoque
+CREATE TABLE estoque_snapshot (
+    item_estoque_id INT NOT NULL REFERENCES item_estoque(id) ON DELETE CASCADE,
+    armazem_id INT NOT NULL REFERENCES armazem(id) ON DELETE CASCADE,
+    produto_id INT NOT NULL,
+    produto_nome VARCHAR(100) NOT NULL,
+    tipo_produto VARCHAR(20) NOT NULL,
+    codigo_barras VARCHAR(80) NOT NULL,
+    preco DECIMAL(10,2) NOT NULL,
+    data_validade DATE NOT NULL,
+    lote VARCHAR(50) NOT NULL,
+    fornecedor_id INT NOT NULL,
+    fornecedor_nome VARCHAR(100) NOT NULL,
+    armazem_local VARCHAR(100) NOT NULL,
+    quantidade_atual INT NOT NULL,
+    quantidade_minima INT NOT NULL,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (item_estoque_id, armazem_id)
+);
+
+-- Versão dos dados de estoque e alertas (ETag dos painéis); a aplicação chama nextval após cada escrita
+CREATE SEQUENCE estoque_versao_seq;
+-- Consome o primeiro valor: antes disso last_value já vale 1 e o primeiro nextval não mudaria a versão lida
+SELECT nextval('estoque_versao_seq');
+
+-- Tabela movimentacao_estoque: particionada por mês de data_movimentacao
+-- Filtros de data sobre a coluna pura (>= início, < fim + 1 dia) leem só as partições do período.
+-- A chave primária precisa conter a coluna de partição; id continua único pela sequence
 CREATE TABLE movimentacao_estoque (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     item_estoque_id INT NOT NULL REFERENCES item_estoque(id),
     funcionario_id INT REFERENCES funcionario(id),
     data_movimentacao TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
@@ -120,7 +157,62 @@ CREATE TABLE movimentacao_estoque (
     cpf_comprador VARCHAR(14),
     nome_comprador VARCHAR(100),
     receita_digital TEXT,
-    armazem_id INT REFERENCES armazem(id)
+    armazem_id INT REFERENCES armazem(id),
+    -- Instante em que a linha foi gravada (data_movimentacao vem do cliente); base do histórico de estoque
+    registrado_em TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (id, data_movimentacao)
+) PARTITION BY RANGE (data_movimentacao);
+
+-- Recebe datas fora das partições mensais (ex.: manutenção atrasada); deve ficar vazia
+CREATE TABLE movimentacao_estoque_padrao PARTITION OF movimentacao_estoque DEFAULT;
+
+-- Cria as partições mensais movimentacao_estoque_AAAAMM de `meses` meses a partir do mês de `inicio`.
+-- Idempotente; usada na criação do banco, com a padrão ainda vazia. A manutenção (make particoes-movimentacao,
+-- app/MovimentacaoEstoque/service_particoes_movimentacao.py) cria as partições seguintes movendo as linhas da padrão
+CREATE OR REPLACE FUNCTION criar_particoes_movimentacao(inicio DATE, meses INT) RETURNS INT AS $$
+DECLARE
+    mes DATE := date_trunc('month', inicio)::date;
+    nome TEXT;
+    criadas INT := 0;
+BEGIN
+    FOR i IN 1..meses LOOP
+        nome := 'movimentacao_estoque_' || to_char(mes, 'YYYYMM');
+        -- Uma partição desanexada (arquivada) mantém o nome e não é recriada
+        IF to_regclass(nome) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF movimentacao_estoque FOR VALUES FROM (%L) TO (%L)',
+                nome, mes, (mes + INTERVAL '1 month')::date
+            );
+            criadas := criadas + 1;
+        END IF;
+        mes := (mes + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN criadas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Último ano (cargas de histórico) até três meses à frente
+SELECT criar_particoes_movimentacao((CURRENT_DATE - INTERVAL '12 months')::date, 16);
+
+-- Tabela estoque_checkpoint: cópia diária de item_armazenado (make checkpoint-estoque)
+-- A posição em uma data passada parte do checkpoint mais próximo e aplica as movimentações do intervalo
+CREATE TABLE estoque_checkpoint (
+    momento TIMESTAMP NOT NULL,
+    item_estoque_id INT NOT NULL REFERENCES item_estoque(id) ON DELETE CASCADE,
+    armazem_id INT NOT NULL REFERENCES armazem(id) ON DELETE CASCADE,
+    quantidade INT NOT NULL,
+    PRIMARY KEY (momento, item_estoque_id, armazem_id)
+);
+
+-- Tabela chave_idempotencia: Idempotency-Key das rotas de criação e a resposta da primeira execução
+-- Chaves mais antigas que IDEMPOTENCIA_TTL_HORAS são apagadas por make limpar-idempotencia
+CREATE TABLE chave_idempotencia (
+    chave VARCHAR(100) NOT NULL,
+    rota VARCHAR(100) NOT NULL,
+    hash_corpo CHAR(64) NOT NULL,
+    resposta JSONB,
+    criado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (chave, rota)
 );
 
 -- Tabela restricao_suplemento
@@ -193,6 +285,38 @@ CREATE INDEX IF NOT EXISTS idx_notificacao_enviado ON notificacao_alerta(enviado
 
 CREATE INDEX IF NOT EXISTS idx_config_chave ON configuracao_alertas(chave);
 
+-- Índices da consulta de estoque sobre o snapshot (a PK já cobre a ordenação por item e armazém)
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_validade ON estoque_snapshot(data_validade, item_estoque_id, armazem_id);
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_nome ON estoque_snapshot(produto_nome, item_estoque_id, armazem_id);
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_codigo_barras ON estoque_snapshot(codigo_barras);
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_armazem ON estoque_snapshot(armazem_id);
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_fornecedor ON estoque_snapshot(fornecedor_id);
+-- Consulta por produto (tela de detalhe); a consulta por item usa o prefixo da chave primária
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_produto ON estoque_snapshot(produto_id, tipo_produto);
+-- Itens zerados (status estoque_critico) são poucos: índice parcial pequeno
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_zerado ON estoque_snapshot(item_estoque_id, armazem_id) WHERE quantidade_atual = 0;
+
+-- Índices de trigramas da busca por nome (app/busca.py): atendem LIKE '%termo%' e o operador %> do pg_trgm
+CREATE INDEX IF NOT EXISTS idx_estoque_snapshot_nome_trgm ON estoque_snapshot USING gin (f_busca_normalizada(produto_nome) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_medicamento_nome_trgm ON medicamento USING gin (f_busca_normalizada(nome) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_medicamento_principio_ativo_trgm ON medicamento USING gin (f_busca_normalizada(principio_ativo) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_medicamento_fabricante_trgm ON medicamento USING gin (f_busca_normalizada(fabricante) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_suplemento_nome_trgm ON suplemento_alimentar USING gin (f_busca_normalizada(nome) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_suplemento_principio_ativo_trgm ON suplemento_alimentar USING gin (f_busca_normalizada(principio_ativo) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_suplemento_fabricante_trgm ON suplemento_alimentar USING gin (f_busca_normalizada(fabricante) gin_trgm_ops);
+
+-- Intervalo de gravação entre um checkpoint e o instante consultado (histórico de estoque)
+CREATE INDEX IF NOT EXISTS idx_movimentacao_registrado_em ON movimentacao_estoque(registrado_em);
+
+-- Listagem de movimentações por keyset em (data_movimentacao, id), com e sem filtro de igualdade
+CREATE INDEX IF NOT EXISTS idx_movimentacao_data_id ON movimentacao_estoque(data_movimentacao, id);
+CREATE INDEX IF NOT EXISTS idx_movimentacao_item_data_id ON movimentacao_estoque(item_estoque_id, data_movimentacao, id);
+CREATE INDEX IF NOT EXISTS idx_movimentacao_armazem_data_id ON movimentacao_estoque(armazem_id, data_movimentacao, id);
+CREATE INDEX IF NOT EXISTS idx_movimentacao_funcionario_data_id ON movimentacao_estoque(funcionario_id, data_movimentacao, id);
+
+-- Limpeza das chaves de idempotência expiradas
+CREATE INDEX IF NOT EXISTS idx_chave_idempotencia_criado_em ON chave_idempotencia(criado_em);
+
 -- Configurações padrão do sistema de alertas
 INSERT INTO configuracao_alertas (chave, valor, descricao) VALUES
 ('dias_vencimento_critico', '3', 'Dias para alerta crítico de vencimento'),
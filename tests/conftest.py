@@ -0,0 +1,115 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+import app.main  # noqa: F401 - registra todos os mapeamentos do ORM antes dos testes
+
+
+class Linha(dict):
+    """Linha de resultado com acesso por atributo (linha.quantidade) e por chave"""
+    __getattr__ = dict.__getitem__
+
+
+class Resultado:
+    """Resultado de execute(): as linhas devolvidas pelo responder e o rowcount"""
+
+    def __init__(self, linhas=(), rowcount=0):
+        self.linhas = [Linha(linha) if isinstance(linha, dict) else linha for linha in linhas]
+        self.rowcount = rowcount
+
+    def __iter__(self):
+        return iter(self.linhas)
+
+    def all(self):
+        return self.linhas
+
+    def first(self):
+        return self.linhas[0] if self.linhas else None
+
+    # Nos escalares cada linha já é o valor
+    scalar = scalar_one = scalar_one_or_none = first
+
+    def scalars(self):
+        return self
+
+    mappings = scalars
+
+
+class Consulta:
+    """O pouco de Session.query usado pelos serviços, executado pela própria sessão falsa"""
+
+    def __init__(self, sessao, instrucao):
+        self.sessao = sessao
+        self.instrucao = instrucao
+
+    def filter(self, *condicoes):
+        return Consulta(self.sessao, self.instrucao.where(*condicoes))
+
+    def first(self):
+        return self.sessao.execute(self.instrucao.limit(1)).first()
+
+    def scalar(self):
+        return self.sessao.execute(self.instrucao).scalar()
+
+    def all(self):
+        return self.sessao.execute(self.instrucao).all()
+
+
+class SessaoFalsa:
+    """Sessão sem banco: compila cada instrução para o Postgres e pede o resultado ao ``responder``.
+
+    ``responder(sql, parametros)`` devolve uma lista de linhas (dicts viram
+    Linha; nos escalares, os próprios valores), um Resultado ou None (nenhuma
+    linha). ``ao_commit`` e ``ao_rollback`` simulam o que sobrevive à transação.
+    """
+    Resultado = Resultado
+
+    def __init__(self, responder=None, ao_commit=None, ao_rollback=None):
+        self.responder = responder or (lambda sql, parametros: None)
+        self.ao_commit = ao_commit
+        self.ao_rollback = ao_rollback
+        self.instrucoes = []
+        self.adicionados = []
+        self.info = {}
+        self.commits = 0
+        self.rollbacks = 0
+
+    def execute(self, instrucao, parametros=None):
+        compilada = instrucao.compile(dialect=postgresql.dialect())
+        sql = " ".join(str(compilada).split())
+        parametros = parametros if parametros is not None else compilada.params
+        self.instrucoes.append((sql, parametros))
+        resposta = self.responder(sql, parametros)
+        return resposta if isinstance(resposta, Resultado) else Resultado(resposta or ())
+
+    def query(self, *entidades):
+        return Consulta(self, select(*entidades))
+
+    def add(self, objeto):
+        self.adicionados.append(objeto)
+
+    def flush(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+        if self.ao_commit:
+            self.ao_commit()
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.ao_rollback:
+            self.ao_rollback()
+
+    @property
+    def textos(self):
+        return [sql for sql, _ in self.instrucoes]
+
+    def sql(self, inicio):
+        return [instrucao for instrucao in self.instrucoes if instrucao[0].startswith(inicio)]
+
+
+@pytest.fixture
+def sessao_falsa():
+    """A classe SessaoFalsa: ``sessao_falsa(responder)`` cria uma sessão"""
+    return SessaoFalsa
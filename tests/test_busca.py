@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import column
+from sqlalchemy.dialects import postgresql
+
+from app.busca import ModoBusca, condicao_busca, relevancia
+
+
+def _compilar(expressao):
+    compilada = expressao.compile(dialect=postgresql.dialect())
+    return str(compilada), compilada.params
+
+
+@pytest.mark.parametrize("termo, padrao", [
+    ("dipirona", "%dipirona%"),
+    ("10%", "%10!%%"),
+    ("vit_c", "%vit!_c%"),
+    ("a!b", "%a!!b%"),
+    ("!%_", "%!!!%!_%"),
+])
+def test_contem_escapa_os_curingas_do_like(termo, padrao):
+    sql, parametros = _compilar(condicao_busca([column("nome")], termo))
+    assert sql == "f_busca_normalizada(nome) LIKE f_busca_normalizada(%(param_1)s) ESCAPE '!'"
+    assert parametros == {"param_1": padrao}
+
+
+def test_contem_nao_usa_similaridade():
+    sql, _ = _compilar(condicao_busca([column("nome"), column("fabricante")], "x", ModoBusca.CONTEM))
+    assert sql.count(" LIKE ") == 2 and "%>" not in sql
+
+
+def test_relevancia_acrescenta_a_similaridade_sem_escapar_o_termo():
+    sql, parametros = _compilar(condicao_busca([column("nome")], "dipirna_%", ModoBusca.RELEVANCIA))
+    assert " LIKE " in sql
+    # %> é o operador do pg_trgm (o % aparece dobrado pelo driver)
+    assert "f_busca_normalizada(nome) %%> f_busca_normalizada(%(param_2)s)" in sql
+    assert parametros["param_2"] == "dipirna_%"
+
+
+def test_relevancia_usa_a_maior_similaridade_entre_as_colunas():
+    sql, _ = _compilar(relevancia([column("nome")], "x"))
+    assert sql == "word_similarity(f_busca_normalizada(%(param_1)s), f_busca_normalizada(nome))"
+    sql, _ = _compilar(relevancia([column("nome"), column("fabricante")], "x"))
+    assert sql.startswith("greatest(") and sql.count("word_similarity") == 2
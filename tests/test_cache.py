@@ -0,0 +1,14 @@
+from app.cache import CacheLRU
+
+
+def test_cache_lru_despeja_o_menos_usado_e_conta_acertos():
+    descartados = []
+    cache = CacheLRU("teste_lru", 2, 60, lambda chave, valor: descartados.append(chave))
+    cache.gravar("a", 1)
+    cache.gravar("b", 2)
+    assert cache.obter("a") == 1
+    cache.gravar("c", 3)
+    assert cache.obter("b") is None
+    assert descartados == ["b"]
+    estatisticas = cache.estatisticas()
+    assert (estatisticas["acertos"], estatisticas["falhas"], estatisticas["despejadas"]) == (1, 1, 1)
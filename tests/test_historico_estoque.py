@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.HistoricoEstoque.model_historico_estoque import EstoqueCheckpoint
+from app.HistoricoEstoque.service_historico_estoque import reconstruir_posicao
+from app.MovimentacaoEstoque.model_movimentacao_estoque import MovimentacaoEstoque
+
+# Só as colunas lidas pela reconstrução; o SQL gerado é o mesmo do Postgres (FULL JOIN, CASE, agregados)
+_TABELAS = [
+    "CREATE TABLE estoque_checkpoint (momento TIMESTAMP, item_estoque_id INT, armazem_id INT, quantidade INT)",
+    """CREATE TABLE movimentacao_estoque (
+        id INTEGER PRIMARY KEY, item_estoque_id INT, armazem_id INT, tipo VARCHAR, quantidade INT,
+        data_movimentacao TIMESTAMP, registrado_em TIMESTAMP
+    )""",
+]
+
+C1, C2 = datetime(2025, 1, 10), datetime(2025, 1, 20)
+
+# Item 1: 12 -> (saída 2 no instante de C1) 10 -> 15 -> 12 -> (saída 8 no instante de C2) 4
+# Item 2: entra com 7 entre os dois checkpoints
+MOVIMENTACOES = [
+    (1, "saida", 2, C1),
+    (1, "entrada", 5, datetime(2025, 1, 12)),
+    (2, "entrada", 7, datetime(2025, 1, 15)),
+    (1, "saida", 3, datetime(2025, 1, 18)),
+    (1, "saida", 8, C2),
+]
+CHECKPOINTS = [(C1, 1, 10), (C2, 1, 4), (C2, 2, 7)]
+
+
+def _sessao(checkpoints):
+    engine = create_engine("sqlite://")
+    with engine.begin() as conexao:
+        for ddl in _TABELAS:
+            conexao.execute(text(ddl))
+        conexao.execute(MovimentacaoEstoque.__table__.insert(), [
+            {"item_estoque_id": item, "armazem_id": 1, "tipo": tipo, "quantidade": quantidade,
+             "data_movimentacao": registrado_em, "registrado_em": registrado_em}
+            for item, tipo, quantidade, registrado_em in MOVIMENTACOES
+        ])
+        if checkpoints:
+            conexao.execute(EstoqueCheckpoint.__table__.insert(), [
+                {"momento": momento, "item_estoque_id": item, "armazem_id": 1, "quantidade": quantidade}
+                for momento, item, quantidade in checkpoints
+            ])
+    return Session(engine)
+
+
+def _posicao(db, momento):
+    resultado = reconstruir_posicao(db, momento)
+    itens = {linha["item_estoque_id"]: linha["quantidade"] for linha in resultado["itens"]}
+    return resultado["checkpoint_utilizado"], itens, resultado["movimentacoes_aplicadas"]
+
+
+@pytest.fixture
+def db():
+    with _sessao(CHECKPOINTS) as sessao:
+        yield sessao
+
+
+def test_checkpoint_anterior_soma_as_movimentacoes_seguintes(db):
+    # 3 dias depois de C1 e 7 antes de C2; a saída gravada no instante de C1 já está nele
+    assert _posicao(db, datetime(2025, 1, 13)) == (C1, {1: 15}, 1)
+
+
+def test_checkpoint_posterior_desfaz_as_movimentacoes_ate_ele(db):
+    # Desfaz a saída de 3 e a de 8, gravada no próprio instante de C2; a entrada do item 2 é anterior
+    assert _posicao(db, datetime(2025, 1, 16)) == (C2, {1: 15, 2: 7}, 2)
+    assert _posicao(db, datetime(2025, 1, 19)) == (C2, {1: 12, 2: 7}, 1)
+
+
+def test_antes_do_primeiro_checkpoint_desfaz_a_partir_dele(db):
+    assert _posicao(db, datetime(2025, 1, 5)) == (C1, {1: 12}, 1)
+
+
+def test_no_instante_do_checkpoint_usa_o_proprio_checkpoint(db):
+    assert _posicao(db, C2) == (C2, {1: 4, 2: 7}, 0)
+
+
+def test_sem_checkpoint_soma_todo_o_historico():
+    # Parte de zero: os 12 iniciais do item 1 não vieram de uma movimentação
+    with _sessao([]) as db:
+        assert _posicao(db, datetime(2025, 1, 13)) == (None, {1: 3}, 2)
+        assert _posicao(db, C2) == (None, {1: -8, 2: 7}, 5)
@@ -0,0 +1,101 @@
+import pytest
+from fastapi import HTTPException
+
+from app.Idempotencia.service_idempotencia import _hash_corpo, commit_com_resposta, executar_idempotente
+from app.MovimentacaoEstoque.schema_movimentacao_estoque import MovimentacaoEstoqueCreate, MovimentacaoEstoqueRead
+
+
+class Banco:
+    """chave_idempotencia em memória; só o que foi commitado sobrevive a outra sessão"""
+
+    def __init__(self, gravadas=None):
+        self.gravadas = gravadas or {}
+
+    def sessao(self, sessao_falsa):
+        pendentes = {}
+
+        def responder(sql, parametros):
+            if sql.startswith("INSERT"):
+                chave = (parametros["chave"], parametros["rota"])
+                if chave in self.gravadas:
+                    return None
+                pendentes[chave] = {"hash_corpo": parametros["hash_corpo"], "resposta": None}
+                return [(chave[0],)]
+            if sql.startswith("UPDATE"):
+                pendentes[(parametros["chave_1"], parametros["rota_1"])]["resposta"] = parametros["resposta"]
+                return None
+            registro = self.gravadas.get((parametros["chave_1"], parametros["rota_1"]))
+            return [registro] if registro else None
+
+        def commit():
+            self.gravadas.update(pendentes)
+            pendentes.clear()
+
+        return sessao_falsa(responder, ao_commit=commit, ao_rollback=pendentes.clear)
+
+
+@pytest.fixture
+def movimentacao():
+    return MovimentacaoEstoqueCreate(
+        data_movimentacao="2025-01-15T10:00:00", tipo="saida", quantidade=2,
+        item_estoque_id=1, funcionario_id=1, armazem_id=1,
+    )
+
+
+def _servico(chamadas):
+    def criar(db, movimentacao):
+        chamadas.append(movimentacao)
+        resposta = MovimentacaoEstoqueRead(id=len(chamadas), **movimentacao.model_dump())
+        commit_com_resposta(db, resposta)
+        return resposta
+    return criar
+
+
+def test_repeticao_devolve_resposta_guardada_sem_executar(movimentacao, sessao_falsa):
+    banco, chamadas = Banco(), []
+    primeira = banco.sessao(sessao_falsa)
+    resposta = executar_idempotente(primeira, "k1", "movimentacao-estoque", movimentacao, MovimentacaoEstoqueRead,
+                                    _servico(chamadas), movimentacao)
+    # Trabalho, chave e resposta no mesmo commit
+    assert primeira.commits == 1
+    assert banco.gravadas[("k1", "movimentacao-estoque")]["resposta"] == resposta
+
+    repetida = executar_idempotente(banco.sessao(sessao_falsa), "k1", "movimentacao-estoque", movimentacao,
+                                    MovimentacaoEstoqueRead, _servico(chamadas), movimentacao)
+    assert len(chamadas) == 1
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert repetida.body.decode().count('"id":1') == 1
+
+
+def test_mesma_chave_com_outro_corpo_gera_422(movimentacao, sessao_falsa):
+    banco, chamadas = Banco(), []
+    executar_idempotente(banco.sessao(sessao_falsa), "k1", "r", movimentacao, MovimentacaoEstoqueRead,
+                         _servico(chamadas), movimentacao)
+    outra = movimentacao.model_copy(update={"quantidade": 3})
+    with pytest.raises(HTTPException) as erro:
+        executar_idempotente(banco.sessao(sessao_falsa), "k1", "r", outra, MovimentacaoEstoqueRead, _servico(chamadas), outra)
+    assert erro.value.status_code == 422
+    assert len(chamadas) == 1
+
+
+def test_chave_sem_resposta_gera_409(movimentacao, sessao_falsa):
+    # Primeira execução ainda em andamento: chave reservada, resposta ainda não gravada
+    banco = Banco({("k1", "r"): {"hash_corpo": _hash_corpo(movimentacao), "resposta": None}})
+    sessao = banco.sessao(sessao_falsa)
+    with pytest.raises(HTTPException) as erro:
+        executar_idempotente(sessao, "k1", "r", movimentacao, MovimentacaoEstoqueRead, _servico([]), movimentacao)
+    assert erro.value.status_code == 409
+
+
+def test_falha_do_servico_libera_a_chave(movimentacao, sessao_falsa):
+    banco = Banco()
+
+    def falhar(db, movimentacao):
+        raise HTTPException(status_code=400, detail="Quantidade insuficiente em estoque para saída")
+
+    sessao = banco.sessao(sessao_falsa)
+    with pytest.raises(HTTPException):
+        executar_idempotente(sessao, "k1", "r", movimentacao, MovimentacaoEstoqueRead, falhar, movimentacao)
+    sessao.rollback()
+    assert banco.gravadas == {}
+    assert sessao.info == {}
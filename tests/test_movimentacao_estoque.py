@@ -0,0 +1,54 @@
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from app.MovimentacaoEstoque.schema_movimentacao_estoque import MovimentacaoEstoqueCreate
+from app.MovimentacaoEstoque.service_movimentacao_estoque import create_movimentacaoestoque
+
+
+def _banco(existe):
+    """O UPDATE condicional não atualiza nada; ``existe`` decide se o par item/armazém existe"""
+    def responder(sql, parametros):
+        if sql.startswith("SELECT item_armazenado.id"):
+            return [(1,)] if existe else None
+    return responder
+
+
+def _movimentacao(tipo="saida", quantidade=5):
+    return MovimentacaoEstoqueCreate(
+        data_movimentacao="2025-01-15T10:00:00", tipo=tipo, quantidade=quantidade,
+        item_estoque_id=1, funcionario_id=1, armazem_id=1,
+    )
+
+
+def test_saida_sem_saldo_gera_400_sem_commit(sessao_falsa):
+    db = sessao_falsa(_banco(existe=True))
+    with pytest.raises(HTTPException) as erro:
+        create_movimentacaoestoque(db, _movimentacao())
+    assert erro.value.status_code == 400
+    assert (db.rollbacks, db.commits) == (1, 0)
+    # A verificação de saldo está no próprio UPDATE, não numa leitura anterior
+    assert "item_armazenado.quantidade >= " in db.textos[0]
+    assert db.textos[0].startswith("UPDATE item_armazenado")
+
+
+def test_item_fora_do_armazem_gera_404(sessao_falsa):
+    db = sessao_falsa(_banco(existe=False))
+    with pytest.raises(HTTPException) as erro:
+        create_movimentacaoestoque(db, _movimentacao(tipo="entrada"))
+    assert erro.value.status_code == 404
+    assert "quantidade >= " not in db.textos[0]
+
+
+def test_tipo_invalido_gera_400_sem_acessar_o_banco(sessao_falsa):
+    db = sessao_falsa(_banco(existe=True))
+    with pytest.raises(HTTPException) as erro:
+        create_movimentacaoestoque(db, _movimentacao(tipo="ajuste"))
+    assert erro.value.status_code == 400
+    assert db.textos == []
+
+
+@pytest.mark.parametrize("quantidade", [0, -50])
+def test_quantidade_precisa_ser_positiva(quantidade):
+    with pytest.raises(ValidationError):
+        _movimentacao(quantidade=quantidade)
@@ -0,0 +1,92 @@
+import pytest
+from fastapi import HTTPException
+
+from app.MovimentacaoEstoque.schema_movimentacao_estoque import LoteMovimentacaoEstoque
+from app.MovimentacaoEstoque.service_movimentacao_estoque import create_movimentacoes_em_lote
+
+
+def _banco(saldos):
+    """Saldos travados pelo SELECT ... FOR UPDATE; ids gerados a partir de 100"""
+    def responder(sql, parametros):
+        if sql.startswith("SELECT item_armazenado"):
+            return [
+                {"item_estoque_id": item, "armazem_id": armazem, "quantidade": quantidade}
+                for (item, armazem), quantidade in saldos.items()
+            ]
+        if sql.startswith("INSERT INTO movimentacao_estoque"):
+            return range(100, 100 + len(parametros))
+        if "nextval" in sql:
+            return [1]
+    return responder
+
+
+def _lote(modo, *linhas):
+    return LoteMovimentacaoEstoque(modo=modo, movimentacoes=[
+        {"data_movimentacao": "2025-01-15T09:00:00", "funcionario_id": 1, "armazem_id": 1,
+         "tipo": tipo, "quantidade": quantidade, "item_estoque_id": item}
+        for tipo, quantidade, item in linhas
+    ])
+
+
+# Linha 2 só falha porque a linha 1 já consumiu 4 das 5 unidades: validação em ordem, contra o saldo corrente
+LINHAS = [
+    ("entrada", 10, 2),
+    ("saida", 4, 1),
+    ("saida", 4, 1),
+    ("ajuste", 1, 1),
+    ("saida", 1, 9),
+]
+ERROS = [
+    {"indice": 2, "detalhe": "Quantidade insuficiente em estoque para saída"},
+    {"indice": 3, "detalhe": "Tipo de movimentação inválido (use 'entrada' ou 'saida')"},
+    {"indice": 4, "detalhe": "Item não encontrado no armazém informado"},
+]
+
+
+def test_tudo_ou_nada_rejeita_o_lote_com_os_erros_de_cada_linha(sessao_falsa):
+    db = sessao_falsa(_banco({(1, 1): 5, (2, 1): 0}))
+    with pytest.raises(HTTPException) as erro:
+        create_movimentacoes_em_lote(db, _lote("tudo_ou_nada", *LINHAS))
+    assert erro.value.status_code == 422
+    assert erro.value.detail["erros"] == ERROS
+    assert (db.commits, db.rollbacks) == (0, 1)
+    assert db.sql("UPDATE") == [] and db.sql("INSERT") == []
+
+
+def test_melhor_esforco_aplica_as_validas_com_um_update_e_um_insert(sessao_falsa):
+    db = sessao_falsa(_banco({(1, 1): 5, (2, 1): 0}))
+    resultado = create_movimentacoes_em_lote(db, _lote("melhor_esforco", *LINHAS))
+    assert resultado == {"aplicadas": 2, "ids": [100, 101, None, None, None], "erros": ERROS}
+    assert db.commits == 1
+
+    travamento = db.sql("SELECT item_armazenado")[0][0]
+    assert "FOR UPDATE" in travamento and "ORDER BY item_armazenado.id" in travamento
+
+    (update, parametros_update), = db.sql("UPDATE item_armazenado")
+    assert "FROM (VALUES" in update
+    assert sorted(
+        (parametros_update[f"param_{i}"], parametros_update[f"param_{i + 1}"], parametros_update[f"param_{i + 2}"])
+        for i in (1, 4)
+    ) == [(1, 1, -4), (2, 1, 10)]
+
+    (_, linhas_inseridas), = db.sql("INSERT INTO movimentacao_estoque")
+    assert [(linha["tipo"], linha["item_estoque_id"]) for linha in linhas_inseridas] == [("entrada", 2), ("saida", 1)]
+
+
+def test_melhor_esforco_sem_linhas_validas_nao_grava_nada(sessao_falsa):
+    db = sessao_falsa(_banco({(1, 1): 0}))
+    resultado = create_movimentacoes_em_lote(db, _lote("melhor_esforco", ("saida", 1, 1)))
+    assert resultado["aplicadas"] == 0
+    assert (db.commits, db.rollbacks) == (0, 1)
+
+
+def test_melhor_esforco_rejeita_so_a_linha_com_quantidade_invalida(sessao_falsa):
+    db = sessao_falsa(_banco({(1, 1): 5}))
+    resultado = create_movimentacoes_em_lote(db, _lote("melhor_esforco", ("entrada", 0, 1), ("saida", 2, 1)))
+    assert resultado == {
+        "aplicadas": 1,
+        "ids": [None, 100],
+        "erros": [{"indice": 0, "detalhe": "Quantidade deve ser maior que zero"}],
+    }
+    (_, linhas_inseridas), = db.sql("INSERT INTO movimentacao_estoque")
+    assert [linha["quantidade"] for linha in linhas_inseridas] == [2]
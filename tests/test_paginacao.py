@@ -0,0 +1,56 @@
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.paginacao import codificar_cursor, decodificar_cursor
+from app.MovimentacaoEstoque.schema_movimentacao_estoque import FiltroMovimentacaoEstoque, MovimentacaoEstoqueRead
+from app.MovimentacaoEstoque.service_movimentacao_estoque import listar_movimentacoes
+
+
+def test_cursor_ida_e_volta_preserva_valores_e_ordenacao():
+    cursor = codificar_cursor([date(2025, 1, 15), 42, 7], "data_validade")
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor, "data_validade") == ["2025-01-15", 42, 7]
+
+
+@pytest.mark.parametrize("cursor", ["nao-e-base64!", codificar_cursor([1], None)[:-2], "e30"])
+def test_cursor_malformado_gera_400(cursor):
+    with pytest.raises(HTTPException) as erro:
+        decodificar_cursor(cursor)
+    assert erro.value.status_code == 400
+
+
+def test_cursor_de_outra_ordenacao_gera_400():
+    with pytest.raises(HTTPException) as erro:
+        decodificar_cursor(codificar_cursor([1, 2], "asc"), "desc")
+    assert erro.value.status_code == 400
+
+
+def _linhas(linhas):
+    return lambda sql, parametros: linhas
+
+
+def test_listagem_de_movimentacoes_pagina_por_data_e_id(sessao_falsa):
+    linhas = [{"id": i, "data_movimentacao": datetime(2025, 1, 15, 10, i)} for i in range(3)]
+    pagina = listar_movimentacoes(sessao_falsa(_linhas(linhas)), FiltroMovimentacaoEstoque(), None, 2)
+    assert [item["id"] for item in pagina["itens"]] == [0, 1]
+    assert decodificar_cursor(pagina["next_cursor"], "asc") == ["2025-01-15T10:01:00", 1]
+
+    seguinte = sessao_falsa(_linhas(linhas[2:]))
+    pagina = listar_movimentacoes(seguinte, FiltroMovimentacaoEstoque(), pagina["next_cursor"], 2)
+    assert pagina["next_cursor"] is None
+    assert "(movimentacao_estoque.data_movimentacao, movimentacao_estoque.id) >" in seguinte.textos[0]
+
+
+def test_cursor_crescente_nao_vale_na_ordem_decrescente(sessao_falsa):
+    cursor = codificar_cursor(["2025-01-15T10:01:00", 1], "asc")
+    with pytest.raises(HTTPException):
+        listar_movimentacoes(sessao_falsa(), FiltroMovimentacaoEstoque(), cursor, 2, decrescente=True)
+
+
+def test_listagem_seleciona_so_os_campos_da_resposta(sessao_falsa):
+    db = sessao_falsa()
+    listar_movimentacoes(db, FiltroMovimentacaoEstoque(), None, 2)
+    colunas = db.textos[0].split(" FROM ")[0].removeprefix("SELECT ").split(", ")
+    assert colunas == [f"movimentacao_estoque.{campo}" for campo in MovimentacaoEstoqueRead.model_fields]
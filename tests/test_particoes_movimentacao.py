@@ -0,0 +1,63 @@
+from datetime import date, datetime
+
+from app.MovimentacaoEstoque import service_particoes_movimentacao
+from app.MovimentacaoEstoque.service_particoes_movimentacao import manter_particoes
+
+
+def _catalogo(sessao_falsa, existentes, ultimo_checkpoint=None, ultimo_registro=None, linhas_na_padrao=0):
+    """Catálogo de partições em memória"""
+    def responder(sql, parametros):
+        if "to_regclass" in sql:
+            return [parametros["nome"] in existentes]
+        if "pg_inherits" in sql:
+            return sorted(existentes)
+        if "FROM estoque_checkpoint" in sql:
+            return [ultimo_checkpoint]
+        if "max(registrado_em)" in sql:
+            return [ultimo_registro]
+        if "DELETE FROM movimentacao_estoque_padrao" in sql:
+            return sessao_falsa.Resultado(rowcount=linhas_na_padrao)
+    return sessao_falsa(responder)
+
+
+def test_mes_faltante_leva_as_linhas_da_padrao_antes_do_attach(monkeypatch, sessao_falsa):
+    monkeypatch.setattr(service_particoes_movimentacao, "MOVIMENTACAO_MESES_FUTUROS", 1)
+    db = _catalogo(sessao_falsa, {"movimentacao_estoque_202501"}, linhas_na_padrao=3)
+
+    resultado = manter_particoes(db, hoje=date(2025, 1, 20))
+
+    assert resultado["criadas"] == 1 and resultado["linhas_movidas"] == 3
+    ddl = [sql for sql in db.textos if not sql.startswith("SELECT")]
+    assert ddl[0] == "LOCK TABLE movimentacao_estoque_padrao IN SHARE ROW EXCLUSIVE MODE"
+    assert ddl[1].startswith('CREATE TABLE "movimentacao_estoque_202502" (LIKE movimentacao_estoque')
+    assert "DELETE FROM movimentacao_estoque_padrao" in ddl[2]
+    assert ddl[3].endswith("\"movimentacao_estoque_202502\" FOR VALUES FROM ('2025-02-01') TO ('2025-03-01')")
+    assert db.commits == 1
+
+
+def test_nada_a_criar_nao_trava_a_padrao(sessao_falsa):
+    db = _catalogo(sessao_falsa, {f"movimentacao_estoque_2025{mes:02d}" for mes in range(1, 5)})
+    assert manter_particoes(db, hoje=date(2025, 1, 20))["criadas"] == 0
+    assert not any(sql.startswith("LOCK") for sql in db.textos)
+
+
+def test_so_desanexa_o_mes_coberto_por_checkpoint(monkeypatch, sessao_falsa):
+    monkeypatch.setattr(service_particoes_movimentacao, "MOVIMENTACAO_MESES_FUTUROS", 0)
+    monkeypatch.setattr(service_particoes_movimentacao, "MOVIMENTACAO_MESES_RETENCAO", 1)
+    existentes = {"movimentacao_estoque_202411", "movimentacao_estoque_202501"}
+
+    # Movimentação retroativa de novembro gravada depois do último checkpoint
+    db = _catalogo(sessao_falsa, existentes, ultimo_checkpoint=datetime(2025, 1, 10), ultimo_registro=datetime(2025, 1, 15))
+    resultado = manter_particoes(db, hoje=date(2025, 1, 20))
+    assert resultado["desanexadas"] == [] and resultado["aguardando_checkpoint"] == ["movimentacao_estoque_202411"]
+
+    db = _catalogo(sessao_falsa, existentes, ultimo_checkpoint=datetime(2025, 1, 16), ultimo_registro=datetime(2025, 1, 15))
+    assert manter_particoes(db, hoje=date(2025, 1, 20))["desanexadas"] == ["movimentacao_estoque_202411"]
+    assert 'ALTER TABLE movimentacao_estoque DETACH PARTITION "movimentacao_estoque_202411"' in db.textos
+
+
+def test_sem_checkpoint_nenhum_mes_e_desanexado(monkeypatch, sessao_falsa):
+    monkeypatch.setattr(service_particoes_movimentacao, "MOVIMENTACAO_MESES_FUTUROS", 0)
+    monkeypatch.setattr(service_particoes_movimentacao, "MOVIMENTACAO_MESES_RETENCAO", 1)
+    db = _catalogo(sessao_falsa, {"movimentacao_estoque_202411", "movimentacao_estoque_202501"})
+    assert manter_particoes(db, hoje=date(2025, 1, 20))["aguardando_checkpoint"] == ["movimentacao_estoque_202411"]